@@ -0,0 +1,314 @@
+### aggregate_store.py
+# Agregados mantidos de forma incremental, por partição (arquivo de origem).
+#
+# Cada partição guarda só a sua contribuição para as tabelas que o
+# pré-processamento publica a partir dos totais:
+# - somas: linhas, área e prêmio por UF x município (com o CD_GEOCMU
+#   normalizado) x razão social x cultura (aditivas; dão o ranking de
+#   municípios);
+# - mensal: apólices distintas, área e prêmio por UF x razão social x mês
+#   (aditivas enquanto cada apólice estiver num arquivo só, como nos
+#   arquivos anuais do PSR).
+#
+# Os totais correntes ficam ao lado. Ingerir uma partição nova soma as
+# somas/bins dela aos totais, sem reler as linhas antigas; uma correção
+# (mesma partição de novo) ou retirada subtrai a contribuição antiga.
+#
+# materialize() devolve o ranking de municípios e os bins mensais a partir
+# dos totais. As chaves vêm de add_dimension_keys sobre os nomes e o
+# CD_GEOCMU, em ordem alfabética: as mesmas de um processamento completo
+# (códigos IBGE do município, ou substitutos negativos se nenhuma partição
+# tiver CD_GEOCMU). O agregado por estado não sai daqui: o pré-processamento
+# já tem as linhas e conta as apólices distintas por UF exatamente, como o
+# painel (aggregates.aggregate_by_state).
+#
+# O manifest registra o formato (STORE_FORMAT); partições gravadas num
+# formato anterior são reagregadas das linhas guardadas ao abrir.
+
+import json
+import os
+import shutil
+from dataclasses import dataclass
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+
+from dimensions import add_dimension_keys, normalize_municipality_code, state_codes
+from rankings import build_municipality_ranking
+from timeseries import MEASURES, month_key
+
+AGGREGATE_STORE_PATH = 'assets/agregados'
+
+# Grão das somas e dos bins mensais (nomes, não IDs: IDs densos mudam
+# quando aparece uma seguradora ou cultura nova)
+SUM_GRAIN = ['SG_UF_PROPRIEDADE', 'NM_MUNICIPIO_PROPRIEDADE', 'CD_GEOCMU', 'NM_RAZAO_SOCIAL', 'NM_CULTURA_GLOBAL']
+MONTHLY_GRAIN = ['CD_UF', 'NM_RAZAO_SOCIAL', 'MES']
+
+TOTALS_DIR = 'totais'
+PARTITIONS_DIR = 'particoes'
+MANIFEST_NAME = 'manifest.json'
+
+# Versão do formato das partições (2: CD_GEOCMU no grão das somas;
+# 3: bins mensais, esboços só por UF; 4: sem esboços)
+STORE_FORMAT = 4
+
+
+# ---------------------------
+# Contribuição de uma partição
+# ---------------------------
+@dataclass
+class Partials:
+    """Somas e bins mensais de um conjunto de linhas (ou dos totais)."""
+    somas: pd.DataFrame
+    mensal: pd.DataFrame
+
+
+def compute_partials(df: pd.DataFrame) -> Partials:
+    """
+    Contribuição das linhas limpas (saída de clean_and_convert, ainda sem
+    chaves inteiras): uma passada de groupby por tabela.
+    """
+    if 'CD_GEOCMU' in df.columns:
+        codigo = normalize_municipality_code(df['CD_GEOCMU'])
+    else:
+        codigo = pd.Series(pd.NA, index=df.index, dtype='Int32')
+    # A UF das chaves sai como em add_dimension_keys (código IBGE, senão sigla)
+    cd_uf = state_codes(df['SG_UF_PROPRIEDADE'], codigo)
+
+    somas = (
+        df.assign(linhas=1, CD_GEOCMU=codigo)
+        .groupby(SUM_GRAIN, dropna=False)
+        .agg(
+            linhas=('linhas', 'sum'),
+            area_total=('NR_AREA_TOTAL', 'sum'),
+            valor_total=('VL_PREMIO_LIQUIDO', 'sum')
+        )
+        .reset_index()
+    )
+
+    # Mesmo recorte de build_monthly_bins: linhas sem UF, seguradora ou mês ficam de fora
+    mensal = empty_partials().mensal
+    if 'DT_APOLICE' in df.columns:
+        mensal = (
+            df.assign(CD_UF=cd_uf, MES=month_key(df['DT_APOLICE']), linhas=1)
+            .groupby(MONTHLY_GRAIN)
+            .agg(
+                linhas=('linhas', 'sum'),
+                numero_seguros=('NR_APOLICE', 'nunique'),
+                area_total=('NR_AREA_TOTAL', 'sum'),
+                valor_total=('VL_PREMIO_LIQUIDO', 'sum')
+            )
+            .reset_index()
+        )
+
+    return Partials(somas, mensal)
+
+
+# ---------------------------
+# Aritmética dos totais
+# ---------------------------
+def _add_sums(frames: list, keys: list, drop_empty: str = None) -> pd.DataFrame:
+    frames = [f for f in frames if len(f)] or frames[:1]
+    table = pd.concat(frames, ignore_index=True).groupby(keys, dropna=False, sort=True).sum().reset_index()
+    if drop_empty is not None:
+        table = table[table[drop_empty] > 0].reset_index(drop=True)
+    return table
+
+
+def _negate(frame: pd.DataFrame, keys: list) -> pd.DataFrame:
+    """Valores com o sinal trocado; as chaves (CD_GEOCMU é numérico) ficam."""
+    numeric = [c for c in frame.select_dtypes('number').columns if c not in keys]
+    return frame.assign(**{c: -frame[c] for c in numeric})
+
+
+def combine(total: Partials, delta: Partials, sign: int = 1) -> Partials:
+    """
+    total + delta (sign=1) ou total - delta (sign=-1).
+    """
+    delta_somas = delta.somas if sign > 0 else _negate(delta.somas, SUM_GRAIN)
+    delta_mensal = delta.mensal if sign > 0 else _negate(delta.mensal, MONTHLY_GRAIN)
+    somas = _add_sums([total.somas, delta_somas], SUM_GRAIN, drop_empty='linhas')
+    mensal = _add_sums([total.mensal, delta_mensal], MONTHLY_GRAIN, drop_empty='linhas')
+    return Partials(somas, mensal)
+
+
+def empty_partials() -> Partials:
+    return Partials(
+        pd.DataFrame(columns=SUM_GRAIN + ['linhas', 'area_total', 'valor_total']),
+        pd.DataFrame(columns=MONTHLY_GRAIN + ['linhas'] + MEASURES),
+    )
+
+
+# ---------------------------
+# Funções: salvar / carregar Partials
+# ---------------------------
+def save_partials(parts: Partials, folder: str) -> None:
+    """
+    Grava somas e bins mensais em parquet.
+    """
+    os.makedirs(folder, exist_ok=True)
+    parts.somas.to_parquet(os.path.join(folder, 'somas.parquet'), index=False)
+    parts.mensal.to_parquet(os.path.join(folder, 'mensal.parquet'), index=False)
+
+
+def load_partials(folder: str) -> Partials:
+    """
+    Lê as Partials gravadas por save_partials.
+    """
+    return Partials(
+        pd.read_parquet(os.path.join(folder, 'somas.parquet')),
+        pd.read_parquet(os.path.join(folder, 'mensal.parquet')),
+    )
+
+
+# ---------------------------
+# Agregados a partir dos totais
+# ---------------------------
+def aggregates_from_totals(total: Partials) -> dict:
+    """
+    Ranking de municípios, bins mensais (os de build_monthly_bins) e as
+    dimensões, em O(grupos).
+    """
+    somas = total.somas
+    if somas['CD_GEOCMU'].isna().all():
+        # Nenhuma linha com código IBGE: substitutos, como no processamento completo
+        somas = somas.drop(columns='CD_GEOCMU')
+    groups, dims = add_dimension_keys(somas)
+
+    ranking = build_municipality_ranking(
+        groups.rename(columns={'area_total': 'NR_AREA_TOTAL', 'valor_total': 'VL_PREMIO_LIQUIDO'}), dims)
+
+    ids = dims['razao_social'].set_index('NM_RAZAO_SOCIAL')['ID_RAZAO_SOCIAL']
+    mensal = total.mensal.assign(ID_RAZAO_SOCIAL=total.mensal['NM_RAZAO_SOCIAL'].map(ids))
+    mensal = (
+        mensal[['CD_UF', 'ID_RAZAO_SOCIAL', 'MES'] + MEASURES]
+        .astype({'CD_UF': 'Int8', 'MES': 'Int32', 'numero_seguros': np.int64})
+        .sort_values(['CD_UF', 'ID_RAZAO_SOCIAL', 'MES'], ignore_index=True)
+    )
+
+    return {'ranking': ranking, 'mensal': mensal, 'dims': dims}
+
+
+# ---------------------------
+# Classe: repositório de agregados
+# ---------------------------
+class AggregateStore:
+    """
+    Pasta com uma subpasta por partição (contribuição + linhas limpas) e os
+    totais correntes. O manifest fica dentro da pasta dos totais, que é
+    trocada inteira (pasta temporária + rename): totais e lista de
+    partições nunca ficam dessincronizados.
+    """
+
+    def __init__(self, root: str = AGGREGATE_STORE_PATH):
+        self.root = root
+        self._totals_dir = os.path.join(root, TOTALS_DIR)
+        manifest = self.manifest()
+        if manifest['particoes'] and manifest.get('formato', 1) < STORE_FORMAT:
+            self.rebuild()
+
+    # --- leitura ---
+    def manifest(self) -> dict:
+        path = os.path.join(self._totals_dir, MANIFEST_NAME)
+        if not os.path.exists(path):
+            return {'particoes': {}}
+        with open(path, encoding='utf-8') as f:
+            return json.load(f)
+
+    def partitions(self) -> dict:
+        """partição -> metadados (origem, impressão digital, linhas, data)."""
+        return self.manifest()['particoes']
+
+    def totals(self) -> Partials:
+        if not self.partitions():
+            return empty_partials()
+        return load_partials(self._totals_dir)
+
+    def _partition_dir(self, partition: str) -> str:
+        return os.path.join(self.root, PARTITIONS_DIR, partition)
+
+    def rows(self) -> pd.DataFrame:
+        """Linhas limpas de todas as partições, na ordem de ingestão."""
+        frames = [pd.read_parquet(os.path.join(self._partition_dir(p), 'linhas.parquet'))
+                  for p in self.partitions()]
+        return pd.concat(frames, ignore_index=True)
+
+    def materialize(self) -> dict:
+        """Agregados do painel a partir dos totais (ver aggregates_from_totals)."""
+        return aggregates_from_totals(self.totals())
+
+    # --- escrita ---
+    def _write_totals(self, total: Partials, manifest: dict):
+        tmp = self._totals_dir + '.tmp'
+        old = self._totals_dir + '.old'
+        shutil.rmtree(tmp, ignore_errors=True)
+        save_partials(total, tmp)
+        manifest['formato'] = STORE_FORMAT
+        with open(os.path.join(tmp, MANIFEST_NAME), 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, indent=2, ensure_ascii=False)
+        shutil.rmtree(old, ignore_errors=True)
+        if os.path.isdir(self._totals_dir):
+            os.replace(self._totals_dir, old)
+        os.replace(tmp, self._totals_dir)
+        shutil.rmtree(old, ignore_errors=True)
+
+    def ingest(self, partition: str, df: pd.DataFrame, origem: str = None, fingerprint: str = None):
+        """
+        Acrescenta (ou corrige, se a partição já existe) a contribuição das
+        linhas limpas df. Só df é agregado; os totais são somados.
+        """
+        manifest = self.manifest()
+        total = self.totals()
+        folder = self._partition_dir(partition)
+        correction = partition in manifest['particoes']
+        if correction:
+            total = combine(total, load_partials(folder), sign=-1)
+
+        delta = compute_partials(df)
+        tmp = folder + '.tmp'
+        shutil.rmtree(tmp, ignore_errors=True)
+        save_partials(delta, tmp)
+        df.to_parquet(os.path.join(tmp, 'linhas.parquet'), index=False)
+
+        manifest['particoes'][partition] = {
+            'origem': origem,
+            'impressao_digital': fingerprint,
+            'linhas': len(df),
+            'ingerido_em': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        }
+        total = combine(total, delta)
+
+        shutil.rmtree(folder, ignore_errors=True)
+        os.replace(tmp, folder)
+        self._write_totals(total, manifest)
+
+    def rebuild(self):
+        """
+        Reagrega cada partição a partir das linhas guardadas e refaz os
+        totais (formato de partição antigo ou totais suspeitos).
+        """
+        manifest = self.manifest()
+        total = empty_partials()
+        for partition in manifest['particoes']:
+            folder = self._partition_dir(partition)
+            tmp = folder + '.tmp'
+            shutil.rmtree(tmp, ignore_errors=True)
+            delta = compute_partials(pd.read_parquet(os.path.join(folder, 'linhas.parquet')))
+            save_partials(delta, tmp)
+            os.replace(os.path.join(folder, 'linhas.parquet'), os.path.join(tmp, 'linhas.parquet'))
+            shutil.rmtree(folder)
+            os.replace(tmp, folder)
+            total = combine(total, delta)
+        self._write_totals(total, manifest)
+
+    def retract(self, partition: str):
+        """Subtrai a contribuição da partição e a remove."""
+        manifest = self.manifest()
+        if partition not in manifest['particoes']:
+            raise KeyError(f'partição desconhecida: {partition}')
+        folder = self._partition_dir(partition)
+        total = combine(self.totals(), load_partials(folder), sign=-1)
+        del manifest['particoes'][partition]
+        self._write_totals(total, manifest)
+        shutil.rmtree(folder, ignore_errors=True)
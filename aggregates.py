@@ -0,0 +1,114 @@
+### aggregates.py
+# Camada de dados e agregações do painel, sem nenhuma dependência de UI.
+# Todas as agregações agrupam por chaves inteiras (CD_UF, CD_MUNICIPIO,
+# ID_RAZAO_SOCIAL); os nomes entram só no final, via tabelas de dimensão.
+
+import os
+
+import pandas as pd
+
+from coverage_bits import build_uf_coverage, popcount
+from dimensions import KEY_COLUMNS, add_dimension_keys, attach_labels, dimensions_from_keys, load_dimensions
+from disk_cache import file_fingerprint
+
+# Colunas usadas na matriz de correlação
+CORRELATION_COLUMNS = [
+    "NR_AREA_TOTAL",
+    "VL_PREMIO_LIQUIDO",
+    "VL_LIMITE_GARANTIA",
+    "NR_PRODUTIVIDADE_ESTIMADA",
+    "NR_PRODUTIVIDADE_SEGURADA",
+    "VL_SUBVENCAO_FEDERAL"
+]
+
+
+# ---------------------------
+# Função: carregar e preparar o dataset
+# ---------------------------
+def load_dataset(parquet_path: str = r"assets/dados_filtrados.parquet"):
+    """
+    Lê o parquet principal e garante chaves inteiras e colunas numéricas.
+
+    Retorna (df, dims). Se o parquet já vier do pré-processamento novo, as
+    dimensões gravadas para ele são lidas da mesma pasta; se faltarem ou
+    forem de outro dataset, são remontadas das chaves gravadas (que nunca
+    são refeitas: o CD_GEOCMU já saiu do parquet). Senão, chaves e
+    dimensões são derivadas aqui.
+    """
+    df = pd.read_parquet(parquet_path)
+    dims = load_dimensions(os.path.dirname(parquet_path) or ".", origin=file_fingerprint(parquet_path))
+    if not set(KEY_COLUMNS).issubset(df.columns):
+        df, dims = add_dimension_keys(df)
+    elif dims is None:
+        dims = dimensions_from_keys(df)
+
+    for col in CORRELATION_COLUMNS:
+        if col in df.columns and not pd.api.types.is_numeric_dtype(df[col]):
+            df[col] = df[col].astype(str).str.replace(",", ".", regex=False)
+            df[col] = pd.to_numeric(df[col], errors="coerce")
+    return df, dims
+
+
+# ---------------------------
+# Agregações
+# ---------------------------
+def aggregate_by_state(df: pd.DataFrame, dims: dict) -> pd.DataFrame:
+    """
+    Área total, valor total e número de seguros por UF (chave CD_UF).
+    """
+    df_estado = df.groupby("CD_UF", observed=True).agg(
+        area_total=("NR_AREA_TOTAL", "sum"),
+        valor_total=("VL_PREMIO_LIQUIDO", "sum"),
+        numero_seguros=("NR_APOLICE", "nunique")
+    ).reset_index()
+    return attach_labels(df_estado, dims)
+
+
+def aggregate_by_insurer(df: pd.DataFrame, dims: dict) -> pd.DataFrame:
+    """
+    Métricas por razão social, com a cobertura de UFs em bitmask.
+    """
+    df_razao_social = df.groupby("ID_RAZAO_SOCIAL").agg(
+        numero_seguros=("NR_APOLICE", "nunique"),
+        area_total=("NR_AREA_TOTAL", "sum"),
+        valor_total=("VL_PREMIO_LIQUIDO", "sum")
+    ).reset_index()
+
+    # Cobertura de estados como bitmask (um bit por UF) + popcount vetorizado
+    df_razao_social["mask_estados"] = (
+        df_razao_social["ID_RAZAO_SOCIAL"].map(build_uf_coverage(df)).fillna(0).astype("uint32")
+    )
+    df_razao_social["contagem_estados"] = popcount(df_razao_social["mask_estados"].to_numpy())
+    return attach_labels(df_razao_social, dims)
+
+
+def aggregate_by_insurer_state(df: pd.DataFrame, dims: dict) -> pd.DataFrame:
+    """
+    Métricas por razão social e UF.
+    """
+    df_razao_social_estado = df.groupby(["ID_RAZAO_SOCIAL", "CD_UF"], observed=True).agg(
+        numero_seguros=("NR_APOLICE", "nunique"),
+        area_total=("NR_AREA_TOTAL", "sum"),
+        valor_total=("VL_PREMIO_LIQUIDO", "sum")
+    ).reset_index()
+    return attach_labels(df_razao_social_estado, dims)
+
+
+def aggregate_by_insurer_culture(df: pd.DataFrame, dims: dict) -> pd.DataFrame:
+    """
+    Métricas por razão social e cultura.
+    """
+    df_razao_social_cultura = df.groupby(["ID_RAZAO_SOCIAL", "ID_CULTURA"], observed=True).agg(
+        numero_seguros=("NR_APOLICE", "nunique"),
+        area_total=("NR_AREA_TOTAL", "sum"),
+        valor_total=("VL_PREMIO_LIQUIDO", "sum")
+    ).reset_index()
+    return attach_labels(df_razao_social_cultura, dims)
+
+
+def correlation_matrix(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Matriz de correlação entre as colunas numéricas disponíveis.
+    """
+    available_corr_cols = [c for c in CORRELATION_COLUMNS if c in df.columns]
+    return df[available_corr_cols].corr().round(2) if available_corr_cols else pd.DataFrame()
@@ -0,0 +1,396 @@
+### api.py
+# API HTTP local com os mesmos agregados do painel, sem Streamlit.
+#
+# Uso (na raiz do repositório):
+#   python api.py --porta 8765
+#   TERRA_API_PORT=8765 streamlit run appv1.2.py   (sobe junto, numa thread)
+#
+# O painel só aponta o navegador para /exportar se TERRA_API_PUBLIC_URL
+# disser como o navegador alcança a API (ex.: https://painel.exemplo/api,
+# atrás do proxy); o host de bind (TERRA_API_HOST) é o endereço do servidor,
+# não o do usuário. Sem ela o painel usa o download_button.
+#
+# Rotas (GET):
+#   /versao                     versão ativa do dataset
+#   /agregados/<nome>           estado, razao_social, razao_social_estado,
+#                               razao_social_cultura, correlacao
+#                               filtros: ?uf=SP (ou código) e ?razao_social=<id>
+#   /municipios?uf=SP           ranking de municípios da UF
+#                               &top=10 (padrão: todos) &ordem=area_total|valor_total
+#   /exportar?uf=SP             linhas brutas (exports.py), em fluxo (chunked)
+#                               &razao_social=<id> &colunas=A,B &formato=csv|parquet|xlsx
+#
+# Formato: JSON (padrão, lista de registros) ou Arrow IPC stream
+# (?formato=arrow ou Accept: application/vnd.apache.arrow.stream); os
+# agregados também saem em csv, parquet ou xlsx para download.
+#
+# Os dados vêm dos loaders cacheados (loaders.py): no mesmo processo do app
+# dividem o cache em memória, em processo separado dividem o cache em disco.
+# A resposta já codificada também fica no cache (namespace "api"), então uma
+# consulta repetida custa a cópia dos bytes. O ETag é a versão do dataset
+# mais o formato: If-None-Match igual devolve 304 sem corpo, e um snapshot
+# novo muda todos os ETags. HTTP/1.1 com keep-alive (Content-Length sempre).
+
+import argparse
+import io
+import json
+import logging
+import os
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlencode, urlsplit
+
+import exports
+import loaders
+from cache_manager import cached
+from dimensions import UF_CODE_BY_SIGLA, UF_SIGLA_BY_CODE
+from snapshots import start_watcher
+
+logger = logging.getLogger('api')
+
+AGGREGATE_NAMES = ['estado', 'razao_social', 'razao_social_estado', 'razao_social_cultura', 'correlacao']
+RANKING_ORDERS = ['area_total', 'valor_total']
+
+ARROW_MIME = 'application/vnd.apache.arrow.stream'
+JSON_MIME = 'application/json; charset=utf-8'
+
+
+class BadRequest(ValueError):
+    """Parâmetro inválido na consulta (HTTP 400)."""
+
+
+class NotFound(LookupError):
+    """Rota inexistente (HTTP 404)."""
+
+
+# ---------------------------
+# Consultas
+# ---------------------------
+def _parse_uf(value: str) -> int:
+    value = value.strip().upper()
+    if value in UF_CODE_BY_SIGLA:
+        return int(UF_CODE_BY_SIGLA[value])
+    if value.isdigit() and int(value) in UF_SIGLA_BY_CODE:
+        return int(value)
+    raise BadRequest(f'UF desconhecida: {value}')
+
+
+def _parse_int(name: str, value: str) -> int:
+    try:
+        number = int(value)
+    except ValueError:
+        raise BadRequest(f'{name} deve ser inteiro: {value}') from None
+    if number < 0:
+        raise BadRequest(f'{name} deve ser positivo: {value}')
+    return number
+
+
+def parse_query(path: str, query: dict) -> tuple:
+    """
+    Normaliza rota e parâmetros numa chave (rota, filtros) hasheável, a
+    mesma para consultas equivalentes (ex.: ?uf=sp e ?uf=35).
+    """
+    params = {name: values[-1] for name, values in query.items()}
+    params.pop('formato', None)
+    parts = [p for p in path.split('/') if p]
+
+    if parts[:1] == ['agregados'] and len(parts) == 2:
+        if parts[1] not in AGGREGATE_NAMES:
+            raise NotFound(f'agregado desconhecido: {parts[1]}')
+        filters = []
+        if 'uf' in params:
+            filters.append(('CD_UF', _parse_uf(params.pop('uf'))))
+        if 'razao_social' in params:
+            filters.append(('ID_RAZAO_SOCIAL', _parse_int('razao_social', params.pop('razao_social'))))
+        rota = ('agregados', parts[1], tuple(filters))
+    elif parts == ['municipios']:
+        if 'uf' not in params:
+            raise BadRequest('parâmetro uf obrigatório')
+        cd_uf = _parse_uf(params.pop('uf'))
+        top = _parse_int('top', params.pop('top')) if 'top' in params else None
+        ordem = params.pop('ordem', 'area_total')
+        if ordem not in RANKING_ORDERS:
+            raise BadRequest(f'ordem deve ser uma de {RANKING_ORDERS}')
+        rota = ('municipios', cd_uf, top, ordem)
+    else:
+        raise NotFound(f'rota desconhecida: {path}')
+
+    if params:
+        raise BadRequest(f'parâmetros desconhecidos: {sorted(params)}')
+    return rota
+
+
+def check_query(versao: str, rota: tuple):
+    """
+    Validação que depende dos dados: o agregado tem as colunas filtradas.
+    Roda antes do If-None-Match, para consulta inválida ser 400, nunca 304.
+    """
+    if rota[0] != 'agregados':
+        return
+    _, nome, filters = rota
+    df = loaders.load_aggregates(versao)[nome]
+    columns = [] if nome == 'correlacao' else df.columns
+    for column, _ in filters:
+        if column not in columns:
+            raise BadRequest(f'{nome} não tem a coluna {column}')
+
+
+def run_query(versao: str, rota: tuple):
+    """Tabela (DataFrame) da consulta normalizada por parse_query e check_query."""
+    if rota[0] == 'agregados':
+        _, nome, filters = rota
+        df = loaders.load_aggregates(versao)[nome]
+        if nome == 'correlacao':
+            return df.rename_axis('variavel').reset_index()
+        for column, value in filters:
+            df = df[df[column] == value]
+        return df.reset_index(drop=True)
+
+    _, cd_uf, top, ordem = rota
+    return loaders.load_rankings(versao).top(cd_uf, top, ordem).reset_index(drop=True)
+
+
+# ---------------------------
+# Codificação
+# ---------------------------
+def encode_json(df) -> bytes:
+    return df.to_json(orient='records', force_ascii=False).encode('utf-8')
+
+
+def encode_arrow(df) -> bytes:
+    import pyarrow as pa
+
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    sink = io.BytesIO()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue()
+
+
+ENCODERS = {
+    'json': (JSON_MIME, encode_json),
+    'arrow': (ARROW_MIME, encode_arrow),
+}
+for _formato, _mime in exports.EXPORT_FORMATS.items():
+    ENCODERS[_formato] = (_mime, lambda df, formato=_formato: exports.export_frame(df, formato))
+
+
+#corpo pronto da resposta, por versão, consulta e formato
+@cached("api")
+def load_response(versao: str, rota: tuple, formato: str) -> bytes:
+    """Resultado da consulta já codificado (JSON ou Arrow IPC)."""
+    return ENCODERS[formato][1](run_query(versao, rota))
+
+
+def etag(versao: str, formato: str) -> str:
+    return f'"{versao}-{formato}"'
+
+
+def etag_matches(if_none_match: str, tag: str) -> bool:
+    """
+    If-None-Match (lista separada por vírgulas, "*" ou vazio) contém tag;
+    a comparação é fraca: W/"x" casa com "x".
+    """
+    candidates = [c.strip() for c in if_none_match.split(',')]
+    return any(c == '*' or c.removeprefix('W/') == tag for c in candidates if c)
+
+
+def parse_export(versao: str, query: dict) -> dict:
+    """Parâmetros de /exportar como argumentos de exports.export_rows."""
+    params = {name: values[-1] for name, values in query.items()}
+    args = {'formato': params.pop('formato', 'csv')}
+    if args['formato'] not in exports.EXPORT_FORMATS:
+        raise BadRequest(f'formato deve ser um de {sorted(exports.EXPORT_FORMATS)}')
+    if 'uf' in params:
+        args['uf'] = UF_SIGLA_BY_CODE[_parse_uf(params.pop('uf'))]
+    if 'razao_social' in params:
+        id_razao = _parse_int('razao_social', params.pop('razao_social'))
+        nomes = loaders.load_aggregates(versao)['razao_social'].set_index('ID_RAZAO_SOCIAL')['NM_RAZAO_SOCIAL']
+        if id_razao not in nomes.index:
+            raise BadRequest(f'razão social desconhecida: {id_razao}')
+        args['razao_social'] = nomes[id_razao]
+    if 'colunas' in params:
+        args['columns'] = [c for c in params.pop('colunas').split(',') if c]
+    if params:
+        raise BadRequest(f'parâmetros desconhecidos: {sorted(params)}')
+    return args
+
+
+# ---------------------------
+# Servidor
+# ---------------------------
+class ApiHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # keep-alive
+    # Cabeçalho e corpo saem em dois writes: sem isso o Nagle segura o
+    # segundo até o ACK atrasado do cliente (~40 ms por resposta)
+    disable_nagle_algorithm = True
+    server_version = 'TerraAPI/1.0'
+
+    def _send(self, status: int, body: bytes = b'', content_type: str = JSON_MIME, headers: dict = None):
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        if status != 304:
+            self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        if body and self.command != 'HEAD':
+            self.wfile.write(body)
+
+    def _send_stream(self, chunks, content_type: str, headers: dict):
+        """
+        Corpo em Transfer-Encoding chunked, um pedaço por item de chunks. Um
+        erro no meio não tem mais como virar status: a conexão é fechada sem
+        o pedaço final, e o cliente vê a resposta incompleta.
+        """
+        self.send_response(200)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.end_headers()
+        if self.command == 'HEAD':
+            chunks.close()
+            return
+        try:
+            for chunk in chunks:
+                if chunk:
+                    self.wfile.write(b'%x\r\n%s\r\n' % (len(chunk), chunk))
+            self.wfile.write(b'0\r\n\r\n')
+        except Exception:
+            logger.exception('exportação interrompida em %s', self.path)
+            self.close_connection = True
+
+    def _send_error(self, status: int, message: str):
+        self._send(status, json.dumps({'erro': message}, ensure_ascii=False).encode('utf-8'))
+
+    def _format(self, query: dict) -> str:
+        if 'formato' in query:
+            formato = query['formato'][-1]
+            if formato not in ENCODERS:
+                raise BadRequest(f'formato deve ser um de {sorted(ENCODERS)}')
+            return formato
+        return 'arrow' if ARROW_MIME in self.headers.get('Accept', '') else 'json'
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        query = parse_qs(url.query)
+        versao = self.server.versao()
+        try:
+            if url.path.rstrip('/') == '/versao':
+                self._send(200, json.dumps({'versao': versao}).encode('utf-8'),
+                           headers={'Cache-Control': 'no-cache'})
+                return
+            if url.path.rstrip('/') == '/exportar':
+                self._export(versao, query)
+                return
+            # Toda a validação antes do 304: consulta inválida é sempre 400
+            formato = self._format(query)
+            rota = parse_query(url.path, query)
+            check_query(versao, rota)
+            tag = etag(versao, formato)
+            headers = {'ETag': tag, 'Cache-Control': 'no-cache', 'Vary': 'Accept'}
+            if etag_matches(self.headers.get('If-None-Match', ''), tag):
+                self._send(304, headers=headers)
+                return
+            body = load_response(versao, rota, formato)
+            self._send(200, body, ENCODERS[formato][0], headers)
+        except BadRequest as exc:
+            self._send_error(400, str(exc))
+        except NotFound as exc:
+            self._send_error(404, str(exc))
+        except Exception:
+            logger.exception('falha em %s', self.path)
+            self._send_error(500, 'erro interno')
+
+    def _export(self, versao: str, query: dict):
+        args = parse_export(versao, query)
+        try:
+            chunks = exports.export_rows(loaders.snapshot_files(versao)['dados'], **args)
+        except ValueError as exc:
+            raise BadRequest(str(exc)) from None
+        filename = exports.export_filename(args['formato'], 'apolices', args.get('uf'), args.get('razao_social'))
+        self._send_stream(chunks, exports.EXPORT_FORMATS[args['formato']], {
+            'Content-Disposition': f'attachment; filename="{filename}"',
+            'Cache-Control': 'no-store',
+        })
+
+    do_HEAD = do_GET
+
+    def log_message(self, format, *args):
+        logger.debug('%s %s', self.address_string(), format % args)
+
+
+class ApiServer(ThreadingHTTPServer):
+    """Servidor com uma thread por conexão; versao() dá a versão ativa."""
+
+    daemon_threads = True
+
+    def __init__(self, address, versao):
+        super().__init__(address, ApiHandler)
+        self.versao = versao
+
+
+_server = None
+_server_lock = threading.Lock()
+
+
+def start_api(port: int = None, host: str = None):
+    """
+    Servidor único do processo, numa thread daemon, seguindo a versão ativa
+    do SnapshotWatcher; None se a porta não foi configurada (TERRA_API_PORT)
+    ou já está em uso (outro worker do app subiu a API).
+    Host: TERRA_API_HOST (padrão 127.0.0.1).
+    """
+    global _server
+    with _server_lock:
+        if _server is None:
+            port = port if port is not None else int(os.environ.get('TERRA_API_PORT', 0))
+            host = host or os.environ.get('TERRA_API_HOST', '127.0.0.1')
+            _server = False
+            if port > 0:
+                watcher = start_watcher(loaders.prepare_version, loaders.retire_version)
+                try:
+                    _server = ApiServer((host, port), lambda: watcher.active)
+                except OSError as exc:
+                    logger.warning('API não iniciada em %s:%d: %s', host, port, exc)
+                else:
+                    threading.Thread(target=_server.serve_forever, daemon=True, name='api').start()
+                    logger.info('API em http://%s:%d', host, port)
+    return _server or None
+
+
+def public_export_url(**params):
+    """
+    Link de /exportar com params na URL pública da API (TERRA_API_PUBLIC_URL);
+    None se ela não foi configurada.
+    """
+    base = os.environ.get('TERRA_API_PUBLIC_URL', '').rstrip('/')
+    if not base:
+        return None
+    return f'{base}/exportar?{urlencode(params)}'
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description='API HTTP local com os agregados do painel.')
+    parser.add_argument('--porta', type=int, default=int(os.environ.get('TERRA_API_PORT', 8765)))
+    parser.add_argument('--host', default=os.environ.get('TERRA_API_HOST', '127.0.0.1'))
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(name)s %(message)s')
+    watcher = start_watcher(loaders.prepare_version, loaders.retire_version)
+    loaders.prepare_version(watcher.active)
+    server = ApiServer((args.host, args.porta), lambda: watcher.active)
+    print(f'API em http://{args.host}:{args.porta} (versão {watcher.active})', file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,420 +1,727 @@
 import logging
+import math
 import os
+import uuid
+from concurrent.futures import wait
 import streamlit as st
 import pandas as pd
-import geopandas as gpd
-import plotly.express as px
-import folium
-from streamlit_folium import folium_static
-import matplotlib.cm as cm
-import matplotlib.colors as mcolors
+import streamlit.components.v1 as components
+
+import figures
+from api import public_export_url, start_api
+from cache_manager import CACHE, disk_store
+from coverage_bits import UF_SIGLAS, covers_all, decode_uf_mask
+from dimensions import UF_CODE_BY_SIGLA, UF_SIGLA_BY_CODE
+from exports import EXPORT_FORMATS, export_filename, export_rows
+from explorer import PAGE_SIZES, explorer_columns, is_range_column, page
+from loaders import (
+    load_adjacency, load_aggregates, load_concentration, load_data, load_explorer_order, load_insurer_bar,
+    load_map_html, load_monthly_indexes, load_outlier_map_html, load_outliers, load_rankings,
+    load_razao_social_figure, load_sample_estimates, load_search_index, load_state_view, prepare_version,
+    retire_version
+)
+from outliers import OUTLIER_MEASURES, Z_THRESHOLD
+from prefetch import likely_next_ufs, start_prefetcher
+from profiling import SamplingProfiler, span, start_rerun
+from render_pool import process_pool, submit_all
+from snapshots import snapshot_files, start_watcher
+from timeseries import MonthlyIndex, month_label
 
 # ===========================================================
 # CONFIGURAÇÃO INICIAL
 # ===========================================================
 st.set_page_config(layout="wide")
 
-# Logo na sidebar (editável)
-if os.path.exists("assets/logo.jpg"):
-    st.sidebar.image("assets/logo.jpg")
+# Instrumentação por rerun (painel de debug: ?debug=1 na URL ou TERRA_DEBUG=1)
+debug_mode = st.query_params.get("debug") == "1" or os.environ.get("TERRA_DEBUG") == "1"
+rerun_timer = start_rerun(debug_mode)
+rerun_profiler = None
+if debug_mode and st.session_state.get("capturar_perfil"):
+    rerun_profiler = SamplingProfiler().start()
 
-st.title("Super teste")
+# Daqui até o fim do painel de debug: o finally para o profiler do rerun
+try:
+    # Logo na sidebar (editável)
+    if os.path.exists("assets/logo.jpg"):
+        st.sidebar.image("assets/logo.jpg")
 
-# ===========================================================
-# CARREGAMENTO DE DADOS
-# ===========================================================
+    st.title("Super teste")
 
-# csv ou excel
-@st.cache_data
-def load_data(parquet_path: str = r"assets/dados_filtrados.parquet") -> pd.DataFrame:
-    """Carrega o dataframe principal (parquet)."""
-    return pd.read_parquet(parquet_path)
+    # ===========================================================
+    # CARREGAMENTO DE DADOS
+    # ===========================================================
 
-#shapefile estados
-@st.cache_data
-def load_geodata(geojson_path: str = "assets/BR_UF_2024_Filtrado.geojson") -> gpd.GeoDataFrame:
-    """Carrega GeoDataFrame dos estados (GeoJSON)."""
-    return gpd.read_file(geojson_path)
+    # Loaders cacheados (memória + disco) em loaders.py; o warmup.py usa os
+    # mesmos para pré-calcular tudo antes do primeiro acesso.
 
-#alterar caminhos se necessário
-df = load_data()
-gdf = load_geodata()
+    # Versão ativa dos dados: snapshots novos (python snapshots.py publicar ...)
+    # são preparados em segundo plano e trocados sem reiniciar o servidor.
+    # A versão é lida uma vez por rerun, então cada rerun vê um dataset só.
+    snapshot_watcher = start_watcher(prepare_version, retire_version)
+    versao_dados = snapshot_watcher.active
 
-# Preview rápido
-# st.dataframe(df.head(200))
+    # Sobe os processos de render dos mapas já no primeiro rerun (idempotente)
+    process_pool()
 
-# ===========================================================
-# PRÉ-PROCESSAMENTO E AGREGAÇÕES
-# ===========================================================
+    # Pré-busca da visão "Estado" (prefetch.py); cada sessão tem sua fila
+    prefetcher = start_prefetcher()
+    sessao_id = st.session_state.setdefault("sessao_id", uuid.uuid4().hex)
 
-# 1) Agregação por Estado
-df_estado = df.groupby("SG_UF_PROPRIEDADE").agg(
-    area_total=("NR_AREA_TOTAL", "sum"),
-    valor_total=("VL_PREMIO_LIQUIDO", "sum"),
-    numero_seguros=("NR_APOLICE", "nunique")
-).reset_index()
-
-# 2) Merge com GeoDataFrame
-gdf = gdf.merge(df_estado, left_on="SIGLA_UF", right_on="SG_UF_PROPRIEDADE", how="left")
-
-# 3) Agregação por Razão Social
-df_razao_social = df.groupby("NM_RAZAO_SOCIAL").agg(
-    numero_seguros=("NR_APOLICE", "nunique"),
-    area_total=("NR_AREA_TOTAL", "sum"),
-    valor_total=("VL_PREMIO_LIQUIDO", "sum"),
-    estados=("SG_UF_PROPRIEDADE", "unique")
-).reset_index()
-df_razao_social["contagem_estados"] = df_razao_social["estados"].apply(len)
-
-# 4) Agregação por Razão Social + Estado (caso precise)
-df_razao_social_estado = df.groupby(["NM_RAZAO_SOCIAL", "SG_UF_PROPRIEDADE"]).agg(
-    numero_seguros=("NR_APOLICE", "sum"),
-    area_total=("NR_AREA_TOTAL", "sum"),
-    valor_total=("VL_PREMIO_LIQUIDO", "sum")
-).reset_index()
-
-# 5) Conversão de colunas numéricas
-correlation_columns = [
-    "NR_AREA_TOTAL",
-    "VL_PREMIO_LIQUIDO",
-    "VL_LIMITE_GARANTIA",
-    "NR_PRODUTIVIDADE_ESTIMADA",
-    "NR_PRODUTIVIDADE_SEGURADA",
-    "VL_SUBVENCAO_FEDERAL"
-]
-for col in correlation_columns:
-    if col in df.columns:
-        df[col] = df[col].astype(str).str.replace(",", ".", regex=False)
-        df[col] = pd.to_numeric(df[col], errors="coerce")
-
-# Matriz de correlação
-available_corr_cols = [c for c in correlation_columns if c in df.columns]
-correlation_matrix = df[available_corr_cols].corr().round(2) if available_corr_cols else pd.DataFrame()
+    # API HTTP local com os mesmos agregados (api.py), se TERRA_API_PORT estiver definida
+    api_server = start_api()
 
-# ===========================================================
-# LAYOUT PRINCIPAL
-# ===========================================================
-st.title("Avaliações Rurais - Terra Soluções")
-st.markdown("""
-A Terra Soluções é fruto de uma sociedade de dois grandes engenheiros agrônomos,
-apadrinhados e apresentados por um dos mais renomados especialistas na Avaliação de Imóveis Rurais,
-o **Eng. Agrônomo e Prof. Doutor Valdemar Antônio Demétrio**, da Escola Superior de Agricultura “Luiz de Queiroz” (ESALQ/USP).
-""")
-st.markdown("""
-Em 06/04/2011, os Engenheiros Agrônomos Henrique Sundfeld Barbin e Luis Augusto Calvo de Moura Andrade,
-que já trabalhavam na área de avaliações há 8 anos, inauguraram a **Terra Soluções Ambientais e Agrárias**.
-""")
-st.divider()
+    # Dados e agregações (por estado, razão social com cobertura de estados em
+    # bitmask, razão social + estado e matriz de correlação) saem em segundo
+    # plano: cabeçalho e controles aparecem antes, e se o cálculo passar de
+    # TERRA_PREVIEW_AFTER_MS a página mostra uma prévia estimada da amostra
 
-# ===========================================================
-# SIDEBAR DE CONTROLES
-# ===========================================================
-with st.sidebar:
-    st.subheader("SISSER - Sistema de Subvenção Econômica ao Prêmio do Seguro Rural")
-    analise_tipo = st.selectbox("Selecione o tipo de análise", ["Razão Social", "Estado"])
+    #alterar caminhos se necessário
+    base = submit_all({
+        "dados": (load_data, versao_dados),
+        "agregados": (load_aggregates, versao_dados),
+    })
+    PREVIA_APOS_S = float(os.environ.get("TERRA_PREVIEW_AFTER_MS", 300)) / 1000
 
-# ===========================================================
-# LÓGICA DE EXIBIÇÃO — RAZÃO SOCIAL
-# ===========================================================
-if analise_tipo == "Razão Social":
-    st.header("Análise por Razão Social")
+    # Linhas brutas: visão "Dados brutos" (explorer.py), paginada no servidor
 
-    # Dicionário de métricas
-    metric_options = {
-        "Número de Seguros": "numero_seguros",
-        "Contagem de Estados": "contagem_estados",
-        "Área Total": "area_total"
-    }
+    # ===========================================================
+    # SÉRIE TEMPORAL (usada nas duas análises)
+    # ===========================================================
+    def render_trend(index: MonthlyIndex, group, titulo: str, key: str):
+        """Gráfico mensal com seletor de intervalo; totais via somas acumuladas."""
+        month_range = index.month_range(group)
+        if month_range is None:
+            st.info("Sem dados mensais para esta seleção.")
+            return
+
+        months = list(range(month_range[0], month_range[1] + 1))
+        inicio, fim = st.select_slider(
+            "Intervalo de meses",
+            options=months,
+            value=(months[0], months[-1]),
+            format_func=month_label,
+            key=f"intervalo_{key}"
+        )
 
-    # Exibir resumo na sidebar
-    with st.sidebar:
-        top_estado_num_apolice = df_estado.loc[df_estado['numero_seguros'].idxmax()]
-        top_estado_area_total = df_estado.loc[df_estado['area_total'].idxmax()]
-        top_estado_valor_total = df_estado.loc[df_estado['valor_total'].idxmax()]
+        with span(f"serie:consulta_{key}"):
+            totais = index.range_total(inicio, fim, group)
+            df_serie = index.series(inicio, fim, group)
+        col1, col2, col3 = st.columns(3)
+        col1.metric("Seguros no período", f"{totais['numero_seguros']:.0f}")
+        col2.metric("Área no período (ha)", f"{totais['area_total']:.2f}")
+        col3.metric("Prêmio no período (R$)", f"{totais['valor_total']:.2f}")
 
-        st.markdown(
-            f"**Estado com maior número de Avaliações:** {top_estado_num_apolice['SG_UF_PROPRIEDADE']} "
-            f"({int(top_estado_num_apolice['numero_seguros'])} apólices)\n\n"
-        )
-        st.markdown(
-            f"**Estado com maior área total assegurada:** {top_estado_area_total['SG_UF_PROPRIEDADE']} "
-            f"({top_estado_area_total['area_total']:.2f} ha)\n\n"
+        with span(f"figura:serie_{key}"):
+            fig_serie = figures.trend_line(df_serie, titulo)
+        st.plotly_chart(fig_serie, use_container_width=True, key=f"grafico_serie_{key}")
+
+    # ===========================================================
+    # PRÉVIA ESTIMADA (amostra estratificada)
+    # ===========================================================
+    def render_preview(estimativas: dict, analise_tipo: str):
+        """
+        Primeira pintura: totais estimados da amostra com IC 95% como barras de
+        erro. Usa a métrica / estado escolhidos no rerun anterior.
+        """
+        st.info(
+            f"Prévia estimada a partir de uma amostra de {estimativas['linhas_amostra']} de "
+            f"{estimativas['linhas_dataset']} registros (barras de erro: IC 95%). "
+            "Os valores exatos substituem esta prévia assim que o cálculo terminar."
         )
-        st.markdown(
-            f"**Estado com maior valor total assegurado:** {top_estado_valor_total['SG_UF_PROPRIEDADE']} "
-            f"(R$ {top_estado_valor_total['valor_total']:.2f})\n\n"
+        rotulos = {
+            "NM_RAZAO_SOCIAL": "Razão Social",
+            "SG_UF_PROPRIEDADE": "Estado",
+            "numero_seguros": "Número de seguros",
+            "area_total": "Área Total (ha)",
+            "valor_total": "Valor Total (R$)",
+        }
+        df_estado_estimado = estimativas["estado"].assign(
+            SG_UF_PROPRIEDADE=estimativas["estado"]["CD_UF"].map(UF_SIGLA_BY_CODE)
         )
+        estado = st.session_state.get("estado_escolhido")
+
+        if analise_tipo == "Razão Social":
+            metrica = st.session_state.get("metrica_razao_social", next(iter(figures.INSURER_METRICS)))
+            coluna = figures.INSURER_METRICS[metrica]
+            st.plotly_chart(
+                figures.estimate_bar(estimativas["razao_social"], "NM_RAZAO_SOCIAL", coluna,
+                                     f"{metrica} por Razão Social", {**rotulos, coluna: metrica}),
+                use_container_width=True, key="previa_razao_social"
+            )
+            # No lugar dos mapas (coroplético não tem barra de erro): barras por UF
+            col1, col2 = st.columns(2)
+            col1.plotly_chart(
+                figures.estimate_bar(df_estado_estimado, "SG_UF_PROPRIEDADE", "area_total",
+                                     "Área Total Assegurada por Estado", rotulos),
+                use_container_width=True, key="previa_area_estado"
+            )
+            col2.plotly_chart(
+                figures.estimate_bar(df_estado_estimado, "SG_UF_PROPRIEDADE", "numero_seguros",
+                                     "Número de Seguros por Estado", rotulos),
+                use_container_width=True, key="previa_seguros_estado"
+            )
+        elif estado in UF_CODE_BY_SIGLA:
+            df_uf = estimativas["razao_social_estado"]
+            df_uf = df_uf[df_uf["CD_UF"] == UF_CODE_BY_SIGLA[estado]]
+            col1, col2 = st.columns(2)
+            col1.plotly_chart(
+                figures.estimate_bar(df_uf, "NM_RAZAO_SOCIAL", "area_total",
+                                     f"Área por razão social em {estado}", rotulos),
+                use_container_width=True, key="previa_area_razao_estado"
+            )
+            col2.plotly_chart(
+                figures.estimate_bar(df_uf, "NM_RAZAO_SOCIAL", "numero_seguros",
+                                     f"Número de seguros em {estado} por razão social", rotulos),
+                use_container_width=True, key="previa_seguros_razao_estado"
+            )
+        else:
+            st.plotly_chart(
+                figures.estimate_bar(df_estado_estimado, "SG_UF_PROPRIEDADE", "valor_total",
+                                     "Valor Total Assegurado por Estado", rotulos),
+                use_container_width=True, key="previa_valor_estado"
+            )
 
-    # Seleção da métrica
-    selected_metric = st.selectbox("Selecione a Métrica", options=list(metric_options.keys()))
-    metric_column = metric_options[selected_metric]
-
-    # Ordenar dataframe por métrica
-    df_sorted = df_razao_social.sort_values(by=metric_column, ascending=False)
-
-    # ---------------------------
-    # Gráfico de Barras — Razão Social
-    # ---------------------------
-    fig_bar = px.bar(
-        df_sorted,
-        x="NM_RAZAO_SOCIAL",
-        y=metric_column,
-        title=f"{selected_metric} por razão social",
-        labels={"NM_RAZAO_SOCIAL": "Razão Social", metric_column: selected_metric},
-        color=metric_column,
-        color_continuous_scale="Viridis"
-    )
-
-    fig_bar.update_layout(
-        template="plotly_white",
-        title=dict(text=f"{selected_metric} por Razão Social", x=0.5, font=dict(size=18)),
-        xaxis=dict(tickangle=45, automargin=True, tickfont=dict(size=11)),
-        yaxis=dict(tickfont=dict(size=11), gridcolor="rgba(200,200,200,0.3)"),
-        coloraxis=dict(
-            colorbar=dict(
-                title=dict(text=selected_metric, font=dict(size=12, color="#333")),
-                tickfont=dict(size=11, color="#555")
+    # ===========================================================
+    # BUSCA (search_index.py)
+    # ===========================================================
+    def ir_para(match):
+        """
+        Callback de um resultado da busca (roda antes do rerun, então pode mudar
+        os seletores): UF e município abrem a visão "Estado" da UF, razão social
+        abre a visão "Razão Social" com a série dela.
+        """
+        if match.tipo == "razao_social":
+            st.session_state["analise_tipo"] = "Razão Social"
+            st.session_state["razao_serie"] = match.nome
+        else:
+            st.session_state["analise_tipo"] = "Estado"
+            st.session_state["estado_escolhido"] = UF_SIGLA_BY_CODE[match.cd_uf]
+        st.session_state["municipio_destacado"] = match.id if match.tipo == "municipio" else None
+        st.session_state["busca_termo"] = ""
+
+
+    def render_search_results(termo: str):
+        """Melhores resultados do termo como botões que levam à visão da entidade."""
+        with span("busca:consulta"):
+            resultados = load_search_index(versao_dados).search(termo)
+        if not resultados:
+            st.caption("Nada encontrado.")
+        rotulos = {"uf": "Estado", "razao_social": "Razão Social", "municipio": "Município"}
+        for i, match in enumerate(resultados):
+            detalhe = rotulos[match.tipo]
+            if match.tipo == "municipio":
+                detalhe += f" — {UF_SIGLA_BY_CODE[match.cd_uf]}"
+            st.button(
+                f"{match.nome} ({detalhe})" + ("" if match.exato else " ≈"),
+                key=f"busca_resultado_{i}", on_click=ir_para, args=(match,), use_container_width=True
             )
-        ),
-        bargap=0.25,
-        plot_bgcolor="rgba(0,0,0,0)",
-        paper_bgcolor="rgba(0,0,0,0)",
-        margin=dict(t=60, b=150)
-    )
-
-    fig_bar.update_traces(
-        texttemplate="%{y:.2f}",
-        textposition="outside",
-        hovertemplate="<b>%{x}</b><br>" + selected_metric + ": %{y:.2f}<extra></extra>"
-    )
-
-    st.plotly_chart(fig_bar, use_container_width=True, key="grafico_bar_razao_social")
+
+    # ===========================================================
+    # LAYOUT PRINCIPAL
+    # ===========================================================
+    st.title("Avaliações Rurais - Terra Soluções")
+    st.markdown("""
+    A Terra Soluções é fruto de uma sociedade de dois grandes engenheiros agrônomos,
+    apadrinhados e apresentados por um dos mais renomados especialistas na Avaliação de Imóveis Rurais,
+    o **Eng. Agrônomo e Prof. Doutor Valdemar Antônio Demétrio**, da Escola Superior de Agricultura “Luiz de Queiroz” (ESALQ/USP).
+    """)
+    st.markdown("""
+    Em 06/04/2011, os Engenheiros Agrônomos Henrique Sundfeld Barbin e Luis Augusto Calvo de Moura Andrade,
+    que já trabalhavam na área de avaliações há 8 anos, inauguraram a **Terra Soluções Ambientais e Agrárias**.
+    """)
     st.divider()
 
-    # ---------------------------
-    # Cards de métricas
-    # ---------------------------
-    max_num_seguros = df_razao_social['numero_seguros'].max()
-    mean_num_seguros = df_razao_social['numero_seguros'].mean()
-    var_num_seguros = ((max_num_seguros - mean_num_seguros) / mean_num_seguros) * 100
-    top_razao_num_seguros = df_razao_social.loc[df_razao_social['numero_seguros'] == max_num_seguros, 'NM_RAZAO_SOCIAL'].values[0]
-
-    max_count_estados = df_razao_social['contagem_estados'].max()
-    mean_count_estados = df_razao_social['contagem_estados'].mean()
-    var_count_estados = ((max_count_estados - mean_count_estados) / mean_count_estados) * 100
-    top_razao_count_estados = df_razao_social.loc[df_razao_social['contagem_estados'] == max_count_estados, 'NM_RAZAO_SOCIAL'].values[0]
-
-    max_area_total = df_razao_social['area_total'].max()
-    mean_area_total = df_razao_social['area_total'].mean()
-    var_area_total = ((max_area_total - mean_area_total) / mean_area_total) * 100
-    top_razao_area_total = df_razao_social.loc[df_razao_social['area_total'] == max_area_total, 'NM_RAZAO_SOCIAL'].values[0]
-
-    col1, col2, col3 = st.columns(3)
-    with col1:
-        st.metric(
-            label=f"Máximo número de seguros - {top_razao_num_seguros}",
-            value=f"{max_num_seguros:.0f}",
-            delta=f"{var_num_seguros:.2f}% em relação à média"
-        )
-    with col2:
-        st.metric(
-            label=f"Máximo Contagem Estados - {top_razao_count_estados}",
-            value=f"{max_count_estados:.0f}",
-            delta=f"{var_count_estados:.2f}% em relação à média"
-        )
-    with col3:
-        st.metric(
-            label=f"Máximo Área Total - {top_razao_area_total}",
-            value=f"{max_area_total:.0f}",
-            delta=f"{var_area_total:.2f}% em relação à média"
+    # ===========================================================
+    # SIDEBAR DE CONTROLES
+    # ===========================================================
+    with st.sidebar:
+        st.subheader("SISSER - Sistema de Subvenção Econômica ao Prêmio do Seguro Rural")
+        # Busca com type-ahead: os resultados aparecem quando os dados estão prontos
+        busca_termo = st.text_input("Buscar estado, município ou seguradora", key="busca_termo")
+        resultados_busca = st.container()
+        analise_tipo = st.selectbox(
+            "Selecione o tipo de análise", ["Razão Social", "Estado", "Auditoria", "Dados brutos"], key="analise_tipo"
         )
 
-    st.divider()
-
-    # ---------------------------
-    # Heatmap de Correlação
-    # ---------------------------
-    st.subheader('Correlação entre parâmetros')
-    fig_heatmap = px.imshow(
-        correlation_matrix,
-        text_auto=True,
-        color_continuous_scale='Blues',
-        title='Correlação entre parâmetros',
-        width=400,
-        height=800
-    )
-    st.plotly_chart(fig_heatmap, use_container_width=True, key="grafico_heatmap_razao_social")
+    # ===========================================================
+    # DADOS E AGREGAÇÕES (prévia enquanto não ficam prontos)
+    # ===========================================================
+    previa = st.empty()
+    if wait(base.values(), timeout=PREVIA_APOS_S).not_done:
+        with span("previa:amostra"):
+            estimativas = load_sample_estimates(versao_dados)
+            if estimativas is not None:
+                with previa.container():
+                    render_preview(estimativas, analise_tipo)
+
+    with span("dados:load_data"):
+        df, dims = base["dados"].result()
+    with span("agregacao:load_aggregates"):
+        agregados = base["agregados"].result()
+    previa.empty()
+    if busca_termo.strip():
+        with resultados_busca:
+            render_search_results(busca_termo)
+    df_estado = agregados["estado"]
+    df_razao_social = agregados["razao_social"]
 
     # ===========================================================
-    # MAPAS E GRÁFICO DE PIZZA
+    # LÓGICA DE EXIBIÇÃO — RAZÃO SOCIAL
     # ===========================================================
-    col1, col2 = st.columns([1, 1])
-
-    # Mapa de área total assegurada
-    with col1:
-        st.subheader('Área Total Assegurada por Estado')
-        m_area = folium.Map(location=[-15.78, -47.93], zoom_start=3)
-        folium.Choropleth(
-            geo_data=gdf,
-            name='Área Total',
-            data=df_estado,
-            columns=['SG_UF_PROPRIEDADE', 'area_total'],
-            key_on='feature.properties.SIGLA_UF',
-            fill_color='BuPu',
-            fill_opacity=0.7,
-            line_opacity=0.4,
-            line_color='black',
-            legend_name='Área total assegurada (ha)',
-            bins=4,
-            reset=True
-        ).add_to(m_area)
-        folium_static(m_area, width=880, height=600)
-
-    # Mapa de número de seguros + gráfico de pizza
-    with col2:
-        st.subheader('Número de Seguros por Estado')
-        m_seguros = folium.Map(location=[-15.78, -47.93], zoom_start=3)
-        folium.Choropleth(
-            geo_data=gdf,
-            name='Número de Seguros',
-            data=df_estado,
-            columns=['SG_UF_PROPRIEDADE', 'numero_seguros'],
-            key_on='feature.properties.SIGLA_UF',
-            fill_color='YlGnBu',
-            fill_opacity=0.7,
-            line_opacity=0.4,
-            line_color='white',
-            legend_name='Número de Seguros',
-            bins=4,
-            reset=True
-        ).add_to(m_seguros)
-        folium_static(m_seguros, width=880, height=600)
-
-        st.markdown("---")
-        st.subheader('Distribuição do Valor Total Assegurado por Razão Social')
-        fig_pie_valor = px.pie(
-            df_razao_social,
-            names='NM_RAZAO_SOCIAL',
-            values='valor_total',
-            title='Distribuição do Valor Total Assegurado'
+    if analise_tipo == "Razão Social":
+        st.header("Análise por Razão Social")
+
+        # Saiu da visão "Estado": a pré-busca pendente desta sessão perde o sentido
+        if prefetcher is not None:
+            prefetcher.cancel(sessao_id)
+
+        # Dicionário de métricas
+        metric_options = figures.INSURER_METRICS
+
+        # Exibir resumo na sidebar
+        with st.sidebar:
+            top_estado_num_apolice = df_estado.loc[df_estado['numero_seguros'].idxmax()]
+            top_estado_area_total = df_estado.loc[df_estado['area_total'].idxmax()]
+            top_estado_valor_total = df_estado.loc[df_estado['valor_total'].idxmax()]
+
+            st.markdown(
+                f"**Estado com maior número de Avaliações:** {top_estado_num_apolice['SG_UF_PROPRIEDADE']} "
+                f"({int(top_estado_num_apolice['numero_seguros'])} apólices)\n\n"
+            )
+            st.markdown(
+                f"**Estado com maior área total assegurada:** {top_estado_area_total['SG_UF_PROPRIEDADE']} "
+                f"({top_estado_area_total['area_total']:.2f} ha)\n\n"
+            )
+            st.markdown(
+                f"**Estado com maior valor total assegurado:** {top_estado_valor_total['SG_UF_PROPRIEDADE']} "
+                f"(R$ {top_estado_valor_total['valor_total']:.2f})\n\n"
+            )
+
+        # Seleção da métrica
+        selected_metric = st.selectbox("Selecione a Métrica", options=list(metric_options.keys()),
+                                       key="metrica_razao_social")
+        metric_column = metric_options[selected_metric]
+
+        # Todos os artefatos do ramo são independentes dados os agregados:
+        # construídos em paralelo (render_pool) e exibidos abaixo na ordem do
+        # layout; cada span mede só a espera pelo artefato.
+        artefatos = submit_all({
+            "barras": (load_insurer_bar, versao_dados, metric_column, selected_metric),
+            "cards": (load_razao_social_figure, versao_dados, "cards"),
+            "heatmap_correlacao": (load_razao_social_figure, versao_dados, "heatmap_correlacao"),
+            "mapa_area": (load_map_html, versao_dados, "area"),
+            "mapa_seguros": (load_map_html, versao_dados, "seguros"),
+            "pizza_valor": (load_razao_social_figure, versao_dados, "pizza_valor"),
+            "concentracao": (load_concentration, versao_dados),
+            "heatmap_participacao": (load_razao_social_figure, versao_dados, "heatmap_participacao"),
+            "mensal": (load_monthly_indexes, versao_dados),
+        })
+
+        # ---------------------------
+        # Gráfico de Barras — Razão Social
+        # ---------------------------
+        with span("figura:barras_razao_social"):
+            fig_bar = artefatos["barras"].result()
+        st.plotly_chart(fig_bar, use_container_width=True, key="grafico_bar_razao_social")
+        st.divider()
+
+        # ---------------------------
+        # Cards de métricas
+        # ---------------------------
+        with span("figura:cards"):
+            cards = artefatos["cards"].result()
+        card_seguros = cards["seguros"]
+        card_estados = cards["estados"]
+        card_area = cards["area"]
+
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            st.metric(
+                label=f"Máximo número de seguros - {card_seguros['top']}",
+                value=f"{card_seguros['max']:.0f}",
+                delta=f"{card_seguros['var']:.2f}% em relação à média"
+            )
+        with col2:
+            st.metric(
+                label=f"Máximo Contagem Estados - {card_estados['top']}",
+                value=f"{card_estados['max']:.0f}",
+                delta=f"{card_estados['var']:.2f}% em relação à média"
+            )
+        with col3:
+            st.metric(
+                label=f"Máximo Área Total - {card_area['top']}",
+                value=f"{card_area['max']:.0f}",
+                delta=f"{card_area['var']:.2f}% em relação à média"
+            )
+
+        st.divider()
+
+        # ---------------------------
+        # Cobertura de estados (consulta por bitmask)
+        # ---------------------------
+        with st.expander("Seguradoras presentes em todos os estados selecionados"):
+            estados_consulta = st.multiselect("Estados", UF_SIGLAS, key="estados_cobertura")
+            if estados_consulta:
+                presentes = covers_all(df_razao_social["mask_estados"].to_numpy(), estados_consulta)
+                df_presentes = df_razao_social.loc[presentes, ["NM_RAZAO_SOCIAL", "contagem_estados", "mask_estados"]]
+                df_presentes = df_presentes.assign(
+                    estados=df_presentes["mask_estados"].map(lambda m: ", ".join(decode_uf_mask(m)))
+                ).drop(columns="mask_estados")
+                st.dataframe(df_presentes, hide_index=True, use_container_width=True)
+
+        st.divider()
+
+        # ---------------------------
+        # Heatmap de Correlação
+        # ---------------------------
+        st.subheader('Correlação entre parâmetros')
+        with span("figura:heatmap_correlacao"):
+            fig_heatmap = artefatos["heatmap_correlacao"].result()
+        st.plotly_chart(fig_heatmap, use_container_width=True, key="grafico_heatmap_razao_social")
+
+        # ===========================================================
+        # MAPAS E GRÁFICO DE PIZZA
+        # ===========================================================
+        col1, col2 = st.columns([1, 1])
+
+        # Mapa de área total assegurada
+        with col1:
+            st.subheader('Área Total Assegurada por Estado')
+            with span("mapa:area_build"):
+                html_area = artefatos["mapa_area"].result()
+            with span("mapa:area_render"):
+                components.html(html_area, width=880, height=610)
+
+        # Mapa de número de seguros + gráfico de pizza
+        with col2:
+            st.subheader('Número de Seguros por Estado')
+            with span("mapa:seguros_build"):
+                html_seguros = artefatos["mapa_seguros"].result()
+            with span("mapa:seguros_render"):
+                components.html(html_seguros, width=880, height=610)
+
+            st.markdown("---")
+            st.subheader('Distribuição do Valor Total Assegurado por Razão Social')
+            with span("figura:pizza_valor"):
+                fig_pie_valor = artefatos["pizza_valor"].result()
+            st.plotly_chart(fig_pie_valor, use_container_width=True, key="grafico_pizza_valor_total")
+
+        # ---------------------------
+        # Concentração de mercado (HHI)
+        # ---------------------------
+        st.divider()
+        st.subheader('Concentração de mercado por estado')
+        with span("agregacao:concentracao"):
+            concentracao = artefatos["concentracao"].result()
+
+        st.dataframe(
+            concentracao.hhi_uf.drop(columns="CD_UF"),
+            hide_index=True,
+            use_container_width=True,
+            column_config={
+                "SG_UF_PROPRIEDADE": "Estado",
+                "hhi": st.column_config.NumberColumn("HHI", format="%.0f"),
+                "numero_seguradoras": "Seguradoras",
+                "lider": "Líder",
+                "share_lider": st.column_config.NumberColumn("Participação do líder", format="%.2f"),
+                "classificacao": "Classificação",
+            }
         )
-        fig_pie_valor.update_layout(
-            legend=dict(
-                orientation="h",
-                yanchor="top",
-                y=-0.4,
-                xanchor="center",
-                x=0.5,
-                itemsizing='constant',
-                traceorder='normal',
-                itemclick='toggle',
-                font=dict(size=9),
-                title=None,
-                bgcolor='rgba(255,255,255,0)'
-            ),
-            title=dict(x=0.5, font=dict(size=16))
+
+        with span("figura:heatmap_participacao"):
+            fig_share = artefatos["heatmap_participacao"].result()
+        st.plotly_chart(fig_share, use_container_width=True, key="grafico_share_razao_estado")
+
+        with st.expander("Concentração por cultura"):
+            st.dataframe(concentracao.hhi_cultura.drop(columns="ID_CULTURA"), hide_index=True, use_container_width=True)
+
+        # ---------------------------
+        # Evolução mensal
+        # ---------------------------
+        st.divider()
+        st.subheader('Evolução mensal do valor assegurado')
+        with span("agregacao:mensal"):
+            monthly = artefatos["mensal"].result()
+        if monthly is None:
+            st.info("O dataset carregado não tem datas; rode o pré-processamento novo para ver a série temporal.")
+        else:
+            opcoes_razao = {"Todas": None}
+            opcoes_razao.update(zip(df_razao_social["NM_RAZAO_SOCIAL"], df_razao_social["ID_RAZAO_SOCIAL"]))
+            razao_serie = st.selectbox("Razão Social", list(opcoes_razao), key="razao_serie")
+            if opcoes_razao[razao_serie] is None:
+                render_trend(monthly["total"], None, "Valor total assegurado por mês", "total")
+            else:
+                render_trend(monthly["ID_RAZAO_SOCIAL"], opcoes_razao[razao_serie],
+                             f"Valor assegurado por mês — {razao_serie}", "razao")
+
+    # ===========================================================
+    # LÓGICA DE EXIBIÇÃO — ESTADO
+    # ===========================================================
+    elif analise_tipo == "Estado":
+        st.header('Análise por Estado')
+
+        # ---------------------------
+        # Seleção do estado
+        # ---------------------------
+        ufs_ordem = [int(c) for c in df_estado["CD_UF"]]
+        estado_escolhido = st.sidebar.selectbox(
+            "Selecione um Estado", [UF_SIGLA_BY_CODE[c] for c in ufs_ordem],
+            key="estado_escolhido"
         )
-        st.plotly_chart(fig_pie_valor, use_container_width=True, key="grafico_pizza_valor_total")
+        cd_uf_escolhido = int(UF_CODE_BY_SIGLA[estado_escolhido])
+        top_n = st.sidebar.slider("Número de municípios no ranking", min_value=5, max_value=50, value=10, step=5)
+
+        # ---------------------------
+        # Ranking, correlação e gráficos do estado (cache por UF e top N)
+        # ---------------------------
+        with span("agregacao:estado_escolhido"):
+            estado_view = load_state_view(versao_dados, cd_uf_escolhido, top_n)
+
+        # ---------------------------
+        # Sidebar de informações
+        # ---------------------------
+        st.sidebar.divider()
+        st.sidebar.subheader('Análise exploratória dos dados')
+        st.sidebar.markdown(f'Analisando os dados de área total e prêmio líquido do estado {estado_escolhido}')
+        st.sidebar.markdown(f'Correlação Área x Valor: {estado_view["correlacao"]:.2f}')
+        st.sidebar.divider()
+
+        # ---------------------------
+        # Município escolhido na busca: posição no ranking da UF
+        # ---------------------------
+        municipio_destacado = st.session_state.get("municipio_destacado")
+        if municipio_destacado is not None:
+            df_municipios = load_rankings(versao_dados).municipalities(cd_uf_escolhido, 'area_total')
+            posicao = (df_municipios['CD_MUNICIPIO'] == municipio_destacado).to_numpy().nonzero()[0]
+            if len(posicao):
+                linha = df_municipios.iloc[posicao[0]]
+                st.info(
+                    f"{linha['NM_MUNICIPIO_PROPRIEDADE']}: {posicao[0] + 1}º de {len(df_municipios)} municípios "
+                    f"de {estado_escolhido} em área assegurada ({linha['area_total']:.2f} ha, "
+                    f"R$ {linha['valor_total']:.2f})"
+                )
+
+        # ---------------------------
+        # Criação de colunas para os gráficos
+        # ---------------------------
+        col1, col2 = st.columns(2)
+
+        # ------------------------------------------
+        # Coluna 1 — Top N Municípios com Maior Área
+        # ------------------------------------------
+        with col1:
+            st.plotly_chart(estado_view["fig_top_area"], use_container_width=True, key="grafico_top_area")
+
+        # ------------------------------------------
+        # Coluna 2 — Top N Municípios com Maior Valor Total
+        # ------------------------------------------
+        with col2:
+            st.plotly_chart(estado_view["fig_top_valor"], use_container_width=True, key="grafico_top_valor")
+
+        # ------------------------------------------
+        # Gráfico adicional — Número de seguros por razão social no estado
+        # ------------------------------------------
+        st.plotly_chart(estado_view["fig_seguros_por_razao"], use_container_width=True, key="grafico_estados_seguros")
+
+        # ------------------------------------------
+        # Pré-busca: próxima/anterior no seletor e UFs vizinhas, mesmo top N
+        # ------------------------------------------
+        if prefetcher is not None:
+            candidatas = likely_next_ufs(cd_uf_escolhido, ufs_ordem, load_adjacency())
+            prefetcher.schedule(sessao_id, [(load_state_view, versao_dados, c, top_n) for c in candidatas])
+
+        # ------------------------------------------
+        # Exportação das apólices do estado (exports.py: lotes lidos do parquet)
+        # ------------------------------------------
+        with st.expander(f"Exportar apólices de {estado_escolhido}"):
+            formato_exportacao = st.radio("Formato", list(EXPORT_FORMATS), horizontal=True, key="formato_exportacao")
+            arquivo_exportacao = export_filename(formato_exportacao, "apolices", estado_escolhido)
+            # Com a API no ar e uma URL pública (TERRA_API_PUBLIC_URL) o navegador
+            # baixa direto dela, em fluxo; o host de bind não serve de link
+            link_exportacao = None
+            if api_server is not None:
+                link_exportacao = public_export_url(uf=estado_escolhido, formato=formato_exportacao)
+            if link_exportacao is not None:
+                st.link_button(f"Baixar {arquivo_exportacao}", link_exportacao)
+            elif st.button("Preparar arquivo", key="preparar_exportacao"):
+                # Sem a API o download_button precisa do arquivo inteiro: fica em
+                # memória só o arquivo codificado, nunca uma cópia filtrada do df
+                with span("exportacao:estado"):
+                    dados_exportacao = b"".join(export_rows(
+                        snapshot_files(versao_dados)["dados"], formato_exportacao, uf=estado_escolhido
+                    ))
+                st.download_button(
+                    f"Baixar {arquivo_exportacao}", dados_exportacao,
+                    file_name=arquivo_exportacao, mime=EXPORT_FORMATS[formato_exportacao], key="baixar_exportacao"
+                )
+
+        # ------------------------------------------
+        # Evolução mensal no estado
+        # ------------------------------------------
+        st.divider()
+        st.subheader(f'Evolução mensal do valor assegurado em {estado_escolhido}')
+        with span("agregacao:mensal"):
+            monthly = load_monthly_indexes(versao_dados)
+        if monthly is None:
+            st.info("O dataset carregado não tem datas; rode o pré-processamento novo para ver a série temporal.")
+        else:
+            render_trend(monthly["CD_UF"], cd_uf_escolhido,
+                         f"Valor assegurado por mês em {estado_escolhido}", "estado")
 
-# ===========================================================
-# LÓGICA DE EXIBIÇÃO — ESTADO
-# ===========================================================
-else:
-    st.header('Análise por Estado')
-
-    # ---------------------------
-    # Seleção do estado
-    # ---------------------------
-    estado_escolhido = st.sidebar.selectbox(
-        "Selecione um Estado", df["SG_UF_PROPRIEDADE"].unique()
-    )
-
-    # ---------------------------
-    # Filtrar dados para o estado selecionado
-    # ---------------------------
-    df_estado = df_razao_social_estado[
-        df_razao_social_estado['SG_UF_PROPRIEDADE'] == estado_escolhido
-    ]
-
-    # ---------------------------
-    # Ajuste por município (top 10)
-    # ---------------------------
-    df_municipio = (
-        df[df['SG_UF_PROPRIEDADE'] == estado_escolhido]
-        .groupby('NM_MUNICIPIO_PROPRIEDADE', as_index=False)
-        .agg(
-            area_total=('NR_AREA_TOTAL', 'sum'),
-            valor_total=('VL_PREMIO_LIQUIDO', 'sum')
+    # ===========================================================
+    # LÓGICA DE EXIBIÇÃO — AUDITORIA
+    # ===========================================================
+    elif analise_tipo == "Auditoria":
+        st.header('Auditoria — apólices atípicas')
+        st.markdown(
+            f'Prêmio por hectare, taxa e produtividade segurada de cada apólice comparados com os das '
+            f'apólices do mesmo município e cultura (ou da UF, se o município tiver poucas) pelo z-score '
+            f'robusto (mediana e MAD). Marcadas: |z| acima de {Z_THRESHOLD}.'
         )
-        .reset_index(drop=True)
-    )
-
-    df_top_area = df_municipio.nlargest(10, 'area_total')
-    df_top_valor = df_municipio.nlargest(10, 'valor_total')
-
-    # Combinar top 10 de área e valor em uma lista única
-    df_top_combined = pd.concat([df_top_area, df_top_valor]).drop_duplicates()
-
-    # Correlação entre área total e valor total
-    correlation_top_municipios = df_top_combined[['area_total', 'valor_total']].corr().iloc[0, 1]
-
-    # ---------------------------
-    # Sidebar de informações
-    # ---------------------------
-    st.sidebar.divider()
-    st.sidebar.subheader('Análise exploratória dos dados')
-    st.sidebar.markdown(f'Analisando os dados de área total e prêmio líquido do estado {estado_escolhido}')
-    st.sidebar.markdown(f'Correlação Área x Valor: {correlation_top_municipios:.2f}')
-    st.sidebar.divider()
-
-    # ---------------------------
-    # Criação de colunas para os gráficos
-    # ---------------------------
-    col1, col2 = st.columns(2)
-
-    # ------------------------------------------
-    # Coluna 1 — Top 10 Municípios com Maior Área
-    # ------------------------------------------
-    with col1:
-        fig_top_area = px.bar(
-            df_top_area,
-            x='NM_MUNICIPIO_PROPRIEDADE',
-            y='area_total',
-            title=f'Top 10 Municípios com Maior Área em {estado_escolhido}',
-            labels={'NM_MUNICIPIO_PROPRIEDADE': 'Município', 'area_total': 'Área Total (ha)'},
-            text_auto='.2s'
+
+        # Resultados pré-calculados (colunas gravadas pelo pré-processamento)
+        with span("auditoria:load_outliers"):
+            auditoria = load_outliers(versao_dados)
+        df_atipicas = auditoria["tabela"]
+
+        st.subheader('Fração de apólices atípicas por estado')
+        with span("mapa:atipicas_build"):
+            html_atipicas = load_outlier_map_html(versao_dados)
+        with span("mapa:atipicas_render"):
+            components.html(html_atipicas, width=880, height=610)
+
+        # ---------------------------
+        # Tabela das apólices marcadas (mais atípicas primeiro)
+        # ---------------------------
+        col1, col2 = st.columns(2)
+        uf_auditoria = col1.selectbox(
+            "Estado", ["Todos"] + sorted(df_atipicas["SG_UF_PROPRIEDADE"].dropna().unique()), key="auditoria_uf"
         )
-        fig_top_area.update_layout(xaxis_tickangle=-45)
-        st.plotly_chart(fig_top_area, use_container_width=True, key="grafico_top_area")
-
-    # ------------------------------------------
-    # Coluna 2 — Top 10 Municípios com Maior Valor Total
-    # ------------------------------------------
-    with col2:
-        fig_top_valor = px.bar(
-            df_top_valor,
-            x='NM_MUNICIPIO_PROPRIEDADE',
-            y='valor_total',
-            title=f'Top 10 Municípios com Maior Valor Total em {estado_escolhido}',
-            labels={'NM_MUNICIPIO_PROPRIEDADE': 'Município', 'valor_total': 'Valor Total (R$)'},
-            text_auto='.2s'
+        medida_auditoria = col2.selectbox("Medida que mais desvia", ["Todas"] + list(OUTLIER_MEASURES),
+                                          key="auditoria_medida")
+        if uf_auditoria != "Todos":
+            df_atipicas = df_atipicas[df_atipicas["SG_UF_PROPRIEDADE"] == uf_auditoria]
+        if medida_auditoria != "Todas":
+            df_atipicas = df_atipicas[df_atipicas["MEDIDA"] == medida_auditoria]
+        LINHAS_AUDITORIA = 500
+        st.caption(f"{len(df_atipicas)} apólices marcadas; exibindo as {min(LINHAS_AUDITORIA, len(df_atipicas))} "
+                   f"mais atípicas")
+        st.dataframe(
+            df_atipicas.head(LINHAS_AUDITORIA),
+            hide_index=True,
+            use_container_width=True,
+            column_config={
+                c: st.column_config.NumberColumn(format="%.2f") for c in df_atipicas.columns if c.startswith("Z_")
+            }
         )
-        fig_top_valor.update_layout(xaxis_tickangle=-45)
-        st.plotly_chart(fig_top_valor, use_container_width=True, key="grafico_top_valor")
-
-    # ------------------------------------------
-    # Gráfico adicional — Número de seguros por razão social no estado
-    # ------------------------------------------
-    fig_bar_estados_seguros = px.bar(
-        df_estado,
-        x='NM_RAZAO_SOCIAL',
-        y='numero_seguros',
-        title=f'Número de seguros em {estado_escolhido} por razão social',
-        labels={'NM_RAZAO_SOCIAL': 'Razão Social', 'numero_seguros': 'Número de seguros'},
-        text_auto='.2s'
-    )
-    fig_bar_estados_seguros.update_layout(xaxis_tickangle=-45)
-    st.plotly_chart(fig_bar_estados_seguros, use_container_width=True, key="grafico_estados_seguros")
+
+    # ===========================================================
+    # LÓGICA DE EXIBIÇÃO — DADOS BRUTOS
+    # ===========================================================
+    else:
+        st.header('Dados brutos')
+
+        # ---------------------------
+        # Ordenação e filtros (executados no servidor, sobre índices por coluna)
+        # ---------------------------
+        colunas = explorer_columns(df)
+        colunas_faixa = [c for c in colunas if is_range_column(df[c])]
+        colunas_texto = [c for c in colunas if c not in colunas_faixa]
+        filtros = []
+        with st.sidebar:
+            ordenar_por = st.selectbox("Ordenar por", ["(ordem original)"] + colunas, key="explorar_ordem")
+            decrescente = st.toggle("Decrescente", key="explorar_decrescente")
+            coluna_texto = st.selectbox("Filtrar texto em", colunas_texto, key="explorar_coluna_texto")
+            termo = st.text_input("Contém", key="explorar_termo").strip()
+            if termo:
+                filtros.append(("texto", coluna_texto, termo))
+            coluna_faixa = st.selectbox("Filtrar faixa de", ["(nenhuma)"] + colunas_faixa, key="explorar_coluna_faixa")
+            if coluna_faixa != "(nenhuma)":
+                minimo = st.number_input("Mínimo", value=None, key="explorar_minimo")
+                maximo = st.number_input("Máximo", value=None, key="explorar_maximo")
+                if minimo is not None or maximo is not None:
+                    filtros.append(("faixa", coluna_faixa, minimo, maximo))
+
+        with span("explorador:consulta"):
+            ordem = load_explorer_order(
+                versao_dados, None if ordenar_por == "(ordem original)" else ordenar_por, decrescente, tuple(filtros)
+            )
+
+        # ---------------------------
+        # Página visível (o navegador nunca recebe mais que isso)
+        # ---------------------------
+        col1, col2 = st.columns([1, 3])
+        por_pagina = col1.selectbox("Linhas por página", PAGE_SIZES, key="explorar_por_pagina")
+        paginas = max(1, math.ceil(len(ordem) / por_pagina))
+        # Filtro novo pode encolher o total: a página guardada volta para a última
+        if st.session_state.get("explorar_pagina", 1) > paginas:
+            st.session_state["explorar_pagina"] = paginas
+        pagina = col2.number_input(f"Página (de {paginas})", min_value=1, max_value=paginas, step=1, key="explorar_pagina")
+
+        with span("explorador:pagina"):
+            df_pagina = page(df, ordem, pagina - 1, por_pagina, colunas)
+        inicio = (pagina - 1) * por_pagina
+        st.caption(f"Linhas {min(inicio + 1, len(ordem))}–{inicio + len(df_pagina)} de {len(ordem)} "
+                   f"({len(df)} no dataset)")
+        st.dataframe(df_pagina, hide_index=True, use_container_width=True)
+
+    # ===========================================================
+    # PAINEL DE DEBUG — TEMPO POR SEÇÃO
+    # ===========================================================
+    if debug_mode:
+        with st.sidebar:
+            st.divider()
+            st.subheader("Debug — tempo por seção")
+            st.toggle("Capturar perfil por amostragem", key="capturar_perfil")
+            st.caption(f"Rerun {rerun_timer.rerun_id}: {rerun_timer.total() * 1000:.0f} ms até aqui")
+            st.caption(f"Snapshot de dados: {versao_dados}")
+            df_spans = pd.DataFrame(rerun_timer.breakdown())
+            if not df_spans.empty:
+                st.bar_chart(df_spans.set_index("secao")["duracao_ms"], horizontal=True)
+                st.dataframe(
+                    df_spans,
+                    hide_index=True,
+                    use_container_width=True,
+                    column_config={
+                        "secao": "Seção",
+                        "inicio_ms": st.column_config.NumberColumn("Início (ms)", format="%.1f"),
+                        "duracao_ms": st.column_config.NumberColumn("Duração (ms)", format="%.1f"),
+                    }
+                )
+
+            st.subheader("Debug — cache")
+            st.caption(
+                f"{CACHE.used_bytes / 2**20:.1f} MB de {CACHE.budget_bytes / 2**20:.0f} MB "
+                f"(TERRA_CACHE_BUDGET_MB)"
+            )
+            st.dataframe(
+                CACHE.report(),
+                hide_index=True,
+                use_container_width=True,
+                column_config={"mb": st.column_config.NumberColumn("MB", format="%.2f")}
+            )
+            disco = disk_store()
+            if disco is not None:
+                entradas_disco = disco.summary()
+                st.caption(
+                    f"Disco ({disco.path}): {sum(n for _, n, _ in entradas_disco)} entradas, "
+                    f"{sum(b for _, _, b in entradas_disco) / 2**20:.1f} MB"
+                )
+            if prefetcher is not None:
+                st.caption("Pré-busca: " + ", ".join(f"{k} {v}" for k, v in sorted(prefetcher.stats.items())))
+            if rerun_profiler is not None:
+                rerun_profiler.stop()
+                st.download_button(
+                    f"Baixar perfil ({rerun_profiler.samples} amostras)",
+                    rerun_profiler.collapsed(),
+                    file_name=f"perfil_{rerun_timer.rerun_id}.txt",
+                    help="Pilhas no formato collapsed (speedscope / flamegraph.pl)"
+                )
+finally:
+    # Uma exceção (ou st.stop/st.rerun) numa visão não deixa o amostrador rodando
+    if rerun_profiler is not None:
+        rerun_profiler.stop()
+
 
 import streamlit as st
 import logging
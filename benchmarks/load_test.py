@@ -0,0 +1,275 @@
+### benchmarks/load_test.py
+# Teste de carga com várias sessões simultâneas contra um servidor local.
+#
+# Uso (na raiz do repositório):
+#   python -m benchmarks.load_test --sessions 1 4 8 16 --output carga.json
+#
+# Sobe "streamlit run appv1.2.py" numa porta livre e abre N sessões pelo
+# mesmo websocket que o navegador usa (/_stcore/stream), trocando BackMsg /
+# ForwardMsg em protobuf. Cada sessão executa um roteiro de interações
+# (carregar, ir para "Estado", percorrer UFs, voltar e trocar métricas) e
+# cada rerun é medido do envio do BackMsg até o script_finished.
+# Para cada número de sessões o relatório traz vazão (reruns/s), latência
+# p50/p95/p99 e o pico de RSS do servidor.
+
+import argparse
+import asyncio
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import threading
+import time
+import urllib.request
+
+from streamlit.proto.BackMsg_pb2 import BackMsg
+from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+from streamlit.proto.WidgetStates_pb2 import WidgetState
+from tornado.websocket import websocket_connect
+
+from benchmarks.pipeline import environment_info
+
+APP_PATH = 'appv1.2.py'
+
+ANALISE_LABEL = 'Selecione o tipo de análise'
+METRICA_LABEL = 'Selecione a Métrica'
+ESTADO_LABEL = 'Selecione um Estado'
+
+
+# ---------------------------
+# Servidor local
+# ---------------------------
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def start_server(port: int, extra_env: dict = None) -> subprocess.Popen:
+    """
+    Sobe o app em modo headless e espera o /_stcore/health responder.
+    """
+    env = dict(os.environ, **(extra_env or {}))
+    proc = subprocess.Popen(
+        [sys.executable, '-m', 'streamlit', 'run', APP_PATH,
+         '--server.headless', 'true',
+         '--server.port', str(port),
+         '--server.address', '127.0.0.1',
+         '--server.fileWatcherType', 'none',
+         '--browser.gatherUsageStats', 'false'],
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, env=env,
+    )
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError('o servidor streamlit terminou durante a inicialização')
+        try:
+            with urllib.request.urlopen(f'http://127.0.0.1:{port}/_stcore/health', timeout=1):
+                return proc
+        except OSError:
+            time.sleep(0.2)
+    proc.kill()
+    raise RuntimeError('o servidor streamlit não respondeu em 60 s')
+
+
+def read_rss_mb(pid: int) -> float:
+    """
+    RSS atual do processo em MB (psutil se existir; senão /proc no Linux).
+    """
+    try:
+        import psutil
+        return psutil.Process(pid).memory_info().rss / 2**20
+    except ImportError:
+        with open(f'/proc/{pid}/status', encoding='ascii') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) / 1024
+    return float('nan')
+
+
+class RssSampler(threading.Thread):
+    """
+    Amostra o RSS do servidor em segundo plano e guarda o pico.
+    """
+
+    def __init__(self, pid: int, interval: float = 0.1):
+        super().__init__(daemon=True)
+        self.pid, self.interval = pid, interval
+        self.peak_mb = 0.0
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.is_set():
+            self.peak_mb = max(self.peak_mb, read_rss_mb(self.pid))
+            self._stop_event.wait(self.interval)
+
+    def stop(self) -> float:
+        self._stop_event.set()
+        self.join()
+        return self.peak_mb
+
+
+# ---------------------------
+# Sessão simulada (protocolo do navegador)
+# ---------------------------
+class SimulatedSession:
+    """
+    Uma aba do navegador: mantém os estados dos widgets e mede cada rerun.
+    """
+
+    def __init__(self, url: str):
+        self.url = url
+        self.widgets = {}        # label -> (id, opções)
+        self.states = {}         # id -> WidgetState
+        self.latencies = []
+        self.errors = 0
+
+    async def connect(self):
+        self.conn = await websocket_connect(self.url, subprotocols=['streamlit'])
+
+    async def rerun(self):
+        """Envia rerun_script com os estados atuais e espera o script_finished."""
+        msg = BackMsg()
+        msg.rerun_script.query_string = ''
+        msg.rerun_script.page_script_hash = ''
+        msg.rerun_script.widget_states.widgets.extend(self.states.values())
+        start = time.perf_counter()
+        await self.conn.write_message(msg.SerializeToString(), binary=True)
+        while True:
+            raw = await self.conn.read_message()
+            if raw is None:
+                raise ConnectionError('websocket fechado pelo servidor')
+            fwd = ForwardMsg()
+            fwd.ParseFromString(raw)
+            kind = fwd.WhichOneof('type')
+            if kind == 'delta':
+                self._collect_widget(fwd.delta)
+            elif kind == 'script_finished':
+                if fwd.script_finished != ForwardMsg.FINISHED_EARLY_FOR_RERUN:
+                    break
+        self.latencies.append(time.perf_counter() - start)
+
+    def _collect_widget(self, delta):
+        if delta.WhichOneof('type') != 'new_element':
+            return
+        element = delta.new_element
+        kind = element.WhichOneof('type')
+        if kind == 'exception':
+            self.errors += 1
+        elif kind == 'selectbox':
+            self.widgets[element.selectbox.label] = (element.selectbox.id, list(element.selectbox.options))
+
+    async def select(self, label: str, option=None, index: int = None):
+        """Escolhe uma opção de selectbox (por valor ou índice) e faz o rerun."""
+        widget_id, options = self.widgets[label]
+        state = WidgetState(id=widget_id)
+        state.int_value = options.index(option) if option is not None else index
+        self.states[widget_id] = state
+        await self.rerun()
+
+    async def close(self):
+        self.conn.close()
+
+
+async def interaction_script(session: SimulatedSession, n_ufs: int):
+    """
+    Roteiro de uma sessão: carga inicial, Estado + n_ufs UFs, volta para
+    Razão Social e percorre as métricas.
+    """
+    await session.connect()
+    try:
+        await session.rerun()
+        await session.select(ANALISE_LABEL, 'Estado')
+        ufs = session.widgets[ESTADO_LABEL][1]
+        for i in range(1, min(n_ufs, len(ufs))):
+            await session.select(ESTADO_LABEL, index=i)
+        await session.select(ANALISE_LABEL, 'Razão Social')
+        for i in range(1, len(session.widgets[METRICA_LABEL][1])):
+            await session.select(METRICA_LABEL, index=i)
+    finally:
+        await session.close()
+
+
+# ---------------------------
+# Rodada com N sessões
+# ---------------------------
+def percentile(sorted_values: list, q: float) -> float:
+    if not sorted_values:
+        return float('nan')
+    k = (len(sorted_values) - 1) * q
+    lo, hi = int(k), min(int(k) + 1, len(sorted_values) - 1)
+    return sorted_values[lo] + (sorted_values[hi] - sorted_values[lo]) * (k - lo)
+
+
+async def run_level(url: str, n_sessions: int, n_ufs: int) -> dict:
+    sessions = [SimulatedSession(url) for _ in range(n_sessions)]
+    start = time.perf_counter()
+    outcomes = await asyncio.gather(*(interaction_script(s, n_ufs) for s in sessions),
+                                    return_exceptions=True)
+    elapsed = time.perf_counter() - start
+    latencies = sorted(l for s in sessions for l in s.latencies)
+    return {
+        'sessions': n_sessions,
+        'reruns': len(latencies),
+        'duration_s': elapsed,
+        'throughput_rps': len(latencies) / elapsed if elapsed else 0.0,
+        'p50_s': percentile(latencies, 0.50),
+        'p95_s': percentile(latencies, 0.95),
+        'p99_s': percentile(latencies, 0.99),
+        'mean_s': statistics.fmean(latencies) if latencies else float('nan'),
+        'app_exceptions': sum(s.errors for s in sessions),
+        'failed_sessions': sum(isinstance(o, Exception) for o in outcomes),
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description='Teste de carga do painel com sessões simultâneas.')
+    parser.add_argument('--sessions', type=int, nargs='+', default=[1, 2, 4, 8, 16],
+                        help='números de sessões simultâneas a testar, em ordem')
+    parser.add_argument('--ufs', type=int, default=5, help='UFs visitadas por sessão')
+    parser.add_argument('--port', type=int, help='porta do servidor (padrão: livre)')
+    parser.add_argument('--url', help='usar um servidor já em execução (ws://host:porta/_stcore/stream)')
+    parser.add_argument('--pid', type=int, help='PID do servidor externo, para medir o RSS')
+    parser.add_argument('--output', help='arquivo JSON de saída (padrão: stdout)')
+    args = parser.parse_args(argv)
+
+    proc = None
+    if args.url:
+        url, pid = args.url, args.pid
+    else:
+        port = args.port or _free_port()
+        proc = start_server(port)
+        url, pid = f'ws://127.0.0.1:{port}/_stcore/stream', proc.pid
+
+    levels = []
+    try:
+        for n in args.sessions:
+            sampler = RssSampler(pid) if pid else None
+            if sampler:
+                sampler.start()
+            level = asyncio.run(run_level(url, n, args.ufs))
+            level['server_rss_peak_mb'] = sampler.stop() if sampler else None
+            levels.append(level)
+            print(f'{n:>3} sessões: {level["throughput_rps"]:6.2f} reruns/s | '
+                  f'p50 {level["p50_s"] * 1000:8.1f} ms | p95 {level["p95_s"] * 1000:8.1f} ms | '
+                  f'p99 {level["p99_s"] * 1000:8.1f} ms | RSS {level["server_rss_peak_mb"] or 0:7.1f} MB',
+                  file=sys.stderr)
+    finally:
+        if proc:
+            proc.terminate()
+            proc.wait(timeout=30)
+
+    document = {'meta': environment_info(seed=None), 'levels': levels}
+    text = json.dumps(document, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(text)
+    else:
+        print(text)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,240 @@
+### benchmarks/pipeline.py
+# Benchmark das etapas do painel sobre dados sintéticos em várias escalas.
+#
+# Uso (na raiz do repositório):
+#   python -m benchmarks.pipeline --scales 1 10 --repeat 5 --output bench.json
+#   python -m benchmarks.pipeline --scales 1 10 --compare bench.json
+#
+# Cada etapa (leitura do parquet, cada agregação, ramo "Estado", construção
+# dos mapas...) é medida separadamente. O resultado sai em JSON; com
+# --compare, etapas com mediana acima de (1 + threshold) x a referência são
+# listadas como regressão e o processo termina com código 1.
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+
+import aggregates
+import figures
+from benchmarks.synthetic import write_synthetic_dataset
+from concentration import build_concentration
+from dimensions import read_states_geojson
+from rankings import MunicipalityRanking, build_municipality_ranking
+from timeseries import MonthlyIndex, build_monthly_bins
+
+GEOJSON_PATH = 'assets/BR_UF_2024_Filtrado.geojson'  # bruto: sempre presente no repositório
+
+
+# ---------------------------
+# Contexto compartilhado entre etapas
+# ---------------------------
+class BenchContext:
+    """
+    Guarda os insumos de cada etapa (calculados fora da medição), para que
+    cada etapa meça só o próprio trabalho.
+    """
+
+    def __init__(self, parquet_path: str, geo_data):
+        self.parquet_path = parquet_path
+        self.geo_data = geo_data
+        self.df, self.dims = aggregates.load_dataset(parquet_path)
+        self.df_estado = aggregates.aggregate_by_state(self.df, self.dims)
+        self.df_razao_social = aggregates.aggregate_by_insurer(self.df, self.dims)
+        self.df_razao_social_estado = aggregates.aggregate_by_insurer_state(self.df, self.dims)
+        self.df_razao_social_cultura = aggregates.aggregate_by_insurer_culture(self.df, self.dims)
+        self.ranking = MunicipalityRanking(build_municipality_ranking(self.df, self.dims))
+        self.monthly_bins = build_monthly_bins(self.df)
+        self.monthly = MonthlyIndex(self.monthly_bins, 'CD_UF')
+
+
+def _estado_branch(ctx: BenchContext):
+    """Ramo "Estado" para todas as UFs: ranking, correlação e filtro por UF."""
+    for cd_uf in ctx.ranking.ufs():
+        ctx.ranking.top(cd_uf, 10, 'area_total')
+        ctx.ranking.top(cd_uf, 10, 'valor_total')
+        combined = ctx.ranking.combined_top(cd_uf, 10)
+        combined[['area_total', 'valor_total']].corr()
+        ctx.df_razao_social_estado[ctx.df_razao_social_estado['CD_UF'] == cd_uf]
+
+
+def _monthly_range_queries(ctx: BenchContext):
+    """1.000 consultas de intervalo por UF (mover o slider)."""
+    for cd_uf in ctx.ranking.ufs():
+        bounds = ctx.monthly.month_range(cd_uf)
+        if bounds is None:
+            continue
+        lo, hi = bounds
+        for k in range(1000):
+            ctx.monthly.range_total(lo + k % 7, hi - k % 5, cd_uf)
+
+
+def _maps(ctx: BenchContext):
+    """Os dois mapas coropléticos, até o HTML final."""
+    figures.map_html(figures.area_map(ctx.geo_data, ctx.df_estado))
+    figures.map_html(figures.seguros_map(ctx.geo_data, ctx.df_estado))
+
+
+def _razao_social_figures(ctx: BenchContext):
+    """Gráficos plotly do ramo "Razão Social", serializados como o Streamlit faz."""
+    for column, label in [('numero_seguros', 'Número de Seguros'),
+                          ('contagem_estados', 'Contagem de Estados'),
+                          ('area_total', 'Área Total')]:
+        figures.bar_by_insurer(ctx.df_razao_social, column, label).to_json()
+    figures.pie_valor(ctx.df_razao_social).to_json()
+    figures.correlation_heatmap(aggregates.correlation_matrix(ctx.df)).to_json()
+
+
+# Etapas medidas: nome -> função(ctx)
+STAGES = {
+    'load_data': lambda ctx: aggregates.load_dataset(ctx.parquet_path),
+    'aggregate_by_state': lambda ctx: aggregates.aggregate_by_state(ctx.df, ctx.dims),
+    'aggregate_by_insurer': lambda ctx: aggregates.aggregate_by_insurer(ctx.df, ctx.dims),
+    'aggregate_by_insurer_state': lambda ctx: aggregates.aggregate_by_insurer_state(ctx.df, ctx.dims),
+    'aggregate_by_insurer_culture': lambda ctx: aggregates.aggregate_by_insurer_culture(ctx.df, ctx.dims),
+    'correlation_matrix': lambda ctx: aggregates.correlation_matrix(ctx.df),
+    'concentration': lambda ctx: build_concentration(ctx.df_razao_social_estado, ctx.df_razao_social_cultura),
+    'ranking_build': lambda ctx: MunicipalityRanking(build_municipality_ranking(ctx.df, ctx.dims)),
+    'estado_branch_all_ufs': _estado_branch,
+    'monthly_bins': lambda ctx: build_monthly_bins(ctx.df),
+    'monthly_range_queries': _monthly_range_queries,
+    'maps': _maps,
+    'razao_social_figures': _razao_social_figures,
+}
+
+
+# ---------------------------
+# Medição
+# ---------------------------
+def time_stage(fn, ctx, repeat: int, warmup: int = 1) -> dict:
+    """
+    Executa fn(ctx) warmup vezes sem medir e repeat vezes medindo (segundos).
+    """
+    for _ in range(warmup):
+        fn(ctx)
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(ctx)
+        samples.append(time.perf_counter() - start)
+    return {
+        'repeat': repeat,
+        'min_s': min(samples),
+        'median_s': statistics.median(samples),
+        'mean_s': statistics.fmean(samples),
+        'stdev_s': statistics.stdev(samples) if len(samples) > 1 else 0.0,
+    }
+
+
+def run(scales, repeat: int, stages=None, seed: int = 0, workdir: str = None) -> dict:
+    """
+    Roda as etapas em cada escala e devolve o documento de resultados.
+    """
+    geo_data = read_states_geojson(GEOJSON_PATH)
+
+    selected = {name: fn for name, fn in STAGES.items() if not stages or name in stages}
+    results = []
+    with tempfile.TemporaryDirectory(dir=workdir) as tmp:
+        for scale in scales:
+            folder = os.path.join(tmp, f'scale_{scale:g}')
+            t0 = time.perf_counter()
+            path = write_synthetic_dataset(folder, scale=scale, seed=seed)
+            ctx = BenchContext(path, geo_data)
+            print(f'[escala {scale:g}x] {len(ctx.df):,} linhas geradas em '
+                  f'{time.perf_counter() - t0:.1f}s', file=sys.stderr)
+            for name, fn in selected.items():
+                stats = time_stage(fn, ctx, repeat)
+                stats.update(stage=name, scale=scale, rows=len(ctx.df))
+                results.append(stats)
+                print(f'  {name:<30} mediana {stats["median_s"] * 1000:10.2f} ms', file=sys.stderr)
+    return {'meta': environment_info(seed), 'results': results}
+
+
+def environment_info(seed: int) -> dict:
+    """
+    Metadados do ambiente, para saber se duas rodadas são comparáveis.
+    """
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'],
+                                capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        'timestamp': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'commit': commit,
+        'seed': seed,
+        'python': platform.python_version(),
+        'pandas': pd.__version__,
+        'numpy': np.__version__,
+        'machine': platform.machine(),
+        'processor': platform.processor(),
+        'cpu_count': os.cpu_count(),
+    }
+
+
+# ---------------------------
+# Comparação entre rodadas
+# ---------------------------
+def compare(current: dict, baseline: dict, threshold: float) -> list:
+    """
+    Lista (etapa, escala, mediana base, mediana atual, razão) das etapas que
+    ficaram mais lentas que (1 + threshold) x a referência.
+    """
+    reference = {(r['stage'], r['scale']): r['median_s'] for r in baseline['results']}
+    regressions = []
+    for r in current['results']:
+        base = reference.get((r['stage'], r['scale']))
+        if base is None or base == 0:
+            continue
+        ratio = r['median_s'] / base
+        if ratio > 1 + threshold:
+            regressions.append((r['stage'], r['scale'], base, r['median_s'], ratio))
+    return regressions
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description='Benchmark das etapas do painel com dados sintéticos.')
+    parser.add_argument('--scales', type=float, nargs='+', default=[1, 10],
+                        help='escalas em relação ao volume atual (ex.: 1 10 100)')
+    parser.add_argument('--repeat', type=int, default=5, help='repetições medidas por etapa')
+    parser.add_argument('--stages', nargs='+', choices=sorted(STAGES), help='somente estas etapas')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help='arquivo JSON de saída (padrão: stdout)')
+    parser.add_argument('--compare', help='JSON de referência para detectar regressões')
+    parser.add_argument('--threshold', type=float, default=0.2,
+                        help='tolerância relativa na comparação (0.2 = 20%%)')
+    parser.add_argument('--workdir', help='pasta para os parquets temporários')
+    args = parser.parse_args(argv)
+
+    document = run(args.scales, args.repeat, args.stages, args.seed, args.workdir)
+    text = json.dumps(document, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(text)
+    else:
+        print(text)
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            baseline = json.load(f)
+        regressions = compare(document, baseline, args.threshold)
+        for stage, scale, base, current, ratio in regressions:
+            print(f'REGRESSÃO {stage} @ {scale:g}x: {base * 1000:.2f} ms -> '
+                  f'{current * 1000:.2f} ms ({ratio:.2f}x)', file=sys.stderr)
+        if regressions:
+            return 1
+        print('Sem regressões acima do limite.', file=sys.stderr)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,178 @@
+### benchmarks/reruns.py
+# Latência de rerun de ponta a ponta do appv1.2.py com streamlit AppTest.
+#
+# Uso (na raiz do repositório):
+#   python -m benchmarks.reruns --output reruns.json
+#   python -m benchmarks.reruns --scenarios uf_sweep --compare reruns.json
+#
+# Cada cenário é uma sequência de interações reais (trocar o tipo de análise,
+# percorrer as métricas, passar por todas as UFs). Para cada rerun medimos o
+# tempo de parede e o pico de memória alocada (tracemalloc). Cada cenário roda
+# duas vezes: "cold" (caches do Streamlit, do cache_manager e do disco limpos
+# antes da primeira execução) e "warm" (nova sessão com os caches já
+# populados pela rodada anterior).
+
+import argparse
+import json
+import statistics
+import sys
+import time
+import tracemalloc
+
+import streamlit as st
+from streamlit.testing.v1 import AppTest
+
+from benchmarks.pipeline import compare, environment_info
+from cache_manager import CACHE, disk_store
+
+APP_PATH = 'appv1.2.py'
+
+ANALISE_LABEL = 'Selecione o tipo de análise'
+METRICA_LABEL = 'Selecione a Métrica'
+ESTADO_LABEL = 'Selecione um Estado'
+
+
+def _selectbox(at: AppTest, label: str):
+    for widget in at.selectbox:
+        if widget.label == label:
+            return widget
+    raise LookupError(f'selectbox "{label}" não encontrado')
+
+
+# ---------------------------
+# Cenários: geradores de passos (nome do passo, ação sobre o AppTest)
+# ---------------------------
+def scenario_analysis_switch(at: AppTest, rounds: int = 3):
+    """Alterna entre "Razão Social" e "Estado"."""
+    for i in range(rounds):
+        for tipo in ['Estado', 'Razão Social']:
+            yield f'analise={tipo}#{i}', lambda tipo=tipo: _selectbox(at, ANALISE_LABEL).select(tipo)
+
+
+def scenario_metric_cycle(at: AppTest):
+    """Percorre todas as métricas do ramo "Razão Social"."""
+    for metrica in _selectbox(at, METRICA_LABEL).options:
+        yield f'metrica={metrica}', lambda metrica=metrica: _selectbox(at, METRICA_LABEL).select(metrica)
+
+
+def scenario_uf_sweep(at: AppTest):
+    """Entra no ramo "Estado" e passa por todas as UFs do selectbox."""
+    yield 'analise=Estado', lambda: _selectbox(at, ANALISE_LABEL).select('Estado')
+    for uf in _selectbox(at, ESTADO_LABEL).options:
+        yield f'uf={uf}', lambda uf=uf: _selectbox(at, ESTADO_LABEL).select(uf)
+
+
+SCENARIOS = {
+    'analysis_switch': scenario_analysis_switch,
+    'metric_cycle': scenario_metric_cycle,
+    'uf_sweep': scenario_uf_sweep,
+}
+
+
+# ---------------------------
+# Medição de um rerun
+# ---------------------------
+def measure_run(at: AppTest, step: str, track_memory: bool) -> dict:
+    """
+    Executa at.run() e devolve tempo de parede e pico de memória do rerun.
+    """
+    if track_memory:
+        tracemalloc.reset_peak()
+        base = tracemalloc.get_traced_memory()[0]
+    start = time.perf_counter()
+    at.run()
+    elapsed = time.perf_counter() - start
+    if at.exception:
+        raise RuntimeError(f'{step}: {at.exception[0].message}')
+    sample = {'step': step, 'wall_s': elapsed}
+    if track_memory:
+        sample['peak_alloc_mb'] = (tracemalloc.get_traced_memory()[1] - base) / 2**20
+    return sample
+
+
+def run_scenario(name: str, cold: bool, timeout: float, track_memory: bool) -> list:
+    """
+    Nova sessão do app + sequência do cenário; devolve as amostras por rerun.
+    """
+    if cold:
+        st.cache_data.clear()
+        st.cache_resource.clear()
+        CACHE.clear()
+        if disk_store() is not None:
+            disk_store().clear()
+    at = AppTest.from_file(APP_PATH, default_timeout=timeout)
+    samples = [measure_run(at, 'initial', track_memory)]
+    for step, action in SCENARIOS[name](at):
+        action()
+        samples.append(measure_run(at, step, track_memory))
+    return samples
+
+
+def summarize(name: str, cache: str, samples: list) -> dict:
+    """
+    Estatísticas do cenário no mesmo formato dos resultados de benchmarks.pipeline.
+    """
+    walls = sorted(s['wall_s'] for s in samples)
+    result = {
+        'stage': f'{name}:{cache}',
+        'scale': 1,
+        'repeat': len(walls),
+        'first_s': samples[0]['wall_s'],
+        'min_s': walls[0],
+        'median_s': statistics.median(walls),
+        'mean_s': statistics.fmean(walls),
+        'p95_s': walls[min(len(walls) - 1, int(round(0.95 * (len(walls) - 1))))],
+        'max_s': walls[-1],
+        'steps': samples,
+    }
+    if 'peak_alloc_mb' in samples[0]:
+        result['max_peak_alloc_mb'] = max(s['peak_alloc_mb'] for s in samples)
+    return result
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description='Latência de rerun do painel com AppTest.')
+    parser.add_argument('--scenarios', nargs='+', choices=sorted(SCENARIOS), default=sorted(SCENARIOS))
+    parser.add_argument('--timeout', type=float, default=300, help='timeout de cada rerun (s)')
+    parser.add_argument('--no-memory', action='store_true',
+                        help='não rastrear memória (tracemalloc deixa os reruns mais lentos)')
+    parser.add_argument('--output', help='arquivo JSON de saída (padrão: stdout)')
+    parser.add_argument('--compare', help='JSON de referência para detectar regressões')
+    parser.add_argument('--threshold', type=float, default=0.2)
+    args = parser.parse_args(argv)
+
+    track_memory = not args.no_memory
+    if track_memory:
+        tracemalloc.start()
+
+    results = []
+    for name in args.scenarios:
+        for cache in ['cold', 'warm']:
+            samples = run_scenario(name, cache == 'cold', args.timeout, track_memory)
+            summary = summarize(name, cache, samples)
+            results.append(summary)
+            print(f'{summary["stage"]:<22} primeiro {summary["first_s"] * 1000:9.1f} ms | '
+                  f'mediana {summary["median_s"] * 1000:9.1f} ms | '
+                  f'p95 {summary["p95_s"] * 1000:9.1f} ms', file=sys.stderr)
+
+    document = {'meta': environment_info(seed=None), 'results': results}
+    text = json.dumps(document, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(text)
+    else:
+        print(text)
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            regressions = compare(document, json.load(f), args.threshold)
+        for stage, _, base, current, ratio in regressions:
+            print(f'REGRESSÃO {stage}: {base * 1000:.1f} ms -> {current * 1000:.1f} ms ({ratio:.2f}x)',
+                  file=sys.stderr)
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
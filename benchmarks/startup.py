@@ -0,0 +1,148 @@
+### benchmarks/startup.py
+# Custo de inicialização do processo: tempo de importação por módulo.
+#
+# Uso (na raiz do repositório):
+#   python -m benchmarks.startup
+#   python -m benchmarks.startup --modules loaders warmup --output startup.json
+#   python -m benchmarks.startup --compare startup.json
+#
+# Lê os imports de nível de módulo do appv1.2.py (ou usa --modules) e os
+# importa num processo novo com "python -X importtime". O relatório traz o
+# tempo de parede do processo (mediana de --repeat execuções, descontado o
+# "python -c pass"), o tempo cumulativo de cada import do app e os pacotes
+# mais pesados. Sai no mesmo formato JSON de benchmarks.pipeline, então
+# --compare acusa regressões de inicialização.
+
+import argparse
+import ast
+import json
+import statistics
+import subprocess
+import sys
+import time
+
+from benchmarks.pipeline import compare, environment_info
+
+APP_PATH = 'appv1.2.py'
+
+
+def app_imports(path: str = APP_PATH) -> list:
+    """Módulos importados no nível de módulo do script, na ordem do arquivo."""
+    with open(path, encoding='utf-8') as f:
+        tree = ast.parse(f.read(), filename=path)
+    modules = []
+    for node in tree.body:
+        if isinstance(node, ast.Import):
+            names = [alias.name for alias in node.names]
+        elif isinstance(node, ast.ImportFrom) and node.level == 0:
+            names = [node.module]
+        else:
+            continue
+        modules.extend(n for n in names if n not in modules)
+    return modules
+
+
+def _statement(modules: list) -> str:
+    return '; '.join(f'import {m}' for m in modules) or 'pass'
+
+
+def import_profile(modules: list) -> list:
+    """
+    (módulo, profundidade, self µs, cumulativo µs) de cada linha do
+    -X importtime, na ordem em que o Python as imprime.
+    """
+    proc = subprocess.run([sys.executable, '-X', 'importtime', '-c', _statement(modules)],
+                          capture_output=True, text=True, check=True)
+    rows = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        depth = (len(name) - len(name.lstrip(' ')) - 1) // 2
+        rows.append((name.strip(), depth, int(self_us), int(cumulative_us)))
+    return rows
+
+
+def wall_time(modules: list, repeat: int) -> list:
+    """Tempos de parede (s) de um processo que só faz os imports."""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, '-c', _statement(modules)], check=True)
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def report(modules: list, repeat: int, top: int) -> dict:
+    baseline = statistics.median(wall_time([], repeat))
+    walls = [w - baseline for w in wall_time(modules, repeat)]
+    rows = import_profile(modules)
+
+    # Raízes da árvore de imports pedidas (e seus pacotes-pai) = o que cada
+    # import do app trouxe; as demais raízes são do próprio interpretador (site)
+    def requested(name):
+        return any(m == name or m.startswith(name + '.') for m in modules)
+
+    roots = [(name, cum) for name, depth, _, cum in rows if depth == 0 and requested(name)]
+    heaviest = sorted(((name, cum) for name, depth, _, cum in rows if depth <= 1),
+                      key=lambda r: r[1], reverse=True)[:top]
+
+    results = [{
+        'stage': 'startup:imports_wall',
+        'scale': 1,
+        'repeat': repeat,
+        'min_s': min(walls),
+        'median_s': statistics.median(walls),
+        'interpreter_s': baseline,
+    }]
+    results += [{'stage': f'import:{name}', 'scale': 1, 'median_s': cum / 1e6} for name, cum in roots]
+    return {
+        'meta': environment_info(seed=None),
+        'modules': modules,
+        'results': results,
+        'heaviest': [{'module': name, 'cumulative_s': cum / 1e6} for name, cum in heaviest],
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description='Tempo de importação do painel (inicialização do processo).')
+    parser.add_argument('--modules', nargs='+', help=f'módulos a importar (padrão: os imports de {APP_PATH})')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--top', type=int, default=15, help='quantos pacotes pesados listar')
+    parser.add_argument('--output', help='arquivo JSON de saída (padrão: stdout)')
+    parser.add_argument('--compare', help='JSON de referência para detectar regressões')
+    parser.add_argument('--threshold', type=float, default=0.2)
+    args = parser.parse_args(argv)
+
+    modules = args.modules or app_imports()
+    document = report(modules, args.repeat, args.top)
+
+    wall = document['results'][0]
+    print(f'imports: mediana {wall["median_s"] * 1000:.0f} ms '
+          f'(+ {wall["interpreter_s"] * 1000:.0f} ms do interpretador)', file=sys.stderr)
+    for r in document['results'][1:]:
+        print(f'  {r["stage"]:<40} {r["median_s"] * 1000:8.1f} ms', file=sys.stderr)
+    print('mais pesados:', file=sys.stderr)
+    for h in document['heaviest']:
+        print(f'  {h["module"]:<40} {h["cumulative_s"] * 1000:8.1f} ms', file=sys.stderr)
+
+    text = json.dumps(document, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(text)
+    else:
+        print(text)
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            regressions = compare(document, json.load(f), args.threshold)
+        for stage, _, base, current, ratio in regressions:
+            print(f'REGRESSÃO {stage}: {base * 1000:.1f} ms -> {current * 1000:.1f} ms ({ratio:.2f}x)',
+                  file=sys.stderr)
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
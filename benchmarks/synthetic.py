@@ -0,0 +1,157 @@
+### benchmarks/synthetic.py
+# Gerador de dados sintéticos no formato do PSR já limpo (saída do
+# pré-processamento), para medir o painel em 1x/10x/100x o volume atual.
+# Cardinalidades realistas: 27 UFs, 5.570 municípios (contagem IBGE por UF),
+# algumas dezenas de seguradoras e ~50 culturas, todas com distribuição
+# assimétrica (poucas UFs/municípios/seguradoras concentram a maior parte).
+
+import os
+
+import numpy as np
+import pandas as pd
+
+from dimensions import UF_TABLE, add_dimension_keys, save_dimensions
+from disk_cache import file_fingerprint
+from timeseries import convert_dates
+
+# Linhas do parquet atual (escala 1x)
+BASE_ROWS = 46_000
+
+# Municípios por UF (IBGE 2024), na ordem de UF_TABLE
+MUNICIPIOS_POR_UF = [
+    52, 22, 62, 15, 144, 16, 139,
+    217, 224, 184, 167, 223, 185, 102, 75, 417,
+    853, 78, 92, 645,
+    399, 295, 497,
+    79, 141, 246, 1,
+]
+
+# Peso relativo de cada UF no número de apólices (Sul/Centro-Oeste dominam o PSR)
+PESO_UF = {
+    'PR': 22, 'RS': 18, 'SP': 10, 'MG': 8, 'GO': 7, 'MT': 6, 'SC': 6, 'MS': 5,
+    'BA': 3, 'TO': 1.5, 'MA': 1, 'PI': 1, 'DF': 0.5, 'ES': 0.5, 'RO': 0.5,
+    'PA': 0.4, 'CE': 0.2, 'PE': 0.2, 'RJ': 0.2, 'SE': 0.1, 'AL': 0.1,
+    'PB': 0.1, 'RN': 0.1, 'AC': 0.05, 'AM': 0.05, 'RR': 0.05, 'AP': 0.05,
+}
+
+CULTURAS = [
+    'Soja', 'Milho 2ª safra', 'Trigo', 'Milho 1ª safra', 'Café', 'Uva', 'Maçã',
+    'Feijão', 'Arroz', 'Cana-de-açúcar', 'Tomate', 'Cevada', 'Aveia', 'Sorgo',
+    'Algodão', 'Batata', 'Laranja', 'Pecuária', 'Floresta', 'Cebola',
+] + [f'Cultura {i:02d}' for i in range(21, 54)]
+
+CLASSIFICACOES = ['CUSTEIO', 'INVESTIMENTO', 'PECUÁRIO', 'FLORESTAS', 'AQUÍCOLA']
+
+
+def _zipf_weights(n: int, s: float) -> np.ndarray:
+    weights = 1.0 / np.arange(1, n + 1) ** s
+    return weights / weights.sum()
+
+
+def _sample_within_groups(rng, group: np.ndarray, weights_by_group: list) -> np.ndarray:
+    """
+    Sorteia um índice dentro de cada grupo, com pesos próprios por grupo,
+    de forma vetorizada: as CDFs dos grupos são empilhadas como k + cdf_k.
+    """
+    offsets = np.concatenate([[0], np.cumsum([len(w) for w in weights_by_group])])
+    stacked = np.concatenate([k + np.cumsum(w) for k, w in enumerate(weights_by_group)])
+    stacked[offsets[1:] - 1] = np.arange(1, len(weights_by_group) + 1)  # evita erro de arredondamento
+    position = np.searchsorted(stacked, group + rng.random(len(group)), side='right')
+    return position - offsets[group]
+
+
+# ---------------------------
+# Função: gerar o dataframe sintético
+# ---------------------------
+def generate_psr(scale: float = 1.0, seed: int = 0, n_insurers: int = 40,
+                 years: int = 3) -> pd.DataFrame:
+    """
+    Gera ~BASE_ROWS * scale linhas com o esquema do PSR limpo (antes das chaves).
+    """
+    rng = np.random.default_rng(seed)
+    n = int(BASE_ROWS * scale)
+    siglas = UF_TABLE['SG_UF'].to_numpy()
+    codes = UF_TABLE['CD_UF'].to_numpy(dtype=np.int64)
+
+    # UF da propriedade
+    peso_uf = np.array([PESO_UF[s] for s in siglas], dtype=float)
+    uf = rng.choice(len(siglas), size=n, p=peso_uf / peso_uf.sum())
+
+    # Município: Zipf dentro da UF
+    mun = _sample_within_groups(rng, uf, [_zipf_weights(k, 1.1) for k in MUNICIPIOS_POR_UF])
+    cd_geocmu = codes[uf] * 100000 + (mun + 1) * 10
+
+    # Seguradora: Zipf global; as menores atuam só em parte das UFs
+    insurer_weights = _zipf_weights(n_insurers, 1.2)
+    reach = np.maximum(1, np.round(27 * (1 - np.arange(n_insurers) / n_insurers))).astype(int)
+    active = np.zeros((len(siglas), n_insurers), dtype=bool)
+    uf_rank = np.argsort(-peso_uf)
+    for i, r in enumerate(reach):
+        active[uf_rank[:r], i] = True
+    per_uf = [np.where(active[k], insurer_weights, 0) / insurer_weights[active[k]].sum()
+              for k in range(len(siglas))]
+    insurer = _sample_within_groups(rng, uf, per_uf)
+
+    cultura = rng.choice(len(CULTURAS), size=n, p=_zipf_weights(len(CULTURAS), 1.3))
+    classif = rng.choice(len(CLASSIFICACOES), size=n, p=[0.9, 0.03, 0.04, 0.02, 0.01])
+
+    # Medidas numéricas (assimétricas, como no dado real)
+    area = np.round(rng.lognormal(4.0, 1.3, n), 2)
+    taxa = np.round(rng.gamma(4.0, 0.015, n), 6)
+    produtividade_estimada = np.round(rng.lognormal(8.2, 0.5, n), 1)
+    produtividade_segurada = np.round(produtividade_estimada * rng.uniform(0.55, 0.8, n), 1)
+    limite = np.round(area * produtividade_segurada * rng.uniform(0.8, 1.6, n), 2)
+    premio = np.round(limite * taxa, 2)
+    subvencao = np.round(premio * rng.choice([0.2, 0.4], size=n), 2)
+
+    # Apólices: ~1,2 linha por apólice
+    n_policies = max(1, int(n / 1.2))
+    apolice = rng.integers(0, n_policies, n) + 10_000
+
+    # Datas: proposta uniforme no período, apólice e vigência alguns dias depois
+    start = np.datetime64('2021-01-01')
+    proposta = start + rng.integers(0, 365 * years, n).astype('timedelta64[D]')
+    dt_apolice = proposta + rng.integers(1, 30, n).astype('timedelta64[D]')
+    inicio = dt_apolice + rng.integers(0, 15, n).astype('timedelta64[D]')
+
+    df = pd.DataFrame({
+        'NM_RAZAO_SOCIAL': pd.Categorical.from_codes(
+            insurer, [f'Seguradora {i:02d} S.A.' for i in range(n_insurers)]).astype(str),
+        'NM_MUNICIPIO_PROPRIEDADE': pd.Series(siglas[uf]) + ' Município ' + pd.Series(mun + 1).astype(str),
+        'SG_UF_PROPRIEDADE': siglas[uf],
+        'NM_CLASSIF_PRODUTO': np.asarray(CLASSIFICACOES)[classif],
+        'NM_CULTURA_GLOBAL': np.asarray(CULTURAS)[cultura],
+        'NR_AREA_TOTAL': area,
+        'NR_ANIMAL': np.where(classif == 2, rng.integers(10, 500, n), 0).astype(float),
+        'NR_PRODUTIVIDADE_ESTIMADA': produtividade_estimada,
+        'NR_PRODUTIVIDADE_SEGURADA': produtividade_segurada,
+        'VL_LIMITE_GARANTIA': limite,
+        'VL_PREMIO_LIQUIDO': premio,
+        'PE_TAXA': taxa,
+        'VL_SUBVENCAO_FEDERAL': subvencao,
+        'NR_APOLICE': apolice.astype(str),
+        'VALOR_INDENIZAÇÃO': '-',
+        'EVENTO_PREPONDERANTE': '-',
+        'DT_PROPOSTA': proposta,
+        'DT_APOLICE': dt_apolice,
+        'DT_INICIO_VIGENCIA': inicio,
+        'ANO_APOLICE': dt_apolice.astype('datetime64[Y]').astype(int) + 1970,
+        'CD_GEOCMU': cd_geocmu,
+    })
+    return convert_dates(df)
+
+
+# ---------------------------
+# Função: gravar dataset sintético completo
+# ---------------------------
+def write_synthetic_dataset(folder: str, scale: float = 1.0, seed: int = 0) -> str:
+    """
+    Gera, acrescenta as chaves inteiras e grava parquet + dimensões em folder.
+    Retorna o caminho do parquet.
+    """
+    os.makedirs(folder, exist_ok=True)
+    df, dims = add_dimension_keys(generate_psr(scale, seed))
+    path = os.path.join(folder, 'dados_filtrados.parquet')
+    df.to_parquet(path, index=False)
+    save_dimensions(dims, folder, origin=file_fingerprint(path))
+    return path
@@ -0,0 +1,271 @@
+### cache_manager.py
+# Cache em memória do processo com contabilidade de bytes e orçamento global.
+#
+# Cada entrada tem o tamanho profundo medido (DataFrames com deep=True,
+# arrays, matrizes esparsas, figuras e objetos compostos) e o custo de
+# recomputação (segundos). Quando o total passa do orçamento, saem primeiro
+# as entradas de menor prioridade GreedyDual-Size: prioridade = L + custo/tamanho,
+# renovada a cada acerto, com L subindo a cada despejo — na prática um LRU
+# que prefere manter o que é caro de recalcular e barato de guardar.
+#
+# Os valores são compartilhados entre sessões (como st.cache_resource):
+# quem recebe um valor do cache não deve alterá-lo.
+#
+# Orçamento: TERRA_CACHE_BUDGET_MB (padrão 512).
+#
+# Com persist=True, uma falta na memória consulta antes o cache em disco
+# (disk_cache), compartilhado entre processos e reinícios.
+
+import functools
+import os
+import sys
+import threading
+import time
+from collections import defaultdict
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+import disk_cache
+
+DEFAULT_BUDGET_MB = 512
+
+
+# ---------------------------
+# Função: tamanho profundo
+# ---------------------------
+def deep_sizeof(obj, _seen=None) -> int:
+    """
+    Estimativa do tamanho em bytes de obj, seguindo contêineres e atributos.
+    """
+    if _seen is None:
+        _seen = set()
+    if id(obj) in _seen:
+        return 0
+    _seen.add(id(obj))
+
+    if isinstance(obj, (pd.DataFrame, pd.Series)):
+        usage = obj.memory_usage(deep=True)
+        return int(usage.sum() if isinstance(usage, pd.Series) else usage) + _geometry_bytes(obj)
+    if isinstance(obj, pd.Index):
+        return int(obj.memory_usage(deep=True))
+    if isinstance(obj, np.ndarray):
+        return int(obj.nbytes) + sys.getsizeof(obj) - (obj.nbytes if obj.base is None else 0)
+    if hasattr(obj, 'tocsr') and hasattr(obj, 'data'):  # matrizes scipy.sparse
+        return sum(int(getattr(obj, a).nbytes) for a in ('data', 'indices', 'indptr', 'row', 'col')
+                   if hasattr(obj, a))
+    if isinstance(obj, (str, bytes, bytearray, int, float, bool, type(None))):
+        return sys.getsizeof(obj)
+
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(deep_sizeof(k, _seen) + deep_sizeof(v, _seen) for k, v in obj.items())
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        size += sum(deep_sizeof(item, _seen) for item in obj)
+    if hasattr(obj, '__dict__'):
+        size += deep_sizeof(vars(obj), _seen)
+    for slot in getattr(type(obj), '__slots__', ()):
+        if hasattr(obj, slot):
+            size += deep_sizeof(getattr(obj, slot), _seen)
+    return size
+
+
+def _geometry_bytes(obj) -> int:
+    """
+    Coordenadas das colunas de geometria (geopandas), que memory_usage não
+    enxerga: 16 bytes por par x/y.
+    """
+    frame = obj.to_frame() if isinstance(obj, pd.Series) else obj
+    columns = [c for c, dtype in frame.dtypes.items() if dtype.name == 'geometry']
+    if not columns:
+        return 0
+    import shapely
+    return sum(int(shapely.get_num_coordinates(frame[c].to_numpy()).sum()) * 16 for c in columns)
+
+
+# ---------------------------
+# Classe: gerenciador do cache
+# ---------------------------
+@dataclass
+class _Entry:
+    value: object
+    namespace: str
+    size: int
+    cost: float
+    priority: float
+    expires: float
+
+
+class CacheManager:
+    """
+    Cache chave -> valor com orçamento de bytes e despejo GreedyDual-Size.
+    Seguro para várias sessões (threads): cada chave é calculada uma vez,
+    quem pede a mesma chave em paralelo espera o primeiro cálculo.
+    """
+
+    def __init__(self, budget_bytes: int):
+        self.budget_bytes = budget_bytes
+        self._entries = {}
+        self._lock = threading.Lock()
+        self._key_locks = {}
+        self._inflation = 0.0
+        self.used_bytes = 0
+        self.stats = defaultdict(lambda: {'hits': 0, 'misses': 0, 'evictions': 0, 'rejected': 0})
+
+    def _priority(self, cost: float, size: int) -> float:
+        return self._inflation + cost / max(size, 1)
+
+    def get_or_compute(self, key, namespace: str, compute, ttl: float = None):
+        """
+        Devolve o valor da chave; se não existir (ou expirou), calcula com compute().
+        """
+        with self._lock:
+            value = self._lookup(key, namespace)
+            if value is not _MISSING:
+                return value
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+
+        with key_lock:
+            try:
+                with self._lock:
+                    value = self._lookup(key, namespace, count=False)
+                    if value is not _MISSING:
+                        self.stats[namespace]['hits'] += 1
+                        return value
+                    self.stats[namespace]['misses'] += 1
+
+                start = time.perf_counter()
+                value = compute()
+                cost = time.perf_counter() - start
+                size = deep_sizeof(value)
+
+                with self._lock:
+                    if size > self.budget_bytes:
+                        self.stats[namespace]['rejected'] += 1
+                        return value
+                    expires = time.monotonic() + ttl if ttl else float('inf')
+                    self._entries[key] = _Entry(value, namespace, size, cost,
+                                                self._priority(cost, size), expires)
+                    self.used_bytes += size
+                    self._evict()
+                return value
+            finally:
+                # Também quando compute() levanta: o lock da chave não vaza
+                # (só sai se ainda for o desta chamada)
+                with self._lock:
+                    if self._key_locks.get(key) is key_lock:
+                        del self._key_locks[key]
+
+    def _lookup(self, key, namespace: str, count: bool = True):
+        entry = self._entries.get(key)
+        if entry is None:
+            return _MISSING
+        if entry.expires < time.monotonic():
+            self._remove(key)
+            return _MISSING
+        entry.priority = self._priority(entry.cost, entry.size)
+        if count:
+            self.stats[namespace]['hits'] += 1
+        return entry.value
+
+    def _remove(self, key):
+        entry = self._entries.pop(key)
+        self.used_bytes -= entry.size
+        return entry
+
+    def _evict(self):
+        while self.used_bytes > self.budget_bytes and self._entries:
+            key = min(self._entries, key=lambda k: self._entries[k].priority)
+            entry = self._remove(key)
+            self._inflation = entry.priority
+            self.stats[entry.namespace]['evictions'] += 1
+
+    def contains(self, key) -> bool:
+        with self._lock:
+            entry = self._entries.get(key)
+            return entry is not None and entry.expires >= time.monotonic()
+
+    def clear(self, namespace: str = None):
+        """Remove todas as entradas (ou só as de um namespace)."""
+        with self._lock:
+            for key in [k for k, e in self._entries.items()
+                        if namespace is None or e.namespace == namespace]:
+                self._remove(key)
+
+    def discard(self, predicate):
+        """Remove as entradas cuja chave satisfaz predicate(chave)."""
+        with self._lock:
+            for key in [k for k in self._entries if predicate(k)]:
+                self._remove(key)
+
+    def report(self) -> pd.DataFrame:
+        """Uma linha por namespace: entradas, MB, acertos, faltas e despejos."""
+        with self._lock:
+            rows = defaultdict(lambda: {'entradas': 0, 'bytes': 0})
+            for entry in self._entries.values():
+                rows[entry.namespace]['entradas'] += 1
+                rows[entry.namespace]['bytes'] += entry.size
+            namespaces = sorted(set(rows) | set(self.stats))
+            return pd.DataFrame([
+                {
+                    'namespace': ns,
+                    'entradas': rows[ns]['entradas'],
+                    'mb': rows[ns]['bytes'] / 2**20,
+                    'acertos': self.stats[ns]['hits'],
+                    'faltas': self.stats[ns]['misses'],
+                    'despejos': self.stats[ns]['evictions'],
+                    'rejeitados': self.stats[ns]['rejected'],
+                }
+                for ns in namespaces
+            ])
+
+
+_MISSING = object()
+
+# Cache global do processo (compartilhado por todas as sessões)
+CACHE = CacheManager(int(float(os.environ.get('TERRA_CACHE_BUDGET_MB', DEFAULT_BUDGET_MB)) * 2**20))
+
+
+# Cache em disco, aberto no primeiro uso (None se desligado)
+_disk = None
+_disk_lock = threading.Lock()
+
+
+def disk_store():
+    global _disk
+    with _disk_lock:
+        if _disk is None:
+            _disk = disk_cache.open_default() or False
+    return _disk or None
+
+
+# ---------------------------
+# Decorador
+# ---------------------------
+def cached(namespace: str, ttl: float = None, cache: CacheManager = None, persist: bool = False):
+    """
+    Memoriza a função no cache global; a chave é (namespace, função, args,
+    kwargs), então os argumentos precisam ser hasheáveis. A função entra na
+    chave: dois loaders no mesmo namespace com os mesmos argumentos não se
+    confundem. Com persist=True o resultado também vai para o disco; os
+    argumentos devem identificar o conteúdo (ex.: a impressão digital do
+    dataset), não só o caminho.
+    """
+    def decorator(fn):
+        function = f'{fn.__module__}.{fn.__qualname__}'
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            params = (function, args, tuple(sorted(kwargs.items())))
+
+            def compute():
+                store = disk_store() if persist else None
+                if store is None:
+                    return fn(*args, **kwargs)
+                return store.get_or_compute(namespace, params, lambda: fn(*args, **kwargs))
+
+            return (cache or CACHE).get_or_compute((namespace,) + params, namespace, compute, ttl)
+        wrapper.cache_key = lambda *args, **kwargs: (namespace, function, args, tuple(sorted(kwargs.items())))
+        return wrapper
+    return decorator
@@ -0,0 +1,134 @@
+### concentration.py
+# Concentração de mercado: participação das seguradoras (market share) por
+# UF e por cultura e índice Herfindahl-Hirschman (HHI) por região.
+# Tudo sai de transformações vetorizadas de groupby sobre os agregados
+# razão social x UF / razão social x cultura — nada de laços ou apply.
+
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+# Faixas usuais do HHI (escala 0-10.000)
+HHI_BANDS = [
+    (1500, 'Não concentrado'),
+    (2500, 'Moderadamente concentrado'),
+    (np.inf, 'Altamente concentrado'),
+]
+
+
+# ---------------------------
+# Função: participação de mercado
+# ---------------------------
+def market_shares(df_agg: pd.DataFrame, region_col: str, measure: str = 'valor_total') -> pd.DataFrame:
+    """
+    Acrescenta a coluna 'share' (0-1): participação de cada linha no total da região.
+    """
+    total = df_agg.groupby(region_col, observed=True)[measure].transform('sum')
+    shares = df_agg[measure] / total.where(total != 0)
+    return df_agg.assign(share=shares.fillna(0.0))
+
+
+# ---------------------------
+# Função: HHI por região
+# ---------------------------
+def herfindahl_index(df_shares: pd.DataFrame, region_col: str) -> pd.DataFrame:
+    """
+    HHI por região (soma dos quadrados das participações em %), com a seguradora
+    líder, sua participação e o número de seguradoras presentes.
+    """
+    df_shares = df_shares.assign(
+        share_sq=(df_shares['share'] * 100) ** 2,
+        ativa=(df_shares['share'] > 0).astype(np.int32),
+    )
+    hhi = df_shares.groupby(region_col, observed=True).agg(
+        hhi=('share_sq', 'sum'),
+        numero_seguradoras=('ativa', 'sum')
+    )
+    leaders = (
+        df_shares.sort_values([region_col, 'share'], ascending=[True, False])
+        .drop_duplicates(region_col)
+        .set_index(region_col)
+    )
+    hhi['lider'] = leaders['NM_RAZAO_SOCIAL']
+    hhi['share_lider'] = leaders['share']
+    thresholds = [limit for limit, _ in HHI_BANDS]
+    labels = [label for _, label in HHI_BANDS]
+    hhi['classificacao'] = np.asarray(labels)[np.searchsorted(thresholds, hhi['hhi'], side='right')]
+    return hhi.reset_index()
+
+
+# ---------------------------
+# Classe: matriz esparsa de participações
+# ---------------------------
+@dataclass
+class ShareMatrix:
+    """
+    Participações seguradora x região em CSR; a maioria das células é zero
+    porque quase nenhuma seguradora atua em todas as UFs.
+    """
+    rows: pd.Index
+    cols: pd.Index
+    matrix: 'scipy.sparse.csr_matrix'
+
+    def to_frame(self) -> pd.DataFrame:
+        """Grade para o heatmap: células sem atuação ficam NaN (em branco)."""
+        coo = self.matrix.tocoo()
+        grid = np.full(self.matrix.shape, np.nan)
+        grid[coo.row, coo.col] = coo.data
+        return pd.DataFrame(grid, index=self.rows, columns=self.cols)
+
+
+def build_share_matrix(df_shares: pd.DataFrame, row_col: str, col_col: str) -> ShareMatrix:
+    """
+    Monta a matriz esparsa (linhas = row_col, colunas = col_col) de participações.
+    """
+    from scipy import sparse  # import adiado: só o pré-cálculo precisa do scipy
+
+    nonzero = df_shares[df_shares['share'] > 0]
+    row_codes, rows = pd.factorize(nonzero[row_col], sort=True)
+    col_codes, cols = pd.factorize(nonzero[col_col], sort=True)
+    matrix = sparse.csr_matrix(
+        (nonzero['share'].to_numpy(dtype=np.float64), (row_codes, col_codes)),
+        shape=(len(rows), len(cols)),
+    )
+    return ShareMatrix(pd.Index(rows, name=row_col), pd.Index(cols, name=col_col), matrix)
+
+
+# ---------------------------
+# Conjunto de métricas calculado junto com os agregados
+# ---------------------------
+@dataclass
+class ConcentrationMetrics:
+    """Participações, HHI (ordenado) e matriz esparsa seguradora x UF."""
+    shares_uf: pd.DataFrame
+    shares_cultura: pd.DataFrame
+    hhi_uf: pd.DataFrame
+    hhi_cultura: pd.DataFrame
+    share_matrix_uf: ShareMatrix
+
+
+def build_concentration(df_razao_social_estado: pd.DataFrame,
+                        df_razao_social_cultura: pd.DataFrame,
+                        measure: str = 'valor_total') -> ConcentrationMetrics:
+    """
+    Calcula participações e HHI por UF e por cultura a partir dos agregados.
+    As tabelas de HHI voltam ordenadas da mais para a menos concentrada.
+    """
+    shares_uf = market_shares(df_razao_social_estado, 'CD_UF', measure)
+    shares_cultura = market_shares(df_razao_social_cultura, 'ID_CULTURA', measure)
+
+    hhi_uf = herfindahl_index(shares_uf, 'CD_UF')
+    hhi_uf.insert(1, 'SG_UF_PROPRIEDADE', hhi_uf['CD_UF'].map(
+        shares_uf.drop_duplicates('CD_UF').set_index('CD_UF')['SG_UF_PROPRIEDADE']))
+    hhi_cultura = herfindahl_index(shares_cultura, 'ID_CULTURA')
+    hhi_cultura.insert(1, 'NM_CULTURA_GLOBAL', hhi_cultura['ID_CULTURA'].map(
+        shares_cultura.drop_duplicates('ID_CULTURA').set_index('ID_CULTURA')['NM_CULTURA_GLOBAL']))
+
+    return ConcentrationMetrics(
+        shares_uf=shares_uf,
+        shares_cultura=shares_cultura,
+        hhi_uf=hhi_uf.sort_values('hhi', ascending=False, ignore_index=True),
+        hhi_cultura=hhi_cultura.sort_values('hhi', ascending=False, ignore_index=True),
+        share_matrix_uf=build_share_matrix(shares_uf, 'NM_RAZAO_SOCIAL', 'SG_UF_PROPRIEDADE'),
+    )
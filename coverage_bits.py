@@ -0,0 +1,164 @@
+### coverage_bits.py
+# Cobertura geográfica das seguradoras representada em bits.
+# Cada UF ocupa um bit fixo de um inteiro uint32 (27 UFs cabem em 32 bits);
+# para municípios (milhares de membros) usamos um array de bits empacotado.
+# Contagens saem de popcount vetorizado e consultas de conjunto
+# ("presente em SP e MT", matriz de sobreposição) viram operações bit a bit.
+
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from dimensions import UF_TABLE
+
+# Ordem fixa das UFs (ordem dos códigos IBGE) — a posição na lista é o bit da UF
+UF_SIGLAS = UF_TABLE['SG_UF'].tolist()
+UF_BIT = {sigla: bit for bit, sigla in enumerate(UF_SIGLAS)}
+UF_BIT_BY_CODE = {int(code): bit for bit, code in enumerate(UF_TABLE['CD_UF'])}
+
+# Tabela de popcount para um byte (0..255)
+_POPCOUNT_BYTE = np.array([bin(i).count('1') for i in range(256)], dtype=np.uint8)
+
+
+# ---------------------------
+# Função: popcount vetorizado
+# ---------------------------
+def popcount(masks) -> np.ndarray:
+    """
+    Conta os bits ligados de cada máscara inteira (sem laço em Python).
+    """
+    masks = np.ascontiguousarray(masks, dtype=np.uint32)
+    as_bytes = masks.view(np.uint8).reshape(masks.shape + (4,))
+    return _POPCOUNT_BYTE[as_bytes].sum(axis=-1, dtype=np.uint8)
+
+
+# ---------------------------
+# Função: máscara a partir de siglas
+# ---------------------------
+def uf_mask(siglas) -> int:
+    """
+    Converte uma lista de siglas de UF na máscara correspondente.
+    """
+    mask = 0
+    for sigla in siglas:
+        mask |= 1 << UF_BIT[sigla]
+    return mask
+
+
+def decode_uf_mask(mask: int) -> list:
+    """
+    Converte uma máscara de volta na lista de siglas (na ordem IBGE).
+    """
+    mask = int(mask)
+    return [sigla for bit, sigla in enumerate(UF_SIGLAS) if mask >> bit & 1]
+
+
+# ---------------------------
+# Função: cobertura de UFs por entidade
+# ---------------------------
+def build_uf_coverage(df: pd.DataFrame,
+                      entity_col: str = 'ID_RAZAO_SOCIAL',
+                      uf_col: str = 'CD_UF') -> pd.Series:
+    """
+    Retorna uma Series uint32 (índice = entidade) com a máscara de UFs atendidas.
+    uf_col pode conter o código IBGE (CD_UF) ou a sigla da UF.
+    """
+    lookup = UF_BIT_BY_CODE if pd.api.types.is_numeric_dtype(df[uf_col]) else UF_BIT
+    bits = df[uf_col].map(lookup)
+    pairs = pd.DataFrame({entity_col: df[entity_col], 'bit': bits}).dropna()
+    pairs = pairs.drop_duplicates()
+    # Com pares (entidade, bit) únicos, a soma das potências de 2 equivale ao OR
+    pairs['mask'] = np.left_shift(np.uint32(1), pairs['bit'].to_numpy(dtype=np.uint32))
+    return pairs.groupby(entity_col)['mask'].sum().astype(np.uint32).rename('mask_estados')
+
+
+# ---------------------------
+# Consultas de conjunto sobre máscaras
+# ---------------------------
+def covers_all(masks, siglas) -> np.ndarray:
+    """
+    True para as máscaras que contêm todas as UFs informadas.
+    """
+    wanted = np.uint32(uf_mask(siglas))
+    return (np.asarray(masks, dtype=np.uint32) & wanted) == wanted
+
+
+def covers_any(masks, siglas) -> np.ndarray:
+    """
+    True para as máscaras que contêm ao menos uma das UFs informadas.
+    """
+    wanted = np.uint32(uf_mask(siglas))
+    return (np.asarray(masks, dtype=np.uint32) & wanted) != 0
+
+
+def overlap_matrix(masks) -> np.ndarray:
+    """
+    Matriz n x n com o número de UFs em comum entre cada par de máscaras.
+    """
+    masks = np.asarray(masks, dtype=np.uint32)
+    return popcount(masks[:, None] & masks[None, :])
+
+
+# ---------------------------
+# Cobertura empacotada (ex.: municípios)
+# ---------------------------
+@dataclass
+class PackedCoverage:
+    """
+    Cobertura de muitos membros por entidade como array de bits empacotado.
+
+    bits[i] guarda, em ceil(len(members) / 8) bytes, quais membros a entidade i atende.
+    """
+    entities: pd.Index
+    members: pd.Index
+    bits: np.ndarray
+
+    def counts(self) -> pd.Series:
+        """Número de membros atendidos por entidade."""
+        counts = _POPCOUNT_BYTE[self.bits].sum(axis=1, dtype=np.int64)
+        return pd.Series(counts, index=self.entities)
+
+    def member_mask(self, members) -> np.ndarray:
+        """
+        Linha empacotada com os membros informados ligados. Membro fora de
+        self.members levanta KeyError, como uf_mask com sigla desconhecida.
+        """
+        members = list(members)
+        positions = self.members.get_indexer(members)
+        if (positions < 0).any():
+            # get_indexer devolve -1, que ligaria o último bit
+            missing = [m for m, p in zip(members, positions) if p < 0]
+            raise KeyError(f'membros desconhecidos: {missing}')
+        flags = np.zeros(len(self.members), dtype=bool)
+        flags[positions] = True
+        return np.packbits(flags)
+
+    def covers_all(self, members) -> np.ndarray:
+        """True para as entidades que atendem todos os membros informados."""
+        wanted = self.member_mask(members)
+        return ((self.bits & wanted) == wanted).all(axis=1)
+
+    def overlap(self) -> np.ndarray:
+        """Matriz n x n com o número de membros em comum entre entidades."""
+        shared = self.bits[:, None, :] & self.bits[None, :, :]
+        return _POPCOUNT_BYTE[shared].sum(axis=2, dtype=np.int64)
+
+
+def build_packed_coverage(df: pd.DataFrame,
+                          entity_col: str = 'ID_RAZAO_SOCIAL',
+                          member_col: str = 'CD_MUNICIPIO') -> PackedCoverage:
+    """
+    Monta a cobertura empacotada de member_col por entity_col.
+    """
+    pairs = df[[entity_col, member_col]].dropna().drop_duplicates()
+    entity_codes, entities = pd.factorize(pairs[entity_col], sort=True)
+    member_codes, members = pd.factorize(pairs[member_col], sort=True)
+
+    flags = np.zeros((len(entities), len(members)), dtype=bool)
+    flags[entity_codes, member_codes] = True
+    return PackedCoverage(
+        entities=pd.Index(entities, name=entity_col),
+        members=pd.Index(members, name=member_col),
+        bits=np.packbits(flags, axis=1),
+    )
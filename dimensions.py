@@ -0,0 +1,258 @@
+### dimensions.py
+# Chaves inteiras das dimensões (códigos IBGE e IDs de dicionário).
+# Agrupamentos e joins usam estes códigos compactos em vez das strings;
+# os nomes ficam em tabelas de dimensão salvas ao lado do parquet principal.
+
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from disk_cache import parquet_origin, save_with_origin
+
+# Códigos IBGE das UFs (CD_UF, sigla, nome)
+UF_TABLE = pd.DataFrame(
+    [
+        (11, 'RO', 'Rondônia'), (12, 'AC', 'Acre'), (13, 'AM', 'Amazonas'),
+        (14, 'RR', 'Roraima'), (15, 'PA', 'Pará'), (16, 'AP', 'Amapá'),
+        (17, 'TO', 'Tocantins'), (21, 'MA', 'Maranhão'), (22, 'PI', 'Piauí'),
+        (23, 'CE', 'Ceará'), (24, 'RN', 'Rio Grande do Norte'), (25, 'PB', 'Paraíba'),
+        (26, 'PE', 'Pernambuco'), (27, 'AL', 'Alagoas'), (28, 'SE', 'Sergipe'),
+        (29, 'BA', 'Bahia'), (31, 'MG', 'Minas Gerais'), (32, 'ES', 'Espírito Santo'),
+        (33, 'RJ', 'Rio de Janeiro'), (35, 'SP', 'São Paulo'), (41, 'PR', 'Paraná'),
+        (42, 'SC', 'Santa Catarina'), (43, 'RS', 'Rio Grande do Sul'),
+        (50, 'MS', 'Mato Grosso do Sul'), (51, 'MT', 'Mato Grosso'), (52, 'GO', 'Goiás'),
+        (53, 'DF', 'Distrito Federal'),
+    ],
+    columns=['CD_UF', 'SG_UF', 'NM_UF'],
+).astype({'CD_UF': np.int8})
+
+UF_CODE_BY_SIGLA = dict(zip(UF_TABLE['SG_UF'], UF_TABLE['CD_UF']))
+UF_SIGLA_BY_CODE = dict(zip(UF_TABLE['CD_UF'], UF_TABLE['SG_UF']))
+
+# Nome do arquivo de cada tabela de dimensão
+DIMENSION_FILES = {
+    'uf': 'dim_uf.parquet',
+    'municipio': 'dim_municipio.parquet',
+    'razao_social': 'dim_razao_social.parquet',
+    'cultura': 'dim_cultura.parquet',
+}
+
+# Colunas de chave inteira acrescentadas ao dataframe principal
+KEY_COLUMNS = ['CD_UF', 'CD_MUNICIPIO', 'ID_RAZAO_SOCIAL', 'ID_CULTURA']
+
+# Geometria das UFs gerada pelo pré-processamento (GeoJSON simples, CD_UF inteiro)
+STATES_GEOJSON_PATH = 'assets/estados.geojson'
+
+# Vizinhança entre UFs (fronteira comum), calculada no pré-processamento
+UF_ADJACENCY_PATH = 'assets/uf_adjacencia.json'
+
+
+# ---------------------------
+# Função: ID denso de dicionário
+# ---------------------------
+def _dictionary_ids(values: pd.Series, id_col: str, name_col: str):
+    """
+    Codifica os valores em IDs densos (ordem alfabética) e devolve (ids, tabela).
+    """
+    codes, uniques = pd.factorize(values, sort=True)
+    dtype = np.int16 if len(uniques) < np.iinfo(np.int16).max else np.int32
+    table = pd.DataFrame({id_col: np.arange(len(uniques), dtype=dtype), name_col: uniques})
+    return codes.astype(dtype), table
+
+
+# ---------------------------
+# Função: normalizar CD_GEOCMU
+# ---------------------------
+def normalize_municipality_code(codes: pd.Series) -> pd.Series:
+    """
+    Converte CD_GEOCMU (string ou número, às vezes com '.0' ou espaços) em Int32.
+    """
+    if pd.api.types.is_numeric_dtype(codes):
+        return codes.astype('Int32')
+    digits = codes.astype(str).str.strip().str.replace(r'\.0$', '', regex=True)
+    return pd.to_numeric(digits, errors='coerce').astype('Int32')
+
+
+# ---------------------------
+# Função: código IBGE da UF de cada linha
+# ---------------------------
+def state_codes(siglas: pd.Series, municipios: pd.Series = None) -> pd.Series:
+    """
+    CD_UF (Int8) pela sigla; com o CD_GEOCMU já normalizado (municipios),
+    a UF do IBGE são os dois primeiros dígitos do código, quando houver.
+    """
+    cd_uf = siglas.map(UF_CODE_BY_SIGLA).astype('Int8')
+    if municipios is None:
+        return cd_uf
+    return (municipios // 100000).astype('Int8').fillna(cd_uf)
+
+
+# ---------------------------
+# Função: acrescentar chaves inteiras
+# ---------------------------
+def add_dimension_keys(df: pd.DataFrame):
+    """
+    Acrescenta CD_UF, CD_MUNICIPIO, ID_RAZAO_SOCIAL e ID_CULTURA ao dataframe.
+
+    Retorna (df, dims), onde dims é um dicionário de tabelas de dimensão.
+    Sem CD_GEOCMU (parquet antigo), o município recebe um código substituto
+    negativo por par (UF, nome), para não confundir homônimos de estados diferentes.
+    """
+    df = df.copy()
+
+    if 'CD_GEOCMU' in df.columns:
+        df['CD_MUNICIPIO'] = normalize_municipality_code(df['CD_GEOCMU'])
+        df['CD_UF'] = state_codes(df['SG_UF_PROPRIEDADE'], df['CD_MUNICIPIO'])
+        df = df.drop(columns='CD_GEOCMU')
+    else:
+        df['CD_UF'] = state_codes(df['SG_UF_PROPRIEDADE'])
+        pairs = pd.MultiIndex.from_arrays([df['CD_UF'], df['NM_MUNICIPIO_PROPRIEDADE']])
+        codes, _ = pd.factorize(pairs, sort=True)
+        df['CD_MUNICIPIO'] = pd.array(-(codes + 1), dtype='Int32')
+
+    df['ID_RAZAO_SOCIAL'], dim_razao = _dictionary_ids(
+        df['NM_RAZAO_SOCIAL'], 'ID_RAZAO_SOCIAL', 'NM_RAZAO_SOCIAL')
+    df['ID_CULTURA'], dim_cultura = _dictionary_ids(
+        df['NM_CULTURA_GLOBAL'], 'ID_CULTURA', 'NM_CULTURA_GLOBAL')
+
+    dims = {
+        'uf': UF_TABLE.copy(),
+        'municipio': _key_table(df, ['CD_MUNICIPIO', 'CD_UF', 'NM_MUNICIPIO_PROPRIEDADE']),
+        'razao_social': dim_razao,
+        'cultura': dim_cultura,
+    }
+    return df, dims
+
+
+def _key_table(df: pd.DataFrame, columns: list) -> pd.DataFrame:
+    """
+    Uma linha por chave (a primeira coluna), ordenada pela chave. Chave com
+    mais de um rótulo (grafias diferentes do mesmo município) fica com o
+    primeiro em ordem alfabética, não o da primeira linha: a tabela não
+    depende da ordem das linhas (processamento completo x incremental).
+    """
+    return (
+        df[columns]
+        .dropna()
+        .drop_duplicates()
+        .sort_values(columns)
+        .drop_duplicates(columns[0])
+        .reset_index(drop=True)
+    )
+
+
+def dimensions_from_keys(df: pd.DataFrame) -> dict:
+    """
+    Tabelas de dimensão de um dataframe que já tem as chaves inteiras e os
+    nomes (parquet publicado sem as tabelas ao lado), sem refazer as chaves.
+    """
+    return {
+        'uf': UF_TABLE.copy(),
+        'municipio': _key_table(df, ['CD_MUNICIPIO', 'CD_UF', 'NM_MUNICIPIO_PROPRIEDADE']),
+        'razao_social': _key_table(df, ['ID_RAZAO_SOCIAL', 'NM_RAZAO_SOCIAL']),
+        'cultura': _key_table(df, ['ID_CULTURA', 'NM_CULTURA_GLOBAL']),
+    }
+
+
+# ---------------------------
+# Funções: salvar / carregar dimensões
+# ---------------------------
+def save_dimensions(dims: dict, folder: str = 'assets', origin: str = None) -> None:
+    """
+    Salva as tabelas de dimensão como parquet ao lado do dataset; origin é a
+    impressão digital do dataset cujas chaves elas descrevem.
+    """
+    for name, filename in DIMENSION_FILES.items():
+        save_with_origin(dims[name], os.path.join(folder, filename), origin)
+
+
+def load_dimensions(folder: str = 'assets', origin: str = None):
+    """
+    Carrega as tabelas de dimensão; retorna None se alguma estiver faltando
+    ou, com origin, se alguma não tiver sido gravada para esse dataset.
+    """
+    paths = {name: os.path.join(folder, f) for name, f in DIMENSION_FILES.items()}
+    if not all(os.path.exists(p) for p in paths.values()):
+        return None
+    if origin is not None and any(parquet_origin(p) != origin for p in paths.values()):
+        return None
+    return {name: pd.read_parquet(p) for name, p in paths.items()}
+
+
+# ---------------------------
+# Função: trazer os rótulos de volta
+# ---------------------------
+def attach_labels(df: pd.DataFrame, dims: dict) -> pd.DataFrame:
+    """
+    Acrescenta as colunas de nome (SG_UF_PROPRIEDADE, NM_MUNICIPIO_PROPRIEDADE,
+    NM_RAZAO_SOCIAL, NM_CULTURA_GLOBAL) a partir das chaves presentes em df.
+    """
+    if 'CD_UF' in df.columns:
+        df = df.assign(SG_UF_PROPRIEDADE=df['CD_UF'].map(UF_SIGLA_BY_CODE))
+    if 'CD_MUNICIPIO' in df.columns:
+        nomes = dims['municipio'].set_index('CD_MUNICIPIO')['NM_MUNICIPIO_PROPRIEDADE']
+        df = df.assign(NM_MUNICIPIO_PROPRIEDADE=df['CD_MUNICIPIO'].map(nomes))
+    if 'ID_RAZAO_SOCIAL' in df.columns:
+        nomes = dims['razao_social'].set_index('ID_RAZAO_SOCIAL')['NM_RAZAO_SOCIAL']
+        df = df.assign(NM_RAZAO_SOCIAL=df['ID_RAZAO_SOCIAL'].map(nomes))
+    if 'ID_CULTURA' in df.columns:
+        nomes = dims['cultura'].set_index('ID_CULTURA')['NM_CULTURA_GLOBAL']
+        df = df.assign(NM_CULTURA_GLOBAL=df['ID_CULTURA'].map(nomes))
+    return df
+
+
+# ---------------------------
+# Função: geometria das UFs sem geopandas
+# ---------------------------
+def read_states_geojson(path: str = STATES_GEOJSON_PATH) -> dict:
+    """
+    Lê o GeoJSON das UFs como dicionário, com propriedades CD_UF (inteiro,
+    chave dos mapas), SG_UF e NM_UF. Aceita também o GeoJSON bruto do IBGE
+    (CD_UF em texto, SIGLA_UF).
+    """
+    with open(path, encoding='utf-8') as f:
+        geojson = json.load(f)
+    for feature in geojson['features']:
+        props = feature['properties']
+        feature['properties'] = {
+            'CD_UF': int(props['CD_UF']),
+            'SG_UF': props.get('SG_UF') or props.get('SIGLA_UF'),
+            'NM_UF': props.get('NM_UF'),
+        }
+    return geojson
+
+
+# ---------------------------
+# Funções: vizinhança entre UFs
+# ---------------------------
+def build_uf_adjacency(gdf) -> dict:
+    """
+    CD_UF -> CD_UFs que fazem fronteira, a partir do GeoDataFrame das UFs
+    (consulta no índice espacial, sem comparar todos os pares).
+    """
+    codes = gdf['CD_UF'].astype(int).tolist()
+    tree = gdf.sindex
+    return {
+        code: sorted(codes[j] for j in tree.query(geometry, predicate='intersects') if j != i)
+        for i, (code, geometry) in enumerate(zip(codes, gdf.geometry))
+    }
+
+
+def save_uf_adjacency(adjacency: dict, path: str = UF_ADJACENCY_PATH) -> None:
+    """
+    Grava a vizinhança em JSON (chaves em texto).
+    """
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({str(k): v for k, v in sorted(adjacency.items())}, f)
+
+
+def load_uf_adjacency(path: str = UF_ADJACENCY_PATH) -> dict:
+    """
+    Lê a vizinhança gravada pelo pré-processamento; vazio se não existir.
+    """
+    if not os.path.exists(path):
+        return {}
+    with open(path, encoding='utf-8') as f:
+        return {int(k): v for k, v in json.load(f).items()}
@@ -0,0 +1,237 @@
+### disk_cache.py
+# Cache persistente de resultados em disco (SQLite), compartilhado entre
+# processos e reinícios do servidor.
+#
+# A chave é endereçada por conteúdo: hash de (namespace, parâmetros,
+# impressão digital do dataset, versão do código da camada de dados). Um
+# parquet novo ou uma mudança em loaders.py ou em qualquer módulo que ele
+# importe (aggregates.py, figures.py, search_index.py, ...) gera chaves
+# novas; as antigas saem pela poda por tamanho.
+#
+# O banco usa journal WAL, então vários workers leem ao mesmo tempo e as
+# escritas são transações curtas (INSERT OR REPLACE); busy_timeout cobre a
+# disputa entre escritores. Os valores são serializados com pickle — o
+# arquivo é local e confiável, não deve vir de fora.
+#
+# Caminho: TERRA_DISK_CACHE (padrão cache/resultados.sqlite; "0" desliga).
+# Tamanho máximo: TERRA_DISK_CACHE_MB (padrão 2048).
+
+import hashlib
+import os
+import pickle
+import sqlite3
+import threading
+import time
+
+DEFAULT_PATH = 'cache/resultados.sqlite'
+DEFAULT_MAX_MB = 2048
+
+# Módulos cujo código determina o conteúdo dos resultados guardados: todos
+# os alcançáveis por import a partir de loaders.py, onde ficam os
+# carregadores com persist=True (tests/test_disk_cache.py confere a lista)
+DATA_LAYER_MODULES = [
+    'aggregates.py', 'cache_manager.py', 'concentration.py', 'coverage_bits.py',
+    'dimensions.py', 'disk_cache.py', 'explorer.py', 'figures.py', 'loaders.py',
+    'outliers.py', 'rankings.py', 'render_pool.py', 'sampling.py',
+    'search_index.py', 'snapshots.py', 'timeseries.py',
+]
+
+_SCHEMA = '''
+CREATE TABLE IF NOT EXISTS resultados (
+    chave     TEXT PRIMARY KEY,
+    namespace TEXT NOT NULL,
+    criado    REAL NOT NULL,
+    bytes     INTEGER NOT NULL,
+    valor     BLOB NOT NULL
+)
+'''
+
+
+# ---------------------------
+# Impressões digitais
+# ---------------------------
+_fingerprints = {}
+_fingerprints_lock = threading.Lock()
+
+
+def file_fingerprint(path: str) -> str:
+    """
+    SHA-256 (16 hex) do conteúdo do arquivo; memorizado por (tamanho, mtime),
+    então só relê o arquivo quando ele muda.
+    """
+    stat = os.stat(path)
+    signature = (os.path.abspath(path), stat.st_size, stat.st_mtime_ns)
+    with _fingerprints_lock:
+        cached_value = _fingerprints.get(signature)
+    if cached_value is not None:
+        return cached_value
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    value = digest.hexdigest()[:16]
+    with _fingerprints_lock:
+        _fingerprints[signature] = value
+    return value
+
+
+def code_fingerprint(base_dir: str = None) -> str:
+    """
+    Hash do código-fonte da camada de dados (DATA_LAYER_MODULES).
+    """
+    base_dir = base_dir or os.path.dirname(os.path.abspath(__file__))
+    digest = hashlib.sha256()
+    for name in DATA_LAYER_MODULES:
+        path = os.path.join(base_dir, name)
+        if os.path.exists(path):
+            digest.update(name.encode())
+            digest.update(file_fingerprint(path).encode())
+    return digest.hexdigest()[:16]
+
+
+# ---------------------------
+# Origem dos derivados do pré-processamento
+# ---------------------------
+# Chave, nos metadados do parquet derivado, da impressão digital do dataset
+# de que ele saiu: IDs de dicionário só valem junto com esse dataset
+ORIGIN_METADATA_KEY = b'terra_origem'
+
+_origins = {}
+
+
+def save_with_origin(df, path: str, origin: str = None) -> None:
+    """df.to_parquet(path, index=False), com origin gravado nos metadados."""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    if origin is not None:
+        table = table.replace_schema_metadata({**(table.schema.metadata or {}), ORIGIN_METADATA_KEY: origin.encode()})
+    pq.write_table(table, path)
+
+
+def parquet_origin(path: str):
+    """
+    Impressão digital do dataset de origem gravada em path (None se não
+    houver); lê só o rodapé, memorizado por (tamanho, mtime).
+    """
+    import pyarrow.parquet as pq
+
+    stat = os.stat(path)
+    signature = (os.path.abspath(path), stat.st_size, stat.st_mtime_ns)
+    with _fingerprints_lock:
+        if signature in _origins:
+            return _origins[signature]
+    value = (pq.read_schema(path).metadata or {}).get(ORIGIN_METADATA_KEY)
+    value = value.decode() if value is not None else None
+    with _fingerprints_lock:
+        _origins[signature] = value
+    return value
+
+
+# ---------------------------
+# Classe: armazenamento SQLite
+# ---------------------------
+class DiskCache:
+    """
+    Tabela chave -> valor (pickle) num SQLite em modo WAL. Uma conexão por
+    thread; seguro entre processos.
+    """
+
+    def __init__(self, path: str, max_bytes: int, code_version: str = None):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.code_version = code_version or code_fingerprint()
+        self._local = threading.local()
+        folder = os.path.dirname(path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute(_SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.execute('PRAGMA busy_timeout=30000')
+            self._local.conn = conn
+        return conn
+
+    def key(self, namespace: str, params) -> str:
+        """Chave endereçada por conteúdo para (namespace, parâmetros)."""
+        raw = repr((namespace, params, self.code_version)).encode()
+        return hashlib.sha256(raw).hexdigest()
+
+    def get(self, key: str):
+        """Valor guardado, ou _MISSING."""
+        row = self._connect().execute('SELECT valor FROM resultados WHERE chave = ?', (key,)).fetchone()
+        if row is None:
+            return _MISSING
+        return pickle.loads(row[0])
+
+    def put(self, key: str, namespace: str, value):
+        payload = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        if len(payload) > self.max_bytes:
+            return
+        conn = self._connect()
+        conn.execute(
+            'INSERT OR REPLACE INTO resultados (chave, namespace, criado, bytes, valor) VALUES (?, ?, ?, ?, ?)',
+            (key, namespace, time.time(), len(payload), payload)
+        )
+        self.prune()
+
+    def get_or_compute(self, namespace: str, params, compute):
+        """
+        Lê do disco; se não houver, calcula e grava. Dois processos podem
+        calcular a mesma chave ao mesmo tempo — o último a gravar vence, e
+        os valores são iguais.
+        """
+        key = self.key(namespace, params)
+        value = self.get(key)
+        if value is _MISSING:
+            value = compute()
+            self.put(key, namespace, value)
+        return value
+
+    def prune(self):
+        """Apaga as entradas mais antigas até caber em max_bytes."""
+        conn = self._connect()
+        total = conn.execute('SELECT COALESCE(SUM(bytes), 0) FROM resultados').fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            for key, size in conn.execute('SELECT chave, bytes FROM resultados ORDER BY criado').fetchall():
+                if total <= self.max_bytes:
+                    break
+                conn.execute('DELETE FROM resultados WHERE chave = ?', (key,))
+                total -= size
+            conn.execute('COMMIT')
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+
+    def clear(self):
+        self._connect().execute('DELETE FROM resultados')
+
+    def summary(self) -> list:
+        """(namespace, entradas, bytes) por namespace."""
+        return self._connect().execute(
+            'SELECT namespace, COUNT(*), SUM(bytes) FROM resultados GROUP BY namespace ORDER BY namespace'
+        ).fetchall()
+
+
+_MISSING = object()
+
+
+def open_default():
+    """
+    DiskCache configurado pelo ambiente, ou None se desligado.
+    """
+    path = os.environ.get('TERRA_DISK_CACHE', DEFAULT_PATH)
+    if path in ('', '0'):
+        return None
+    max_mb = float(os.environ.get('TERRA_DISK_CACHE_MB', DEFAULT_MAX_MB))
+    return DiskCache(path, int(max_mb * 2**20))
@@ -0,0 +1,115 @@
+### explorer.py
+# Explorador paginado das linhas brutas.
+#
+# O navegador recebe só a página visível; ordenação e filtros rodam aqui,
+# sobre índices por coluna montados uma vez por dataset (e cacheados pelos
+# loaders):
+# - ordenação: permutação estável das linhas pela coluna, nulos no fim;
+#   a decrescente é a mesma permutação lida de trás para frente;
+# - filtro de texto: a coluna vira códigos + valores distintos (dicionário);
+#   a busca percorre só os distintos e a máscara sai de match[códigos];
+# - filtro de faixa: busca binária (searchsorted) nos valores já ordenados
+#   pela permutação da coluna.
+# Uma consulta produz a ordem das linhas que passam (row_order); a página é
+# um fatiamento dela, então rolar entre páginas não refaz a consulta.
+
+import numpy as np
+import pandas as pd
+
+from dimensions import KEY_COLUMNS
+
+# Opções de linhas por página
+PAGE_SIZES = [50, 100, 200]
+
+
+# ---------------------------
+# Índices por coluna
+# ---------------------------
+def explorer_columns(df: pd.DataFrame) -> list:
+    """Colunas exibidas: as do dataset, sem as chaves inteiras internas."""
+    return [c for c in df.columns if c not in KEY_COLUMNS]
+
+
+def is_range_column(series: pd.Series) -> bool:
+    """Colunas numéricas aceitam filtro de faixa; as outras, de texto."""
+    return pd.api.types.is_numeric_dtype(series) and not pd.api.types.is_bool_dtype(series)
+
+
+def build_sort_index(series: pd.Series) -> tuple:
+    """
+    (permutação, valores_ordenados, válidos): posições das linhas em ordem
+    crescente estável com os nulos no fim, os valores nessa ordem (só os
+    numéricos; None para texto) e quantas linhas não são nulas.
+    """
+    if is_range_column(series):
+        values = series.to_numpy(dtype='float64', na_value=np.nan)
+        order = np.argsort(values, kind='stable')
+        valid = int(np.count_nonzero(~np.isnan(values)))
+        return order, values[order[:valid]], valid
+
+    codes, _ = pd.factorize(series, sort=True)
+    valid = int(np.count_nonzero(codes >= 0))
+    codes = np.where(codes < 0, codes.max(initial=0) + 1, codes)
+    return np.argsort(codes, kind='stable'), None, valid
+
+
+def build_text_index(series: pd.Series) -> tuple:
+    """(códigos, distintos em casefold); nulo tem código -1."""
+    codes, uniques = pd.factorize(series)
+    folded = pd.Index(uniques).astype(str).str.casefold()
+    return codes, np.asarray(folded, dtype=object)
+
+
+# ---------------------------
+# Filtros
+# ---------------------------
+def text_mask(text_index: tuple, text: str) -> np.ndarray:
+    """Linhas cujo valor contém text (sem diferenciar maiúsculas)."""
+    codes, folded = text_index
+    needle = text.casefold()
+    match = np.fromiter((needle in value for value in folded), dtype=bool, count=len(folded))
+    # Código -1 (nulo) cai na posição extra, que nunca casa
+    return np.append(match, False)[codes]
+
+
+def range_mask(sort_index: tuple, n_rows: int, low=None, high=None) -> np.ndarray:
+    """Linhas com low <= valor <= high (limite None = aberto); nulos ficam de fora."""
+    order, sorted_values, valid = sort_index
+    start = 0 if low is None else int(np.searchsorted(sorted_values, low, side='left'))
+    stop = valid if high is None else int(np.searchsorted(sorted_values, high, side='right'))
+    mask = np.zeros(n_rows, dtype=bool)
+    mask[order[start:stop]] = True
+    return mask
+
+
+# ---------------------------
+# Consulta e página
+# ---------------------------
+def descending(sort_index: tuple) -> np.ndarray:
+    """Permutação decrescente com os nulos ainda no fim."""
+    order, _, valid = sort_index
+    return np.concatenate([order[:valid][::-1], order[valid:]])
+
+
+def row_order(n_rows: int, sort_index: tuple = None, reverse: bool = False, masks=()) -> np.ndarray:
+    """
+    Posições das linhas que passam em todas as máscaras, na ordem do índice
+    de ordenação (crescente ou decrescente) ou na ordem original.
+    """
+    if sort_index is None:
+        order = np.arange(n_rows)
+    else:
+        order = descending(sort_index) if reverse else sort_index[0]
+    if masks:
+        keep = np.logical_and.reduce(list(masks))
+        order = order[keep[order]]
+    return order
+
+
+def page(df: pd.DataFrame, order: np.ndarray, number: int, size: int, columns: list = None) -> pd.DataFrame:
+    """Página number (a partir de 0) com size linhas, só das colunas pedidas."""
+    rows = order[number * size:(number + 1) * size]
+    frame = df.take(rows)
+    if columns is not None:
+        frame = frame[columns]
+    return frame.reset_index(drop=True)
@@ -0,0 +1,180 @@
+### exports.py
+# Exportação das linhas por trás dos gráficos (e dos agregados) em fluxo.
+#
+# As linhas saem direto do parquet do snapshot, sem montar um DataFrame
+# filtrado: o scanner do pyarrow lê só as colunas pedidas e aplica o filtro
+# na leitura (row groups cujas estatísticas não batem nem são lidos), e cada
+# lote de EXPORT_BATCH_ROWS linhas é codificado e entregue antes de ler o
+# próximo. A memória fica em alguns lotes, e os primeiros bytes saem logo.
+#
+# - CSV: UTF-8 com BOM (o Excel abre os acentos certos), cabeçalho no
+#   primeiro lote;
+# - parquet: um row group por lote, bytes drenados a cada lote;
+# - xlsx: openpyxl em modo write_only (linhas vão para arquivo temporário);
+#   o zip só existe no fim, então o primeiro byte espera o arquivo inteiro.
+
+import io
+import tempfile
+
+EXPORT_FORMATS = {
+    'csv': 'text/csv; charset=utf-8',
+    'parquet': 'application/vnd.apache.parquet',
+    'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+}
+
+# Linhas por lote lido/codificado
+EXPORT_BATCH_ROWS = 16_384
+
+# Row group do parquet publicado (ordenado por UF: o filtro pula os outros)
+DATASET_ROW_GROUP_ROWS = 65_536
+
+# Limite de linhas de uma planilha (uma fica para o cabeçalho)
+EXCEL_MAX_ROWS = 1_048_575
+
+# Bytes por pedaço ao devolver o xlsx pronto
+_FILE_CHUNK = 1 << 20
+
+
+# ---------------------------
+# Leitura em lotes
+# ---------------------------
+def row_filter(uf: str = None, razao_social: str = None):
+    """Expressão do pyarrow para UF (sigla) e razão social (nome); None = tudo."""
+    import pyarrow.dataset as ds
+
+    expression = None
+    for column, value in [('SG_UF_PROPRIEDADE', uf), ('NM_RAZAO_SOCIAL', razao_social)]:
+        if value is not None:
+            condition = ds.field(column) == value
+            expression = condition if expression is None else expression & condition
+    return expression
+
+
+def open_scanner(path: str, columns: list = None, filter=None, batch_size: int = EXPORT_BATCH_ROWS):
+    """
+    Scanner do parquet (arquivo ou pasta de partições) com projeção e filtro;
+    coluna desconhecida levanta ValueError.
+    """
+    import pyarrow.dataset as ds
+
+    dataset = ds.dataset(path, format='parquet')
+    if columns is not None:
+        missing = [c for c in columns if c not in dataset.schema.names]
+        if missing:
+            raise ValueError(f'colunas desconhecidas: {missing}')
+    return dataset.scanner(columns=columns, filter=filter, batch_size=batch_size)
+
+
+def iter_batches(scanner):
+    """Lotes não vazios do scanner, um por vez."""
+    for batch in scanner.to_batches():
+        if batch.num_rows:
+            yield batch
+
+
+# ---------------------------
+# Codificação em fluxo
+# ---------------------------
+class _DrainBuffer(io.BytesIO):
+    """BytesIO esvaziado a cada lote; tell() segue a posição absoluta no arquivo."""
+
+    offset = 0
+
+    def tell(self):
+        return self.offset + super().tell()
+
+    def drain(self) -> bytes:
+        data = self.getvalue()
+        self.offset += len(data)
+        self.seek(0)
+        self.truncate()
+        return data
+
+
+def stream_csv(batches):
+    import pyarrow.csv as pacsv
+
+    yield '\ufeff'.encode('utf-8')
+    buffer = io.BytesIO()
+    for i, batch in enumerate(batches):
+        pacsv.write_csv(batch, buffer, pacsv.WriteOptions(include_header=i == 0))
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+
+
+def stream_parquet(batches, schema):
+    import pyarrow.parquet as pq
+
+    buffer = _DrainBuffer()
+    with pq.ParquetWriter(buffer, schema) as writer:
+        for batch in batches:
+            writer.write_batch(batch)
+            yield buffer.drain()
+    yield buffer.drain()
+
+
+def stream_xlsx(batches, schema, sheet: str = 'dados'):
+    from openpyxl import Workbook
+
+    workbook = Workbook(write_only=True)
+    worksheet = workbook.create_sheet(sheet)
+    worksheet.append(schema.names)
+    rows = 0
+    for batch in batches:
+        rows += batch.num_rows
+        if rows > EXCEL_MAX_ROWS:
+            raise ValueError(f'mais de {EXCEL_MAX_ROWS} linhas não cabem numa planilha; use csv ou parquet')
+        for row in zip(*(column.to_pylist() for column in batch.columns)):
+            worksheet.append(row)
+
+    with tempfile.TemporaryFile() as f:
+        workbook.save(f)
+        f.seek(0)
+        while chunk := f.read(_FILE_CHUNK):
+            yield chunk
+
+
+def encode_stream(batches, schema, formato: str):
+    """Gerador de bytes do arquivo no formato pedido."""
+    if formato == 'csv':
+        return stream_csv(batches)
+    if formato == 'parquet':
+        return stream_parquet(batches, schema)
+    if formato == 'xlsx':
+        return stream_xlsx(batches, schema)
+    raise ValueError(f'formato deve ser um de {sorted(EXPORT_FORMATS)}')
+
+
+# ---------------------------
+# Exportações
+# ---------------------------
+def export_rows(path: str, formato: str, uf: str = None, razao_social: str = None, columns: list = None):
+    """
+    Linhas do dataset em path filtradas por UF/razão social, só com columns
+    (None = todas), como gerador de bytes no formato pedido. Formato ou
+    coluna inválida (ou xlsx acima do limite de linhas) levantam ValueError
+    antes do primeiro byte.
+    """
+    if formato not in EXPORT_FORMATS:
+        raise ValueError(f'formato deve ser um de {sorted(EXPORT_FORMATS)}')
+    scanner = open_scanner(path, columns, row_filter(uf, razao_social))
+    if formato == 'xlsx' and scanner.count_rows() > EXCEL_MAX_ROWS:
+        raise ValueError(f'mais de {EXCEL_MAX_ROWS} linhas não cabem numa planilha; use csv ou parquet')
+    return encode_stream(iter_batches(scanner), scanner.projected_schema, formato)
+
+
+def export_frame(df, formato: str) -> bytes:
+    """Uma tabela pequena (agregado) inteira no formato pedido."""
+    import pyarrow as pa
+
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    return b''.join(encode_stream(table.to_batches(EXPORT_BATCH_ROWS), table.schema, formato))
+
+
+def export_filename(formato: str, *parts) -> str:
+    """Nome do arquivo: partes não vazias unidas por "_", sem espaços nem barras."""
+    name = '_'.join(str(p) for p in parts if p)
+    for char in ' /\\':
+        name = name.replace(char, '-')
+    return f'{name or "dados"}.{formato}'
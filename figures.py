@@ -0,0 +1,290 @@
+### figures.py
+# Construção dos gráficos (plotly) e mapas (folium) do painel.
+# Cada função recebe os agregados prontos e devolve o objeto da figura;
+# o app só decide onde exibir. Assim dá para medir, cachear e paralelizar
+# cada artefato separadamente.
+#
+# plotly.express e folium são importados dentro das funções: com os
+# artefatos já no cache (HTML dos mapas, figuras prontas) o servidor não
+# paga a importação deles.
+
+import pandas as pd
+
+# Centro e zoom iniciais dos mapas do Brasil
+MAP_LOCATION = [-15.78, -47.93]
+MAP_ZOOM = 3
+
+# Métricas do gráfico de barras por razão social: rótulo -> coluna
+INSURER_METRICS = {
+    "Número de Seguros": "numero_seguros",
+    "Contagem de Estados": "contagem_estados",
+    "Área Total": "area_total"
+}
+
+
+# ---------------------------
+# Gráfico de Barras — Razão Social
+# ---------------------------
+def bar_by_insurer(df_razao_social: pd.DataFrame, metric_column: str, selected_metric: str):
+    """
+    Barras da métrica escolhida por razão social, em ordem decrescente.
+    """
+    import plotly.express as px
+    df_sorted = df_razao_social.sort_values(by=metric_column, ascending=False)
+    fig_bar = px.bar(
+        df_sorted,
+        x="NM_RAZAO_SOCIAL",
+        y=metric_column,
+        title=f"{selected_metric} por razão social",
+        labels={"NM_RAZAO_SOCIAL": "Razão Social", metric_column: selected_metric},
+        color=metric_column,
+        color_continuous_scale="Viridis"
+    )
+
+    fig_bar.update_layout(
+        template="plotly_white",
+        title=dict(text=f"{selected_metric} por Razão Social", x=0.5, font=dict(size=18)),
+        xaxis=dict(tickangle=45, automargin=True, tickfont=dict(size=11)),
+        yaxis=dict(tickfont=dict(size=11), gridcolor="rgba(200,200,200,0.3)"),
+        coloraxis=dict(
+            colorbar=dict(
+                title=dict(text=selected_metric, font=dict(size=12, color="#333")),
+                tickfont=dict(size=11, color="#555")
+            )
+        ),
+        bargap=0.25,
+        plot_bgcolor="rgba(0,0,0,0)",
+        paper_bgcolor="rgba(0,0,0,0)",
+        margin=dict(t=60, b=150)
+    )
+
+    fig_bar.update_traces(
+        texttemplate="%{y:.2f}",
+        textposition="outside",
+        hovertemplate="<b>%{x}</b><br>" + selected_metric + ": %{y:.2f}<extra></extra>"
+    )
+    return fig_bar
+
+
+# ---------------------------
+# Cards de métricas
+# ---------------------------
+def summary_card(df_razao_social: pd.DataFrame, column: str) -> dict:
+    """
+    Máximo da coluna, razão social que o atinge e variação do máximo sobre a média (%).
+    """
+    max_value = df_razao_social[column].max()
+    mean_value = df_razao_social[column].mean()
+    return {
+        "max": max_value,
+        "var": ((max_value - mean_value) / mean_value) * 100,
+        "top": df_razao_social.loc[df_razao_social[column] == max_value, 'NM_RAZAO_SOCIAL'].values[0],
+    }
+
+
+# ---------------------------
+# Heatmap de Correlação
+# ---------------------------
+def correlation_heatmap(correlation_matrix: pd.DataFrame):
+    """
+    Heatmap da matriz de correlação entre parâmetros.
+    """
+    import plotly.express as px
+    return px.imshow(
+        correlation_matrix,
+        text_auto=True,
+        color_continuous_scale='Blues',
+        title='Correlação entre parâmetros',
+        width=400,
+        height=800
+    )
+
+
+# ---------------------------
+# Mapa coroplético por estado
+# ---------------------------
+def choropleth_map(geo_data, df_estado: pd.DataFrame, column: str, name: str,
+                   fill_color: str, line_color: str, legend_name: str) -> 'folium.Map':
+    """
+    Mapa folium com a coluna de df_estado pintada por UF (join por CD_UF).
+    """
+    import folium
+    m = folium.Map(location=MAP_LOCATION, zoom_start=MAP_ZOOM)
+    folium.Choropleth(
+        geo_data=geo_data,
+        name=name,
+        data=df_estado,
+        columns=['CD_UF', column],
+        key_on='feature.properties.CD_UF',
+        fill_color=fill_color,
+        fill_opacity=0.7,
+        line_opacity=0.4,
+        line_color=line_color,
+        legend_name=legend_name,
+        bins=4,
+        reset=True
+    ).add_to(m)
+    return m
+
+
+def area_map(geo_data, df_estado: pd.DataFrame) -> 'folium.Map':
+    """Mapa de área total assegurada por estado."""
+    return choropleth_map(geo_data, df_estado, 'area_total', 'Área Total',
+                          'BuPu', 'black', 'Área total assegurada (ha)')
+
+
+def seguros_map(geo_data, df_estado: pd.DataFrame) -> 'folium.Map':
+    """Mapa de número de seguros por estado."""
+    return choropleth_map(geo_data, df_estado, 'numero_seguros', 'Número de Seguros',
+                          'YlGnBu', 'white', 'Número de Seguros')
+
+
+def outlier_map(geo_data, df_atipicas: pd.DataFrame) -> 'folium.Map':
+    """Mapa da fração de apólices atípicas por estado."""
+    return choropleth_map(geo_data, df_atipicas, 'taxa_atipicas', 'Apólices atípicas',
+                          'OrRd', 'black', 'Apólices atípicas (%)')
+
+
+MAP_BUILDERS = {'area': area_map, 'seguros': seguros_map, 'atipicas': outlier_map}
+
+
+def map_html(m: 'folium.Map') -> str:
+    """
+    HTML completo do mapa (o mesmo que o folium_static renderiza).
+    """
+    return m.get_root().render()
+
+
+def state_map_html(tipo: str, geo_data, df_estado: pd.DataFrame) -> str:
+    """
+    HTML do mapa "area", "seguros" ou "atipicas" numa chamada só (função de
+    módulo, para rodar num processo do render_pool).
+    """
+    return map_html(MAP_BUILDERS[tipo](geo_data, df_estado))
+
+
+# ---------------------------
+# Gráfico de Pizza — Valor Total
+# ---------------------------
+def pie_valor(df_razao_social: pd.DataFrame):
+    """
+    Distribuição do valor total assegurado por razão social.
+    """
+    import plotly.express as px
+    fig_pie_valor = px.pie(
+        df_razao_social,
+        names='NM_RAZAO_SOCIAL',
+        values='valor_total',
+        title='Distribuição do Valor Total Assegurado'
+    )
+    fig_pie_valor.update_layout(
+        legend=dict(
+            orientation="h",
+            yanchor="top",
+            y=-0.4,
+            xanchor="center",
+            x=0.5,
+            itemsizing='constant',
+            traceorder='normal',
+            itemclick='toggle',
+            font=dict(size=9),
+            title=None,
+            bgcolor='rgba(255,255,255,0)'
+        ),
+        title=dict(x=0.5, font=dict(size=16))
+    )
+    return fig_pie_valor
+
+
+# ---------------------------
+# Heatmap de participação (razão social x estado)
+# ---------------------------
+def share_heatmap(share_frame: pd.DataFrame):
+    """
+    Heatmap das participações; células NaN (sem atuação) ficam em branco.
+    """
+    import plotly.express as px
+    return px.imshow(
+        share_frame,
+        color_continuous_scale="Viridis",
+        aspect="auto",
+        title="Participação no valor assegurado (razão social x estado)",
+        labels={"x": "Estado", "y": "Razão Social", "color": "Participação"}
+    )
+
+
+# ---------------------------
+# Gráficos do estado
+# ---------------------------
+def top_municipios_bar(df_top: pd.DataFrame, column: str, title: str, label: str):
+    """
+    Barras dos municípios do ranking (área ou valor).
+    """
+    import plotly.express as px
+    fig = px.bar(
+        df_top,
+        x='NM_MUNICIPIO_PROPRIEDADE',
+        y=column,
+        title=title,
+        labels={'NM_MUNICIPIO_PROPRIEDADE': 'Município', column: label},
+        text_auto='.2s'
+    )
+    fig.update_layout(xaxis_tickangle=-45)
+    return fig
+
+
+def seguros_por_razao_bar(df_estado: pd.DataFrame, estado_escolhido: str):
+    """
+    Número de seguros por razão social dentro do estado.
+    """
+    import plotly.express as px
+    fig = px.bar(
+        df_estado,
+        x='NM_RAZAO_SOCIAL',
+        y='numero_seguros',
+        title=f'Número de seguros em {estado_escolhido} por razão social',
+        labels={'NM_RAZAO_SOCIAL': 'Razão Social', 'numero_seguros': 'Número de seguros'},
+        text_auto='.2s'
+    )
+    fig.update_layout(xaxis_tickangle=-45)
+    return fig
+
+
+# ---------------------------
+# Prévia estimada (amostra estratificada)
+# ---------------------------
+def estimate_bar(df_estimado: pd.DataFrame, x: str, column: str, title: str, labels: dict):
+    """
+    Barras de totais estimados com o intervalo de confiança (coluna
+    <column>_erro) como barra de erro, em ordem decrescente.
+    """
+    import plotly.express as px
+    fig = px.bar(
+        df_estimado.sort_values(by=column, ascending=False),
+        x=x,
+        y=column,
+        error_y=f'{column}_erro',
+        title=f'{title} (estimativa)',
+        labels=labels
+    )
+    fig.update_traces(marker_color='rgba(120,120,120,0.6)')
+    fig.update_layout(template="plotly_white", xaxis_tickangle=-45)
+    return fig
+
+
+# ---------------------------
+# Série temporal
+# ---------------------------
+def trend_line(df_serie: pd.DataFrame, titulo: str):
+    """
+    Valor assegurado mês a mês.
+    """
+    import plotly.express as px
+    return px.line(
+        df_serie,
+        x="MES",
+        y="valor_total",
+        markers=True,
+        title=titulo,
+        labels={"MES": "Mês", "valor_total": "Valor Total (R$)"}
+    )
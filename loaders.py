@@ -0,0 +1,271 @@
+### loaders.py
+# Carregamento e artefatos cacheados do painel, sem nenhuma chamada de UI:
+# o appv1.2.py exibe, o warmup.py pré-calcula com as mesmas funções.
+#
+# Todos os loaders usam o cache do processo (cache_manager): cada entrada tem
+# o tamanho medido e o total respeita TERRA_CACHE_BUDGET_MB, com despejo por
+# custo/tamanho. Os valores são compartilhados entre sessões — não alterar.
+# Todos recebem a versão (hash do conteúdo) do snapshot de dados: os
+# derivados com persist=True também ficam no cache em disco, reaproveitados
+# por outros workers e após reinícios, e um snapshot novo invalida tudo.
+#
+# Nada aqui importa geopandas, folium ou plotly: a geometria vem do GeoJSON
+# simples gerado no pré-processamento e as bibliotecas de figura só são
+# importadas (em figures.py) quando um artefato precisa ser montado.
+
+import os
+
+import aggregates
+import explorer
+import figures
+from cache_manager import CACHE, cached
+from concentration import ConcentrationMetrics, build_concentration
+from dimensions import STATES_GEOJSON_PATH, UF_SIGLA_BY_CODE, load_uf_adjacency, read_states_geojson
+from outliers import OUTLIER_COLUMNS, add_outlier_columns, outlier_rate_by_state, outlier_table
+from rankings import MunicipalityRanking, build_municipality_ranking, load_ranking
+from render_pool import run_in_process
+from sampling import load_sample, sample_estimates
+from search_index import SearchIndex, build_search_entities, load_search_entities
+from snapshots import current_version, snapshot_files
+from timeseries import MonthlyIndex, build_monthly_bins, load_monthly_bins
+
+# GeoJSON bruto das UFs, usado se o pré-processamento ainda não gerou o simples
+RAW_GEOJSON_PATH = "assets/BR_UF_2024_Filtrado.geojson"
+
+# Artefatos do ramo "Razão Social" que não dependem da métrica escolhida
+RAZAO_SOCIAL_FIGURES = ["cards", "heatmap_correlacao", "pizza_valor", "heatmap_participacao"]
+
+
+# ---------------------------
+# Dados e agregados
+# ---------------------------
+# csv ou excel
+@cached("dados")
+def load_data(versao: str):
+    """Carrega o dataframe principal (parquet do snapshot) e as tabelas de dimensão."""
+    return aggregates.load_dataset(snapshot_files(versao)["dados"])
+
+#geometria dos estados
+@cached("geodata")
+def load_geodata() -> dict:
+    """GeoJSON dos estados (dicionário), com CD_UF inteiro para o join dos mapas."""
+    if os.path.exists(STATES_GEOJSON_PATH):
+        return read_states_geojson(STATES_GEOJSON_PATH)
+    return read_states_geojson(RAW_GEOJSON_PATH)
+
+#vizinhança entre UFs (pré-busca da visão "Estado")
+@cached("adjacencia")
+def load_adjacency() -> dict:
+    """CD_UF -> UFs vizinhas; vazio se o pré-processamento não gerou o arquivo."""
+    return load_uf_adjacency()
+
+#ranking de municípios por UF (pré-processado; montado aqui se o arquivo não existir)
+@cached("ranking", persist=True)
+def load_rankings(versao: str) -> MunicipalityRanking:
+    """Carrega o índice de ranking de municípios por UF."""
+    ranking_path = snapshot_files(versao)["ranking"]
+    if ranking_path is not None:
+        return load_ranking(ranking_path)
+    df, dims = load_data(versao)
+    return MunicipalityRanking(build_municipality_ranking(df, dims))
+
+#agregados mensais (série temporal); None se o dataset não tiver datas
+@cached("mensal", persist=True)
+def load_monthly_indexes(versao: str):
+    """Carrega os bins mensais e monta os índices total, por UF e por razão social."""
+    monthly_path = snapshot_files(versao)["mensal"]
+    if monthly_path is not None:
+        bins = load_monthly_bins(monthly_path)
+    else:
+        df, dims = load_data(versao)
+        bins = build_monthly_bins(df)
+    if bins.empty:
+        return None
+    return {
+        "total": MonthlyIndex(bins),
+        "CD_UF": MonthlyIndex(bins, "CD_UF"),
+        "ID_RAZAO_SOCIAL": MonthlyIndex(bins, "ID_RAZAO_SOCIAL"),
+    }
+
+#estimativas da amostra estratificada (prévia enquanto os agregados exatos não saem)
+@cached("amostra")
+def load_sample_estimates(versao: str):
+    """Totais estimados por UF, razão social e razão social x UF; None sem amostra."""
+    sample_path = snapshot_files(versao)["amostra"]
+    if sample_path is None:
+        return None
+    return sample_estimates(load_sample(sample_path))
+
+#índice da busca por UF, razão social e município (trie + trigramas)
+@cached("busca", persist=True)
+def load_search_index(versao: str) -> SearchIndex:
+    """Índice montado das entidades do pré-processamento (ou derivadas aqui)."""
+    search_path = snapshot_files(versao)["busca"]
+    if search_path is not None:
+        return SearchIndex(load_search_entities(search_path))
+    df, dims = load_data(versao)
+    return SearchIndex(build_search_entities(df, dims))
+
+#concentração de mercado (participações e HHI), calculada uma vez por dataset
+@cached("concentracao", persist=True)
+def load_concentration(versao: str) -> ConcentrationMetrics:
+    """Participações por UF/cultura, HHI e matriz esparsa seguradora x UF."""
+    agregados = load_aggregates(versao)
+    return build_concentration(agregados["razao_social_estado"], agregados["razao_social_cultura"])
+
+#agregações do painel, calculadas uma vez por dataset (antes: a cada rerun)
+@cached("agregados", persist=True)
+def load_aggregates(versao: str) -> dict:
+    """Agregações por estado, razão social, razão social x estado/cultura e correlação."""
+    df, dims = load_data(versao)
+    return {
+        "estado": aggregates.aggregate_by_state(df, dims),
+        "razao_social": aggregates.aggregate_by_insurer(df, dims),
+        "razao_social_estado": aggregates.aggregate_by_insurer_state(df, dims),
+        "razao_social_cultura": aggregates.aggregate_by_insurer_culture(df, dims),
+        "correlacao": aggregates.correlation_matrix(df),
+    }
+
+
+#auditoria: apólices atípicas (colunas do pré-processamento; calculadas aqui no parquet antigo)
+@cached("auditoria", persist=True)
+def load_outliers(versao: str) -> dict:
+    """Tabela das apólices marcadas (mais atípicas primeiro) e fração por UF."""
+    df, dims = load_data(versao)
+    if not set(OUTLIER_COLUMNS).issubset(df.columns):
+        df = add_outlier_columns(df)
+    return {"tabela": outlier_table(df), "estado": outlier_rate_by_state(df)}
+
+
+# ---------------------------
+# Figuras e mapas
+# ---------------------------
+#barras por razão social, uma entrada por métrica
+@cached("figuras", persist=True)
+def load_insurer_bar(versao: str, metric_column: str, selected_metric: str):
+    """Gráfico de barras da métrica escolhida por razão social."""
+    return figures.bar_by_insurer(load_aggregates(versao)["razao_social"], metric_column, selected_metric)
+
+#cards, heatmaps e pizza do ramo "Razão Social", um artefato por nome (RAZAO_SOCIAL_FIGURES)
+@cached("figuras", persist=True)
+def load_razao_social_figure(versao: str, nome: str):
+    """Cards de máximos, heatmap de correlação, pizza de valor ou heatmap de participação."""
+    agregados = load_aggregates(versao)
+    df_razao_social = agregados["razao_social"]
+    if nome == "cards":
+        return {
+            "seguros": figures.summary_card(df_razao_social, 'numero_seguros'),
+            "estados": figures.summary_card(df_razao_social, 'contagem_estados'),
+            "area": figures.summary_card(df_razao_social, 'area_total'),
+        }
+    if nome == "heatmap_correlacao":
+        return figures.correlation_heatmap(agregados["correlacao"])
+    if nome == "pizza_valor":
+        return figures.pie_valor(df_razao_social)
+    if nome == "heatmap_participacao":
+        return figures.share_heatmap(load_concentration(versao).share_matrix_uf.to_frame())
+    raise ValueError(f"artefato desconhecido: {nome}")
+
+#HTML dos mapas coropléticos (montar e serializar o folium é a parte cara)
+@cached("mapas", persist=True)
+def load_map_html(versao: str, tipo: str) -> str:
+    """HTML do mapa "area" ou "seguros", pronto para components.html."""
+    # Montado num processo separado (folium é Python puro, preso ao GIL);
+    # o join geometria x agregados é feito pelo folium (key_on = CD_UF)
+    return run_in_process(figures.state_map_html, tipo, load_geodata(), load_aggregates(versao)["estado"])
+
+#mapa da fração de apólices atípicas por UF (camada da auditoria)
+@cached("mapas", persist=True)
+def load_outlier_map_html(versao: str) -> str:
+    """HTML do mapa de apólices atípicas, pronto para components.html."""
+    return run_in_process(figures.state_map_html, "atipicas", load_geodata(), load_outliers(versao)["estado"])
+
+#artefatos do ramo "Estado" por UF e tamanho do ranking
+@cached("estado", persist=True)
+def load_state_view(versao: str, cd_uf: int, top_n: int) -> dict:
+    """Fatias do ranking, correlação e gráficos do estado escolhido."""
+    estado = UF_SIGLA_BY_CODE[cd_uf]
+    ranking = load_rankings(versao)
+    df_razao_social_estado = load_aggregates(versao)["razao_social_estado"]
+
+    df_top_area = ranking.top(cd_uf, top_n, 'area_total')
+    df_top_valor = ranking.top(cd_uf, top_n, 'valor_total')
+
+    # Combinar top N de área e valor em uma lista única
+    df_top_combined = ranking.combined_top(cd_uf, top_n)
+
+    return {
+        # Correlação entre área total e valor total
+        "correlacao": df_top_combined[['area_total', 'valor_total']].corr().iloc[0, 1],
+        "fig_top_area": figures.top_municipios_bar(
+            df_top_area, 'area_total',
+            f'Top {top_n} Municípios com Maior Área em {estado}', 'Área Total (ha)'
+        ),
+        "fig_top_valor": figures.top_municipios_bar(
+            df_top_valor, 'valor_total',
+            f'Top {top_n} Municípios com Maior Valor Total em {estado}', 'Valor Total (R$)'
+        ),
+        "fig_seguros_por_razao": figures.seguros_por_razao_bar(
+            df_razao_social_estado[df_razao_social_estado['CD_UF'] == cd_uf], estado
+        ),
+    }
+
+
+# ---------------------------
+# Explorador de dados brutos
+# ---------------------------
+#índice de ordenação de uma coluna (serve também ao filtro de faixa)
+@cached("explorador_ordem")
+def load_sort_index(versao: str, column: str) -> tuple:
+    """Permutação crescente da coluna, valores ordenados e linhas não nulas."""
+    df, dims = load_data(versao)
+    return explorer.build_sort_index(df[column])
+
+#dicionário de uma coluna de texto (filtro "contém")
+@cached("explorador_texto")
+def load_text_index(versao: str, column: str) -> tuple:
+    """Códigos das linhas e valores distintos em casefold."""
+    df, dims = load_data(versao)
+    return explorer.build_text_index(df[column])
+
+#linhas de uma consulta do explorador, já ordenadas; as páginas são fatias
+@cached("explorador_consulta")
+def load_explorer_order(versao: str, sort_column, reverse: bool, filters: tuple):
+    """
+    Posições das linhas que passam nos filtros, na ordem pedida (sort_column
+    None = ordem original). filters: tupla de ("texto", coluna, termo) e
+    ("faixa", coluna, mínimo, máximo).
+    """
+    df, dims = load_data(versao)
+    masks = []
+    for kind, column, *args in filters:
+        if kind == "texto":
+            masks.append(explorer.text_mask(load_text_index(versao, column), *args))
+        else:
+            masks.append(explorer.range_mask(load_sort_index(versao, column), len(df), *args))
+    sort_index = load_sort_index(versao, sort_column) if sort_column is not None else None
+    return explorer.row_order(len(df), sort_index, reverse, masks)
+
+
+# ---------------------------
+# Troca de snapshot
+# ---------------------------
+def prepare_version(versao: str):
+    """Carrega os dados e os agregados da versão (rodado pelo SnapshotWatcher)."""
+    load_data(versao)
+    load_aggregates(versao)
+    load_concentration(versao)
+    load_rankings(versao)
+    load_monthly_indexes(versao)
+    load_sample_estimates(versao)
+    load_search_index(versao)
+    load_outliers(versao)
+
+
+def retire_version(versao: str):
+    """
+    Tira do cache em memória tudo da versão antiga; a memória volta quando
+    o último rerun que ainda segura as referências terminar.
+    """
+    # Chave: (namespace, função, args, kwargs); a versão é o 1º argumento
+    CACHE.discard(lambda key: key[2][:1] == (versao,))
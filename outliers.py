@@ -0,0 +1,147 @@
+### outliers.py
+# Apólices atípicas para auditoria das avaliações.
+#
+# Cada apólice é comparada com as pares do mesmo município e cultura pelo
+# z-score robusto (Iglewicz & Hoaglin): z = 0,6745 (x - mediana) / MAD.
+# Mediana e MAD não se deixam puxar pelos próprios valores atípicos, ao
+# contrário de média e desvio-padrão. Tudo sai de groupby().transform
+# vetorizado, sem apply nem laço por linha.
+#
+# Grupo com menos de MIN_PEERS apólices não tem pares suficientes: a apólice
+# é comparada com a UF inteira na mesma cultura. MAD zero (mais da metade
+# dos pares com o mesmo valor) usa o desvio absoluto médio (x 1,2533). Taxas
+# e produtividades costumam ser quase iguais entre pares, e uma dispersão
+# minúscula marcaria qualquer diferença: a escala tem piso de
+# MIN_RELATIVE_SPREAD da mediana, então só desvios materiais são marcados.
+#
+# O pré-processamento grava os z-scores e a marca como colunas do parquet;
+# o painel só lê.
+
+import numpy as np
+import pandas as pd
+
+# Medida -> coluna de origem (None = derivada em measure_values)
+OUTLIER_MEASURES = {
+    'PREMIO_POR_HA': None,
+    'PE_TAXA': 'PE_TAXA',
+    'NR_PRODUTIVIDADE_SEGURADA': 'NR_PRODUTIVIDADE_SEGURADA',
+}
+
+# Grupos de pares, do mais específico ao de reserva, pelas chaves inteiras
+# de add_dimension_keys (que roda antes)
+PEER_GROUPS = {
+    'municipio': ['CD_UF', 'CD_MUNICIPIO', 'ID_CULTURA'],
+    'uf': ['CD_UF', 'ID_CULTURA'],
+}
+
+# Apólices mínimas no município x cultura para usá-lo como grupo de pares
+MIN_PEERS = 8
+
+# |z| acima do qual a apólice é marcada
+Z_THRESHOLD = 3.5
+
+MAD_SCALE = 0.6745
+MEAN_AD_SCALE = 1.2533
+
+# Piso da escala do z-score, relativo à |mediana| do grupo
+MIN_RELATIVE_SPREAD = 0.05
+
+Z_COLUMNS = [f'Z_{m}' for m in OUTLIER_MEASURES]
+OUTLIER_COLUMNS = Z_COLUMNS + ['GRUPO_PARES', 'FL_ATIPICA']
+
+# Colunas que identificam a apólice na tabela de auditoria
+AUDIT_COLUMNS = [
+    'NR_APOLICE', 'NM_RAZAO_SOCIAL', 'SG_UF_PROPRIEDADE', 'NM_MUNICIPIO_PROPRIEDADE', 'NM_CULTURA_GLOBAL',
+    'NR_AREA_TOTAL', 'VL_PREMIO_LIQUIDO', 'PE_TAXA', 'NR_PRODUTIVIDADE_SEGURADA',
+]
+
+
+# ---------------------------
+# Z-score robusto
+# ---------------------------
+def measure_values(df: pd.DataFrame, measure: str) -> pd.Series:
+    """Valores da medida; prêmio por hectare só onde a área é positiva."""
+    column = OUTLIER_MEASURES[measure]
+    if column is not None:
+        return pd.to_numeric(df[column], errors='coerce')
+    area = df['NR_AREA_TOTAL'].where(df['NR_AREA_TOTAL'] > 0)
+    return df['VL_PREMIO_LIQUIDO'] / area
+
+
+def robust_z(values: pd.Series, keys: list) -> pd.Series:
+    """
+    Z-score robusto de cada valor no seu grupo (keys: séries alinhadas).
+    Valor ou chave nula dá z nulo.
+    """
+    median = values.groupby(keys, observed=True, sort=False).transform('median')
+    deviation = (values - median).abs()
+    by_group = deviation.groupby(keys, observed=True, sort=False)
+    mad = by_group.transform('median')
+    mean_ad = by_group.transform('mean')
+
+    # Escala no mesmo sentido do desvio-padrão: MAD / 0,6745, ou 1,2533 x DAM
+    scale = (mad / MAD_SCALE).where(mad > 0, MEAN_AD_SCALE * mean_ad)
+    scale = np.maximum(scale, MIN_RELATIVE_SPREAD * median.abs())
+    z = (values - median) / scale.where(scale > 0)
+    # Grupo todo igual (escala zero): ninguém desvia
+    z = z.where(scale > 0, 0.0)
+    return z.where(values.notna() & median.notna()).astype('float32')
+
+
+def peer_key(df: pd.DataFrame, column: str) -> pd.Series:
+    """Chave do grupo de pares; ID de dicionário -1 (nome nulo) fica sem grupo."""
+    if column.startswith('ID_'):
+        return df[column].where(df[column] >= 0)
+    return df[column]
+
+
+def score_outliers(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Colunas novas, alinhadas a df: Z_<medida> (float32), GRUPO_PARES
+    ("municipio" ou "uf") e FL_ATIPICA (algum |z| > Z_THRESHOLD).
+    """
+    keys = {level: [peer_key(df, c) for c in columns] for level, columns in PEER_GROUPS.items()}
+    peers = df.groupby(keys['municipio'], observed=True, sort=False)['NR_APOLICE'].transform('size')
+    use_municipio = (peers >= MIN_PEERS).to_numpy()
+
+    scores = {}
+    for measure in OUTLIER_MEASURES:
+        values = measure_values(df, measure)
+        z_municipio = robust_z(values, keys['municipio'])
+        z_uf = robust_z(values, keys['uf'])
+        scores[f'Z_{measure}'] = z_municipio.where(use_municipio, z_uf)
+
+    scores = pd.DataFrame(scores, index=df.index)
+    scores['GRUPO_PARES'] = pd.Categorical(np.where(use_municipio, 'municipio', 'uf'), categories=list(PEER_GROUPS))
+    scores['FL_ATIPICA'] = (scores[Z_COLUMNS].abs() > Z_THRESHOLD).any(axis=1)
+    return scores
+
+
+def add_outlier_columns(df: pd.DataFrame) -> pd.DataFrame:
+    """df com as colunas de score_outliers (substitui as de uma rodada anterior)."""
+    return df.drop(columns=[c for c in OUTLIER_COLUMNS if c in df.columns]).join(score_outliers(df))
+
+
+# ---------------------------
+# Resultados para o painel
+# ---------------------------
+def outlier_table(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Apólices marcadas, da mais atípica para a menos (maior |z|), com as
+    colunas de identificação, os z-scores e a medida que mais desvia.
+    """
+    flagged = df.loc[df['FL_ATIPICA'], [c for c in AUDIT_COLUMNS if c in df.columns] + Z_COLUMNS + ['GRUPO_PARES']]
+    abs_z = flagged[Z_COLUMNS].abs().fillna(0)
+    flagged = flagged.assign(
+        Z_MAX=abs_z.max(axis=1),
+        MEDIDA=abs_z.idxmax(axis=1).str.removeprefix('Z_'),
+    )
+    return flagged.sort_values('Z_MAX', ascending=False).reset_index(drop=True)
+
+
+def outlier_rate_by_state(df: pd.DataFrame) -> pd.DataFrame:
+    """Por UF (CD_UF): apólices marcadas e a fração delas no total de linhas."""
+    by_state = df.groupby('CD_UF', observed=True)['FL_ATIPICA'].agg(atipicas='sum', taxa_atipicas='mean')
+    by_state['atipicas'] = by_state['atipicas'].astype('int64')
+    by_state['taxa_atipicas'] = by_state['taxa_atipicas'] * 100
+    return by_state.reset_index()
@@ -1,10 +1,67 @@
 ### pre_processamento.py
 # Reescrito para melhor organização, comentários e clareza
 # Lógica original mantida, apenas reorganizado
+#
+# Uso (na raiz do repositório):
+#   python pre-process1.1.py
+#   python pre-process1.1.py --entrada "datasets/psr_*.xlsx" --workers 6
+#   python pre-process1.1.py --entrada datasets/historico/ --ignorar-falhas
+#
+#   python pre-process1.1.py --incremental --entrada datasets/psr_2026.xlsx
+#   python pre-process1.1.py --incremental --retirar psr_2019
+#
+#   python pre-process1.1.py --municipios datasets/BR_Municipios_2024.shp
+#
+# Com vários arquivos de origem (um por ano, por exemplo), cada um é lido e
+# limpo (load_data -> clean_and_convert) num processo separado e os
+# resultados são concatenados na ordem dos arquivos. Um arquivo com erro
+# não derruba os outros: ele é listado no fim e, sem --ignorar-falhas,
+# nada é gravado.
+#
+# Com --incremental, cada arquivo é uma partição do repositório de
+# agregados (aggregate_store.py, em assets/agregados): só arquivos novos ou
+# alterados são lidos e agregados, e os totais são somados aos existentes.
+# Um arquivo alterado substitui a contribuição anterior; --retirar a subtrai.
+# A partição é o nome do arquivo sem extensão, e --retirar é o único jeito
+# de removê-la: arquivo apagado ou renomeado continua nos totais (o
+# renomeado entraria em dobro; o pré-processamento avisa quando o conteúdo
+# já está noutra partição).
+# Dos totais saem o ranking de municípios e os bins mensais. O que depende
+# de linha continua refeito sobre as linhas de todas as partições: o
+# próprio dados_v2.parquet, o agregado por estado (apólices distintas por
+# UF, exatas como no painel), as chaves e dimensões, os
+# z-scores da auditoria (pares de todos os arquivos), a amostra
+# estratificada, as entidades da busca (apólices distintas por entidade não
+# se somam entre partições) e o relatório de localização.
+#
+# As coordenadas das apólices são conferidas com a UF declarada (e, com
+# --municipios, com o município) numa junção espacial em lote
+# (spatial_check.py); as divergências vão para LOCATION_REPORT_PATH.
+
+import argparse
+import glob
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
 
 import pandas as pd
 import geopandas as gpd
-import os
+
+from aggregate_store import AggregateStore
+from disk_cache import file_fingerprint
+from dimensions import (
+    STATES_GEOJSON_PATH, add_dimension_keys, build_uf_adjacency, save_dimensions, save_uf_adjacency
+)
+from exports import DATASET_ROW_GROUP_ROWS
+from outliers import add_outlier_columns
+from rankings import build_municipality_ranking, save_ranking
+from sampling import SAMPLE_PATH, build_stratified_sample, save_sample
+from search_index import SEARCH_INDEX_PATH, build_search_entities, save_search_entities
+from spatial_check import (
+    LOCATION_REPORT_PATH, SIMPLIFY_TOLERANCE, add_location_columns, load_municipality_geometries, location_report
+)
+from timeseries import build_monthly_bins, convert_dates, save_monthly_bins
 
 # ---------------------------
 # Função: Carregar dados do Excel
@@ -17,6 +74,79 @@ def load_data(excel_path: str = r'datasets\dados_abertos_psr_2025.xlsx') -> pd.D
     return df
 
 
+# ---------------------------
+# Funções: ingestão de vários arquivos em paralelo
+# ---------------------------
+SOURCE_EXTENSIONS = ('.xlsx', '.xls')
+
+
+def expand_sources(patterns: list) -> list:
+    """
+    Arquivos de origem a partir de caminhos, pastas (todas as planilhas
+    dentro) ou globs; ordenados e sem repetição.
+    """
+    paths = []
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            matches = [os.path.join(pattern, name) for name in os.listdir(pattern)
+                       if name.lower().endswith(SOURCE_EXTENSIONS)]
+        else:
+            matches = glob.glob(pattern) or [pattern]
+        paths.extend(sorted(matches))
+    return list(dict.fromkeys(paths))
+
+
+def ingest_file(path: str) -> pd.DataFrame:
+    """
+    Lê e limpa um arquivo de origem (roda no processo de trabalho).
+    """
+    return clean_and_convert(load_data(path))
+
+
+def partition_name(path: str) -> str:
+    """
+    Nome da partição de um arquivo de origem no modo incremental.
+    """
+    return os.path.splitext(os.path.basename(path))[0]
+
+
+def ingest_all(paths: list, workers: int):
+    """
+    Roda ingest_file em cada arquivo com até workers processos, mostrando o
+    progresso. Retorna ({caminho: dataframe} na ordem de paths, {caminho: erro}).
+    """
+    results, failures = {}, {}
+    start = time.perf_counter()
+
+    def report(done, path, message):
+        print(f'  [{done}/{len(paths)}] {os.path.basename(path)}: {message} '
+              f'({time.perf_counter() - start:.1f}s)', file=sys.stderr)
+
+    if workers <= 1 or len(paths) == 1:
+        for done, path in enumerate(paths, 1):
+            try:
+                results[path] = ingest_file(path)
+                report(done, path, f'{len(results[path])} linhas')
+            except Exception as exc:
+                failures[path] = exc
+                report(done, path, f'FALHA: {exc!r}')
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = {pool.submit(ingest_file, path): path for path in paths}
+            for done, future in enumerate(as_completed(futures), 1):
+                path = futures[future]
+                try:
+                    results[path] = future.result()
+                    report(done, path, f'{len(results[path])} linhas')
+                except Exception as exc:
+                    # Inclui BrokenProcessPool: um processo morto marca os
+                    # arquivos que estavam nele, os outros seguem reportados
+                    failures[path] = exc
+                    report(done, path, f'FALHA: {exc!r}')
+
+    return {path: results[path] for path in paths if path in results}, failures
+
+
 # ---------------------------
 # Função: Carregar shapefile dos estados
 # ---------------------------
@@ -33,30 +163,39 @@ def load_geodata(shapefile_path: str = r'datasets/BR_UF_2024.shp') -> gpd.GeoDat
 # ---------------------------
 def clean_and_convert(df: pd.DataFrame) -> pd.DataFrame:
     """
-    Remove colunas desnecessárias e converte valores numéricos que vieram como strings
+    Remove colunas desnecessárias e converte valores numéricos que vieram como strings.
+    As datas (proposta, apólice, início de vigência) e o ano da apólice são mantidos.
     """
     # Colunas que não vamos usar
     drop_cols = [
-        'CD_PROCESSO_SUSEP', 'NR_PROPOSTA', 'ID_PROPOSTA', 'DT_PROPOSTA',
-        'DT_INICIO_VIGENCIA', 'DT_FIM_VIGENCIA', 'NM_SEGURADO', 'NR_DOCUMENTO_SEGURADO',
+        'CD_PROCESSO_SUSEP', 'NR_PROPOSTA', 'ID_PROPOSTA',
+        'DT_FIM_VIGENCIA', 'NM_SEGURADO', 'NR_DOCUMENTO_SEGURADO',
         'LATITUDE', 'NR_GRAU_LAT', 'NR_MIN_LAT', 'NR_SEG_LAT',
-        'LONGITUDE', 'NR_GRAU_LONG', 'NR_MIN_LONG', 'NR_SEG_LONG',
-        'NR_DECIMAL_LATITUDE', 'NR_DECIMAL_LONGITUDE', 'NivelDeCobertura', 'DT_APOLICE',
-        'ANO_APOLICE', 'CD_GEOCMU'
+        'LONGITUDE', 'NR_GRAU_LONG', 'NR_MIN_LONG', 'NR_SEG_LONG', 'NivelDeCobertura'
     ]
     df = df.drop(columns=[c for c in drop_cols if c in df.columns])
 
-    # Converter colunas numéricas com vírgula para float
-    numeric_cols = ['NR_AREA_TOTAL', 'VL_PREMIO_LIQUIDO']
+    # Converter colunas numéricas com vírgula para float (as coordenadas
+    # decimais ficam para a verificação espacial)
+    numeric_cols = ['NR_AREA_TOTAL', 'VL_PREMIO_LIQUIDO', 'NR_DECIMAL_LATITUDE', 'NR_DECIMAL_LONGITUDE']
     for col in numeric_cols:
         if col in df.columns:
             df[col] = df[col].astype(str).str.replace(',', '.', regex=False)
             df[col] = pd.to_numeric(df[col], errors='coerce')
 
+    # Número da apólice é identificador: texto em todos os arquivos (o Excel
+    # devolve int em uns e str em outros, e o Parquet não aceita a mistura)
+    if 'NR_APOLICE' in df.columns:
+        apolice = df['NR_APOLICE'].astype(str).str.strip().str.replace(r'\.0$', '', regex=True)
+        df['NR_APOLICE'] = apolice.where(df['NR_APOLICE'].notna())
+
     # Corrigir coluna de animais para evitar erro no Parquet
     if 'NR_ANIMAL' in df.columns:
         df['NR_ANIMAL'] = pd.to_numeric(df['NR_ANIMAL'], errors='coerce')
 
+    # Datas como datetime compacto (sem hora) e ano como inteiro
+    df = convert_dates(df)
+
     return df
 
 
@@ -65,9 +204,9 @@ def clean_and_convert(df: pd.DataFrame) -> pd.DataFrame:
 # ---------------------------
 def aggregate_by_state(df: pd.DataFrame) -> pd.DataFrame:
     """
-    Agrega dados por estado: área total, valor total e número de seguros.
+    Agrega dados por estado (chave CD_UF): área total, valor total e número de seguros.
     """
-    df_estado = df.groupby('SG_UF_PROPRIEDADE').agg(
+    df_estado = df.groupby('CD_UF').agg(
         area_total=('NR_AREA_TOTAL', 'sum'),
         valor_total=('VL_PREMIO_LIQUIDO', 'sum'),
         numero_seguros=('NR_APOLICE', 'nunique')
@@ -89,31 +228,161 @@ def simplify_geometry(gdf: gpd.GeoDataFrame, tolerance: float = 0.01) -> gpd.Geo
 # ---------------------------
 # Executando o pré-processamento
 # ---------------------------
-# Carregar dados
-df = load_data()
-gdf = load_geodata()
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description='Pré-processamento dos dados do PSR para o painel.')
+    parser.add_argument('--entrada', nargs='+', default=[r'datasets\dados_abertos_psr_2025.xlsx'],
+                        help='planilhas de origem: arquivos, pastas ou globs (padrão: a planilha de 2025)')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                        help='processos de leitura/limpeza em paralelo (padrão: número de CPUs)')
+    parser.add_argument('--ignorar-falhas', action='store_true',
+                        help='grava o resultado mesmo se algum arquivo falhar (os que falharam ficam de fora)')
+    parser.add_argument('--incremental', action='store_true',
+                        help='mantém os agregados por arquivo em assets/agregados; só lê arquivos novos ou alterados')
+    parser.add_argument('--retirar', nargs='+', default=[], metavar='PARTICAO',
+                        help='com --incremental: subtrai e remove estas partições (nome do arquivo sem extensão); '
+                             'arquivos apagados ou renomeados só saem dos totais assim')
+    parser.add_argument('--municipios', metavar='ARQUIVO',
+                        help='malha municipal do IBGE (CD_MUN, NM_MUN): confere o município das coordenadas '
+                             'e preenche CD_GEOCMU vazio')
+    args = parser.parse_args(argv)
+
+    paths = expand_sources(args.entrada)
+    store = AggregateStore() if args.incremental else None
+    if store is not None:
+        for partition in args.retirar:
+            store.retract(partition)
+            print(f'Partição {partition} retirada', file=sys.stderr)
+        # Arquivo já ingerido com o mesmo conteúdo não é relido
+        known = store.partitions()
+        fingerprints = {path: file_fingerprint(path) for path in paths if os.path.exists(path)}
+        paths = [p for p in paths
+                 if known.get(partition_name(p), {}).get('impressao_digital') != fingerprints.get(p)]
+        by_fingerprint = {meta.get('impressao_digital'): name for name, meta in known.items()}
+        for path in paths:
+            previous = by_fingerprint.get(fingerprints.get(path))
+            if previous is not None and previous != partition_name(path):
+                print(f'Aviso: {path} tem o mesmo conteúdo da partição {previous}; '
+                      f'se foi renomeado, rode com --retirar {previous}', file=sys.stderr)
+    print(f'Lendo {len(paths)} arquivo(s) com {max(min(args.workers, len(paths)), 1)} processo(s)',
+          file=sys.stderr)
+
+    # Carregar e limpar os dados (um processo por arquivo)
+    frames, failures = ingest_all(paths, args.workers)
+    if failures:
+        print(f'{len(failures)} arquivo(s) com falha:', file=sys.stderr)
+        for path, exc in failures.items():
+            print(f'  {path}: {exc!r}', file=sys.stderr)
+        if not (frames or store) or not args.ignorar_falhas:
+            print('Nada gravado (use --ignorar-falhas para seguir com os demais).', file=sys.stderr)
+            return 1
+
+    # Coordenada x UF/município declarados, por arquivo: o CD_GEOCMU
+    # preenchido entra também nos agregados do modo incremental
+    gdf = load_geodata()
+    uf_geometries = gdf.set_index('SIGLA_UF').geometry.simplify(SIMPLIFY_TOLERANCE, preserve_topology=True)
+    municipios = load_municipality_geometries(args.municipios) if args.municipios else None
+    for path in list(frames):
+        frames[path], filled = add_location_columns(frames[path], uf_geometries, municipios)
+        if filled:
+            print(f'{path}: {filled} código(s) de município preenchido(s) pela coordenada', file=sys.stderr)
 
-# Limpar e converter colunas
-df = clean_and_convert(df)
+    if store is not None:
+        # Só as linhas novas são agregadas; os totais somam as contribuições
+        for path, df_part in frames.items():
+            store.ingest(partition_name(path), df_part, origem=path, fingerprint=fingerprints.get(path))
+        if not store.partitions():
+            print('Repositório de agregados vazio: nada a gravar.', file=sys.stderr)
+            return 1
+        df = store.rows()
+        agregados = store.materialize()
+    else:
+        df = pd.concat(list(frames.values()), ignore_index=True)
+        agregados = None
 
-# Agregação por estado
-df_estado = aggregate_by_state(df)
+    df_localizacao = location_report(df) if 'ST_LOCALIZACAO' in df.columns else None
+    if df_localizacao is not None:
+        print(f'{len(df_localizacao)} apólice(s) com localização divergente: '
+              f'{df_localizacao["ST_LOCALIZACAO"].value_counts().loc[lambda c: c > 0].to_dict()}', file=sys.stderr)
 
-# Merge GeoDataFrame com dados de estado
-if 'SIGLA_UF' in gdf.columns and 'SG_UF_PROPRIEDADE' in df_estado.columns:
-    gdf = gdf.merge(df_estado, left_on='SIGLA_UF', right_on='SG_UF_PROPRIEDADE', how='left')
+    # Chaves inteiras (códigos IBGE e IDs de dicionário) + tabelas de dimensão
+    df, dims = add_dimension_keys(df)
 
-# Simplificar geometria para exportação
-gdf = simplify_geometry(gdf, tolerance=0.01)
+    # Auditoria: z-scores robustos por município x cultura e marca de
+    # apólice atípica, gravados como colunas (pares vêm de todos os arquivos)
+    df = add_outlier_columns(df)
+
+    # Agregação por estado (contagem exata de apólices), ranking de
+    # municípios por UF (área e valor, consultado por fatia no painel) e
+    # agregados mensais por UF e razão social (série temporal); no modo
+    # incremental o ranking e os bins saem dos totais
+    df_estado = aggregate_by_state(df)
+    if agregados is not None:
+        df_ranking = agregados['ranking']
+        df_mensal = agregados['mensal']
+    else:
+        df_ranking = build_municipality_ranking(df, dims)
+        df_mensal = build_monthly_bins(df, date_col='DT_APOLICE')
+
+    # Amostra estratificada por UF x razão social (prévia do painel)
+    df_amostra = build_stratified_sample(df)
+
+    # Entidades da busca (UF, razão social, município) com nome normalizado
+    df_busca = build_search_entities(df, dims)
+
+    # Merge GeoDataFrame com dados de estado pelo código IBGE da UF
+    if 'CD_UF' in gdf.columns:
+        gdf['CD_UF'] = gdf['CD_UF'].astype('int8')
+        gdf = gdf.merge(df_estado, on='CD_UF', how='left')
+
+    # Vizinhança entre UFs (antes de simplificar, com as fronteiras exatas)
+    uf_adjacencia = build_uf_adjacency(gdf)
+
+    # Simplificar geometria para exportação
+    gdf = simplify_geometry(gdf, tolerance=SIMPLIFY_TOLERANCE)
+
+    # Salvar arquivos para uso no Streamlit ou análise futura
+    # Ordenado por UF em row groups: a exportação filtrada (exports.py) pula
+    # os row groups das outras UFs pelas estatísticas
+    df.sort_values('SG_UF_PROPRIEDADE', kind='stable').to_parquet(
+        'assets/dados_v2.parquet', index=False, row_group_size=DATASET_ROW_GROUP_ROWS
+    )
+    # Derivados e dimensões levam a impressão digital do dados_v2.parquet:
+    # o painel só os usa com esse dataset (snapshots.snapshot_files)
+    origem = file_fingerprint('assets/dados_v2.parquet')
+    save_dimensions(dims, 'assets', origin=origem)
+    save_ranking(df_ranking, 'assets/ranking_municipios.parquet', origin=origem)
+    save_monthly_bins(df_mensal, 'assets/agregados_mensais.parquet', origin=origem)
+    save_sample(df_amostra, SAMPLE_PATH, origin=origem)
+    save_search_entities(df_busca, SEARCH_INDEX_PATH, origin=origem)
+    if df_localizacao is not None:
+        df_localizacao.to_parquet(LOCATION_REPORT_PATH, index=False)
+    gdf.to_file('assets/BR_UF_2024_simplificado.geojson', driver='GeoJSON')
+
+    # GeoJSON enxuto para o painel (lido sem geopandas): só CD_UF inteiro,
+    # sigla e nome, coordenadas com 4 casas (~10 m, sobra para o zoom do mapa)
+    gdf_estados = gdf[['CD_UF', 'SIGLA_UF', 'NM_UF', 'geometry']].rename(columns={'SIGLA_UF': 'SG_UF'})
+    gdf_estados.to_file(STATES_GEOJSON_PATH, driver='GeoJSON', COORDINATE_PRECISION=4)
+    save_uf_adjacency(uf_adjacencia)
+    return 0
 
-# Salvar arquivos para uso no Streamlit ou análise futura
-df.to_parquet('assets/dados_v2.parquet', index=False)
-gdf.to_file('assets/BR_UF_2024_simplificado.geojson', driver='GeoJSON')
 
 # ---------------------------
 # Observações:
 # ---------------------------
+# - df_ranking: municípios ordenados por área e valor dentro de cada UF
+# - df_mensal: bins mensais (UF x razão social) para a série temporal
+# - df_amostra: amostra estratificada (UF x razão social) para a prévia do painel
+# - df_busca: entidades do seletor de busca (nome sem acento e peso)
+# - df (Z_*, GRUPO_PARES, FL_ATIPICA): apólices atípicas para a auditoria
+# - df (UF_COORDENADA, CD_MUNICIPIO_COORDENADA, ST_LOCALIZACAO): coordenada x local declarado
+# - df_localizacao: apólices com coordenada divergente, para revisão
 # - df_estado: pronto para uso em dashboards (área total, valor total, número de seguros por estado)
 # - gdf: pronto para plotagem no folium/plotly
+# - gdf_estados: geometria das UFs lida pelo painel (assets/estados.geojson)
+# - uf_adjacencia: UFs vizinhas, usadas na pré-busca da visão "Estado"
 # - df: dados limpos e convertidos, pronto para análises adicionais
-# - Facilita manutenção futura e adição de novas métricas sem modificar lógica principal
\ No newline at end of file
+# - Facilita manutenção futura e adição de novas métricas sem modificar lógica principal
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,104 @@
+### prefetch.py
+# Pré-busca especulativa da visão "Estado".
+#
+# Depois de exibir uma UF, o app agenda as UFs que o usuário provavelmente
+# abre a seguir (a próxima e a anterior no seletor e as vizinhas no mapa).
+# Elas são calculadas em segundo plano e vão para o cache comum, então a
+# troca de estado encontra o artefato pronto.
+#
+# Limites:
+# - concorrência: TERRA_PREFETCH_WORKERS threads próprias (padrão 1; 0
+#   desliga), separadas do pool de render do rerun;
+# - quantidade: no máximo TERRA_PREFETCH_MAX tarefas por sessão;
+# - memória: nada é calculado com o cache acima de PREFETCH_MAX_FILL do
+#   orçamento, para a especulação não despejar o que está em uso;
+# - cancelamento: um novo agendamento (ou cancel) da sessão descarta o que
+#   ela ainda tinha na fila; tarefas já em execução terminam e ficam no cache.
+
+import logging
+import os
+import threading
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from cache_manager import CACHE
+
+logger = logging.getLogger('prefetch')
+
+# Fração do orçamento do cache acima da qual a pré-busca para
+PREFETCH_MAX_FILL = 0.8
+
+
+def likely_next_ufs(cd_uf: int, order: list, adjacency: dict) -> list:
+    """
+    UFs candidatas, por prioridade: próxima e anterior em order (a ordem do
+    seletor), depois as vizinhas geográficas presentes em order.
+    """
+    if cd_uf not in order:
+        return []
+    position = order.index(cd_uf)
+    candidates = order[position + 1:position + 2] + order[max(position - 1, 0):position]
+    candidates += [c for c in adjacency.get(cd_uf, []) if c in order]
+    return list(dict.fromkeys(c for c in candidates if c != cd_uf))
+
+
+class Prefetcher:
+    """
+    Fila de pré-busca compartilhada pelas sessões. schedule(owner, tasks)
+    substitui as tarefas pendentes de owner; tasks é uma lista de
+    (loader cacheado, *args) em ordem de prioridade.
+    """
+
+    def __init__(self, workers: int = 1, max_tasks: int = 6, cache=CACHE,
+                 max_fill: float = PREFETCH_MAX_FILL):
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='prefetch')
+        self.max_tasks, self.cache, self.max_fill = max_tasks, cache, max_fill
+        self._pending = {}
+        self._lock = threading.Lock()
+        self.stats = Counter()
+
+    def cancel(self, owner):
+        """Descarta as tarefas de owner que ainda não começaram."""
+        with self._lock:
+            for future in self._pending.pop(owner, []):
+                if future.cancel():
+                    self.stats['canceladas'] += 1
+
+    def schedule(self, owner, tasks: list):
+        self.cancel(owner)
+        futures = []
+        for fn, *args in tasks[:self.max_tasks]:
+            if self.cache.contains(fn.cache_key(*args)):
+                continue
+            futures.append(self._executor.submit(self._run, fn, args))
+            self.stats['agendadas'] += 1
+        with self._lock:
+            self._pending[owner] = futures
+
+    def _run(self, fn, args):
+        if self.cache.used_bytes > self.max_fill * self.cache.budget_bytes:
+            self.stats['sem_memoria'] += 1
+            return
+        try:
+            fn(*args)
+            self.stats['calculadas'] += 1
+        except Exception:
+            logger.exception('falha na pré-busca de %s%r', fn.__name__, args)
+
+
+_prefetcher = None
+_prefetcher_lock = threading.Lock()
+
+
+def start_prefetcher():
+    """
+    Prefetcher único do processo, ou None se TERRA_PREFETCH_WORKERS=0.
+    Tarefas por sessão: TERRA_PREFETCH_MAX (padrão 6).
+    """
+    global _prefetcher
+    with _prefetcher_lock:
+        if _prefetcher is None:
+            workers = int(os.environ.get('TERRA_PREFETCH_WORKERS', 1))
+            max_tasks = int(os.environ.get('TERRA_PREFETCH_MAX', 6))
+            _prefetcher = Prefetcher(workers, max_tasks) if workers > 0 else False
+    return _prefetcher or None
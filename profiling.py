@@ -0,0 +1,186 @@
+### profiling.py
+# Instrumentação leve dos reruns: spans de tempo nomeados e um profiler
+# por amostragem opcional.
+#
+# Os spans só são gravados quando um rerun foi iniciado com start_rerun(True);
+# fora disso span() devolve um objeto nulo compartilhado, então o custo com a
+# instrumentação desligada é uma leitura de ContextVar por span.
+# Cada span fechado vira uma linha de log estruturado (JSON) no logger
+# "profiling" e fica disponível para o painel de debug.
+
+import json
+import logging
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from concurrent.futures import thread as futures_thread
+from contextvars import ContextVar
+
+logger = logging.getLogger('profiling')
+
+_current = ContextVar('rerun_timer', default=None)
+
+
+# ---------------------------
+# Spans de tempo
+# ---------------------------
+class RerunTimer:
+    """
+    Spans de um rerun: lista de (nome, início relativo, duração) em segundos.
+    """
+
+    def __init__(self):
+        self.rerun_id = uuid.uuid4().hex[:8]
+        self.origin = time.perf_counter()
+        self.spans = []
+
+    def record(self, name: str, start: float, elapsed: float):
+        self.spans.append((name, start - self.origin, elapsed))
+        logger.info(json.dumps({
+            'event': 'span',
+            'rerun': self.rerun_id,
+            'name': name,
+            'start_ms': round((start - self.origin) * 1000, 3),
+            'duration_ms': round(elapsed * 1000, 3),
+        }, ensure_ascii=False))
+
+    def total(self) -> float:
+        return time.perf_counter() - self.origin
+
+    def breakdown(self) -> list:
+        """Spans como dicionários, na ordem em que foram abertos."""
+        return [
+            {'secao': name, 'inicio_ms': start * 1000, 'duracao_ms': elapsed * 1000}
+            for name, start, elapsed in sorted(self.spans, key=lambda s: s[1])
+        ]
+
+
+class _Span:
+    __slots__ = ('timer', 'name', 'start')
+
+    def __init__(self, timer: RerunTimer, name: str):
+        self.timer, self.name = timer, name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.timer.record(self.name, self.start, time.perf_counter() - self.start)
+        return False
+
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+def start_rerun(enabled: bool):
+    """
+    Inicia a contagem do rerun atual; com enabled=False desliga os spans.
+    Retorna o RerunTimer (ou None).
+    """
+    timer = RerunTimer() if enabled else None
+    _current.set(timer)
+    return timer
+
+
+def current_timer():
+    return _current.get()
+
+
+def span(name: str):
+    """
+    Context manager que mede o bloco com o nome dado (no-op se desligado).
+    """
+    timer = _current.get()
+    if timer is None:
+        return _NULL_SPAN
+    return _Span(timer, name)
+
+
+# ---------------------------
+# Profiler por amostragem
+# ---------------------------
+# Prefixos (thread_name_prefix) das threads dos pools amostradas junto com
+# a do script: render_pool.thread_pool e prefetch.Prefetcher
+POOL_THREAD_PREFIXES = ('render', 'prefetch')
+
+
+def _idle_pool_frame(frame) -> bool:
+    """
+    Thread de ThreadPoolExecutor parada na fila: o frame mais interno é o
+    próprio _worker (a espera em SimpleQueue.get é código C).
+    """
+    code = frame.f_code
+    return code.co_name == '_worker' and code.co_filename == futures_thread.__file__
+
+
+class SamplingProfiler:
+    """
+    Amostra em intervalos fixos (sys._current_frames) a pilha da thread do
+    script e a das threads dos pools com nome em POOL_THREAD_PREFIXES (o
+    render_pool e a pré-busca, onde o rerun faz o trabalho pesado) e
+    acumula as pilhas no formato "collapsed" (a;b;c N), que ferramentas de
+    flamegraph (speedscope, flamegraph.pl) leem diretamente. Cada pilha
+    começa pelo nome da thread; thread de pool ociosa não conta. Os pools
+    são do processo: o perfil inclui o que eles fizeram para outras sessões.
+    """
+
+    def __init__(self, thread_id: int = None, interval: float = 0.005,
+                 pool_prefixes: tuple = POOL_THREAD_PREFIXES):
+        self.thread_id = thread_id or threading.get_ident()
+        self.interval = interval
+        self.pool_prefixes = pool_prefixes
+        self.stacks = Counter()
+        self.samples = 0
+        self._stop_event = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _targets(self) -> dict:
+        """ident -> nome das threads amostradas (os pools sobem sob demanda)."""
+        return {
+            t.ident: t.name for t in threading.enumerate()
+            if t.ident == self.thread_id or t.name.startswith(self.pool_prefixes)
+        }
+
+    def _run(self):
+        while not self._stop_event.wait(self.interval):
+            frames = sys._current_frames()
+            for ident, name in self._targets().items():
+                frame = frames.get(ident)
+                if frame is None or _idle_pool_frame(frame):
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f'{code.co_name} ({code.co_filename}:{code.co_firstlineno})')
+                    frame = frame.f_back
+                stack.append(name)
+                self.stacks[';'.join(reversed(stack))] += 1
+                self.samples += 1
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """Para o amostrador; pode ser chamado mais de uma vez."""
+        self._stop_event.set()
+        if self._thread.is_alive():
+            self._thread.join()
+        return self
+
+    def collapsed(self) -> str:
+        """Pilhas no formato collapsed, das mais para as menos frequentes."""
+        return '\n'.join(f'{stack} {count}' for stack, count in self.stacks.most_common())
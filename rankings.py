@@ -0,0 +1,110 @@
+### rankings.py
+# Índice de ranking de municípios por UF.
+# O pré-processamento agrega uma vez por (UF, município) e grava a tabela
+# ordenada; no painel, trocar de estado vira uma fatia da tabela (offsets
+# por UF), sem groupby nem nlargest a cada rerun.
+
+import numpy as np
+import pandas as pd
+
+from dimensions import attach_labels
+from disk_cache import save_with_origin
+
+RANKING_PATH = 'assets/ranking_municipios.parquet'
+
+# Métricas ordenáveis -> coluna de posição no ranking
+RANK_COLUMNS = {
+    'area_total': 'rank_area',
+    'valor_total': 'rank_valor',
+}
+
+
+# ---------------------------
+# Função: montar a tabela de ranking
+# ---------------------------
+def build_municipality_ranking(df: pd.DataFrame, dims: dict) -> pd.DataFrame:
+    """
+    Agrega área e valor por (CD_UF, CD_MUNICIPIO) e numera a posição de cada
+    município dentro da UF para cada métrica (1 = maior).
+
+    A tabela volta ordenada por (CD_UF, rank_area).
+    """
+    table = (
+        df.groupby(['CD_UF', 'CD_MUNICIPIO'], observed=True)
+        .agg(
+            area_total=('NR_AREA_TOTAL', 'sum'),
+            valor_total=('VL_PREMIO_LIQUIDO', 'sum')
+        )
+        .reset_index()
+    )
+    for metric, rank_col in RANK_COLUMNS.items():
+        table[rank_col] = (
+            table.groupby('CD_UF')[metric]
+            .rank(method='first', ascending=False)
+            .astype(np.int32)
+        )
+    table = table.sort_values(['CD_UF', 'rank_area'], ignore_index=True)
+    return attach_labels(table, dims)
+
+
+# ---------------------------
+# Classe: índice de consulta
+# ---------------------------
+class MunicipalityRanking:
+    """
+    Consultas de top-N por UF sobre a tabela de ranking já ordenada.
+
+    Para cada métrica guardamos a permutação que ordena a tabela por
+    (CD_UF, posição); os offsets de cada UF são os mesmos em qualquer ordem.
+    """
+
+    def __init__(self, table: pd.DataFrame):
+        self.table = table.sort_values(['CD_UF', 'rank_area'], ignore_index=True)
+        uf = self.table['CD_UF'].to_numpy(dtype=np.int16)
+        ufs = np.unique(uf)
+        self._start = dict(zip(ufs.tolist(), np.searchsorted(uf, ufs, side='left').tolist()))
+        self._stop = dict(zip(ufs.tolist(), np.searchsorted(uf, ufs, side='right').tolist()))
+        self._order = {
+            metric: np.lexsort((self.table[rank_col].to_numpy(), uf))
+            for metric, rank_col in RANK_COLUMNS.items()
+        }
+
+    def ufs(self) -> list:
+        """Códigos de UF presentes no índice."""
+        return list(self._start)
+
+    def municipalities(self, cd_uf: int, by: str = 'area_total') -> pd.DataFrame:
+        """Todos os municípios da UF, ordenados pela métrica."""
+        return self.top(cd_uf, None, by)
+
+    def top(self, cd_uf: int, n=10, by: str = 'area_total') -> pd.DataFrame:
+        """Os n municípios da UF com maior valor da métrica (n=None: todos)."""
+        start, stop = self._start.get(int(cd_uf), 0), self._stop.get(int(cd_uf), 0)
+        if n is not None:
+            stop = min(stop, start + n)
+        return self.table.take(self._order[by][start:stop])
+
+    def combined_top(self, cd_uf: int, n: int = 10) -> pd.DataFrame:
+        """União dos top-n por área e por valor (entrada da correlação)."""
+        return pd.concat([
+            self.top(cd_uf, n, 'area_total'),
+            self.top(cd_uf, n, 'valor_total'),
+        ]).drop_duplicates('CD_MUNICIPIO')
+
+
+# ---------------------------
+# Funções: salvar / carregar
+# ---------------------------
+def save_ranking(table: pd.DataFrame, path: str = RANKING_PATH, origin: str = None) -> None:
+    """
+    Grava a tabela de ranking (já ordenada) em parquet; origin é a impressão
+    digital do dataset de que ela saiu.
+    """
+    save_with_origin(table, path, origin)
+
+
+def load_ranking(path: str = RANKING_PATH) -> MunicipalityRanking:
+    """
+    Lê a tabela de ranking e monta o índice de consulta.
+    """
+    return MunicipalityRanking(pd.read_parquet(path))
@@ -0,0 +1,166 @@
+### render_pool.py
+# Construção concorrente dos artefatos de um rerun.
+#
+# O app submete todos os artefatos independentes de uma vez (submit_all) e
+# depois os exibe na ordem do layout, esperando cada Future na sua vez: o
+# rerun passa a custar perto do artefato mais lento, não a soma.
+#
+# - Threads (TERRA_RENDER_THREADS, padrão min(8, CPUs)): chamam os loaders
+#   cacheados; servem para o que libera o GIL (pandas, serialização, I/O do
+#   cache em disco) e para esperar os processos.
+# - Processos (TERRA_RENDER_PROCESSES, padrão 2, ou 0 com uma CPU; 0
+#   desliga): montagem e render dos mapas folium, Python puro preso ao GIL.
+#
+# Os processos são subprocessos simples ("python -c ..._worker_main()"),
+# não multiprocessing: o Streamlit troca o __main__ pelo script do app
+# durante o rerun, e o spawn do multiprocessing reexecutaria o app inteiro
+# em cada filho. A troca de mensagens é pickle com prefixo de tamanho pelo
+# stdin/stdout do filho.
+
+import os
+import pickle
+import queue
+import struct
+import subprocess
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+_lock = threading.Lock()
+_threads = None
+_processes = None
+
+_HEADER = struct.Struct('!Q')
+
+# Importados pelos filhos ao subir, antes da primeira tarefa (mapas)
+PRELOAD_MODULES = ['folium', 'figures']
+
+
+# ---------------------------
+# Pool de threads
+# ---------------------------
+def thread_pool() -> ThreadPoolExecutor:
+    global _threads
+    with _lock:
+        if _threads is None:
+            workers = int(os.environ.get('TERRA_RENDER_THREADS', min(8, os.cpu_count() or 1)))
+            _threads = ThreadPoolExecutor(max_workers=max(workers, 1), thread_name_prefix='render')
+    return _threads
+
+
+def submit_all(tasks: dict) -> dict:
+    """
+    tasks: nome -> (função, *args). Submete tudo ao pool de threads e
+    devolve nome -> Future, na mesma ordem.
+    """
+    pool = thread_pool()
+    return {name: pool.submit(fn, *args) for name, (fn, *args) in tasks.items()}
+
+
+# ---------------------------
+# Pool de processos
+# ---------------------------
+def _send(stream, obj):
+    payload = pickle.dumps(obj, protocol=pickle.HIGHEST_PROTOCOL)
+    stream.write(_HEADER.pack(len(payload)))
+    stream.write(payload)
+    stream.flush()
+
+
+def _receive(stream):
+    header = stream.read(_HEADER.size)
+    if len(header) < _HEADER.size:
+        raise EOFError('processo de render encerrado')
+    (size,) = _HEADER.unpack(header)
+    return pickle.loads(stream.read(size))
+
+
+def _worker_main(preload=()):
+    """Laço do processo filho: recebe (fn, args), devolve (ok, valor)."""
+    stdin, stdout = sys.stdin.buffer, sys.stdout.buffer
+    sys.stdout = sys.stderr  # prints de bibliotecas não corrompem o canal
+    for module in preload:
+        __import__(module)
+    while True:
+        try:
+            fn, args = _receive(stdin)
+        except EOFError:
+            return
+        try:
+            _send(stdout, (True, fn(*args)))
+        except Exception as exc:
+            _send(stdout, (False, exc))
+
+
+class _Worker:
+    def __init__(self, preload=()):
+        root = os.path.dirname(os.path.abspath(__file__))
+        self.proc = subprocess.Popen(
+            [sys.executable, '-c', f'import render_pool; render_pool._worker_main({list(preload)!r})'],
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE, cwd=root,
+        )
+
+    def call(self, fn, args):
+        _send(self.proc.stdin, (fn, args))
+        return _receive(self.proc.stdout)
+
+    def kill(self):
+        self.proc.kill()
+        self.proc.wait()
+
+
+class ProcessPool:
+    """
+    N subprocessos de vida longa, iniciados já na criação (as importações
+    correm em paralelo com o resto do rerun); cada chamada pega um livre ou
+    espera. Um filho que morre é substituído na próxima chamada.
+    """
+
+    def __init__(self, workers: int, preload=()):
+        self.preload = list(preload)
+        self._idle = queue.Queue()
+        for _ in range(workers):
+            self._idle.put(_Worker(self.preload))
+
+    def run(self, fn, *args):
+        worker = self._idle.get()
+        try:
+            if worker is None:
+                worker = _Worker(self.preload)
+            ok, value = worker.call(fn, args)
+        except (EOFError, OSError, pickle.PicklingError):
+            if worker is not None:
+                worker.kill()
+            worker = None
+            raise
+        finally:
+            self._idle.put(worker)
+        if not ok:
+            raise value
+        return value
+
+
+def process_pool():
+    """Pool de processos (criado no primeiro uso), ou None se desligado."""
+    global _processes
+    with _lock:
+        if _processes is None:
+            # Num host de uma CPU os filhos só disputam o mesmo núcleo
+            default = 2 if (os.cpu_count() or 1) > 1 else 0
+            workers = int(os.environ.get('TERRA_RENDER_PROCESSES', default))
+            _processes = ProcessPool(workers, PRELOAD_MODULES) if workers > 0 else False
+    return _processes or None
+
+
+def run_in_process(fn, *args):
+    """
+    fn(*args) num processo do pool (fn precisa ser uma função de módulo e os
+    args serializáveis); sem pool, ou se o filho falhar, roda aqui mesmo.
+    """
+    pool = process_pool()
+    if pool is None:
+        return fn(*args)
+    try:
+        return pool.run(fn, *args)
+    except (EOFError, OSError, pickle.PicklingError):
+        return fn(*args)
@@ -0,0 +1,142 @@
+### sampling.py
+# Amostra estratificada do dataset para a primeira pintura do painel.
+#
+# O pré-processamento grava uma amostra pequena, estratificada por UF x
+# razão social (os estratos são exatamente as células que o painel soma).
+# Enquanto os agregados exatos não ficam prontos, o app desenha os gráficos
+# a partir dela: totais estimados (expansão pelo peso de cada estrato) com
+# intervalo de confiança. O custo da prévia depende do tamanho da amostra,
+# não do dataset.
+
+import numpy as np
+import pandas as pd
+
+from disk_cache import save_with_origin
+
+SAMPLE_PATH = 'assets/amostra_estratificada.parquet'
+
+# Estratos da amostra; qualquer agrupamento por subconjunto deles é estimável
+STRATA = ['CD_UF', 'ID_RAZAO_SOCIAL']
+
+# Medida estimada -> coluna somada na amostra
+SAMPLE_MEASURES = {
+    'area_total': 'NR_AREA_TOTAL',
+    'valor_total': 'VL_PREMIO_LIQUIDO',
+}
+
+# z do intervalo de confiança de 95%
+Z_95 = 1.96
+
+
+# ---------------------------
+# Função: montar a amostra
+# ---------------------------
+def build_stratified_sample(df: pd.DataFrame, fraction: float = 0.05, min_per_stratum: int = 10,
+                            seed: int = 0) -> pd.DataFrame:
+    """
+    Sorteia, sem reposição, ceil(fraction * N_h) linhas de cada estrato (no
+    mínimo min_per_stratum, ou o estrato inteiro se for menor).
+
+    Cada linha leva N_ESTRATO (linhas do estrato no dataset), PESO
+    (N_h / n_h) e APOLICES_ESTRATO (apólices distintas do estrato, exato:
+    contagem distinta não se estima bem por amostra e aqui sai de graça).
+    """
+    df = df.loc[:, STRATA + ['NR_APOLICE', 'NR_AREA_TOTAL', 'VL_PREMIO_LIQUIDO', 'NM_RAZAO_SOCIAL']]
+    df = df.dropna(subset=STRATA)
+
+    by_stratum = df.groupby(STRATA, observed=True)['NR_APOLICE']
+    sizes = by_stratum.transform('size')
+    quota = np.minimum(sizes, np.maximum(min_per_stratum, np.ceil(fraction * sizes)))
+
+    # Ordem aleatória dentro de cada estrato; ficam as quota primeiras
+    rng = np.random.default_rng(seed)
+    df = df.assign(N_ESTRATO=sizes.astype('int64'), APOLICES_ESTRATO=by_stratum.transform('nunique'),
+                   _COTA=quota, _SORTEIO=rng.random(len(df)))
+    df = df.sort_values(STRATA + ['_SORTEIO'])
+    rank = df.groupby(STRATA, observed=True).cumcount()
+    sample = df[rank < df['_COTA']]
+
+    sample = sample.assign(PESO=sample['N_ESTRATO'] / sample['_COTA'])
+    return sample.drop(columns=['_COTA', '_SORTEIO', 'NR_APOLICE']).reset_index(drop=True)
+
+
+# ---------------------------
+# Função: estimativas
+# ---------------------------
+def estimate_totals(sample: pd.DataFrame, by: list, z: float = Z_95) -> pd.DataFrame:
+    """
+    Totais estimados das medidas (SAMPLE_MEASURES) por by, um subconjunto
+    de STRATA, com a meia-largura do intervalo em <medida>_erro, e
+    numero_seguros (soma de APOLICES_ESTRATO, erro zero).
+
+    Estimador estratificado: total_h = N_h * média_h e
+    var_h = N_h² (1 - n_h/N_h) s²_h / n_h; estratos de um grupo somam
+    totais e variâncias. Estrato completo (n_h = N_h) tem erro zero.
+    numero_seguros soma apólices distintas por estrato: se duas seguradoras
+    usam o mesmo número de apólice numa UF, conta as duas (o exato não).
+    """
+    columns = list(SAMPLE_MEASURES.values())
+    values = sample[columns].fillna(0)
+    grouped = values.groupby([sample[c] for c in STRATA], observed=True)
+    strata = grouped.mean().add_suffix('_media').join(grouped.var(ddof=1).fillna(0).add_suffix('_var'))
+    strata['n'] = grouped.size()
+    strata = strata.join(sample.groupby(STRATA, observed=True)[['N_ESTRATO', 'APOLICES_ESTRATO']].first())
+    strata = strata.reset_index()
+
+    N, n = strata['N_ESTRATO'], strata['n']
+    correction = N ** 2 * (1 - n / N) / n
+    parts = {'numero_seguros': strata['APOLICES_ESTRATO'], 'numero_seguros_var': 0.0 * N}
+    for measure, column in SAMPLE_MEASURES.items():
+        parts[measure] = N * strata[f'{column}_media']
+        parts[f'{measure}_var'] = correction * strata[f'{column}_var']
+    totals = pd.DataFrame(parts).groupby([strata[c] for c in by], observed=True).sum()
+
+    for measure in ['numero_seguros', *SAMPLE_MEASURES]:
+        totals[f'{measure}_erro'] = z * np.sqrt(totals.pop(f'{measure}_var'))
+    return totals.reset_index()
+
+
+def sample_estimates(sample: pd.DataFrame) -> dict:
+    """
+    Estimativas usadas na prévia: por UF, por razão social (com nome e
+    contagem de estados) e por razão social x UF.
+    """
+    nomes = sample.groupby('ID_RAZAO_SOCIAL', observed=True)['NM_RAZAO_SOCIAL'].first()
+
+    df_razao_social = estimate_totals(sample, ['ID_RAZAO_SOCIAL'])
+    # Todo estrato não vazio tem ao menos uma linha na amostra: a contagem
+    # de estados por razão social é exata
+    df_razao_social['contagem_estados'] = df_razao_social['ID_RAZAO_SOCIAL'].map(
+        sample.groupby('ID_RAZAO_SOCIAL', observed=True)['CD_UF'].nunique()
+    )
+    df_razao_social['contagem_estados_erro'] = 0.0
+    df_razao_social['NM_RAZAO_SOCIAL'] = df_razao_social['ID_RAZAO_SOCIAL'].map(nomes)
+
+    df_razao_social_estado = estimate_totals(sample, ['ID_RAZAO_SOCIAL', 'CD_UF'])
+    df_razao_social_estado['NM_RAZAO_SOCIAL'] = df_razao_social_estado['ID_RAZAO_SOCIAL'].map(nomes)
+
+    return {
+        'estado': estimate_totals(sample, ['CD_UF']),
+        'razao_social': df_razao_social,
+        'razao_social_estado': df_razao_social_estado,
+        'linhas_amostra': len(sample),
+        'linhas_dataset': int(sample.groupby(STRATA, observed=True)['N_ESTRATO'].first().sum()),
+    }
+
+
+# ---------------------------
+# Funções: salvar / carregar
+# ---------------------------
+def save_sample(sample: pd.DataFrame, path: str = SAMPLE_PATH, origin: str = None) -> None:
+    """
+    Grava a amostra em parquet; origin é a impressão digital do dataset de
+    que ela saiu.
+    """
+    save_with_origin(sample, path, origin)
+
+
+def load_sample(path: str = SAMPLE_PATH) -> pd.DataFrame:
+    """
+    Lê a amostra gravada pelo pré-processamento.
+    """
+    return pd.read_parquet(path)
@@ -0,0 +1,195 @@
+### search_index.py
+# Busca por nome de município, UF e razão social (seletor com type-ahead).
+#
+# O pré-processamento grava a tabela de entidades com o nome normalizado
+# (sem acento, casefold, espaços simples) e um peso (número de apólices),
+# que ordena os resultados. Ao carregar, ela vira dois índices:
+# - trie de prefixos do nome inteiro e de cada palavra ("grosso" acha
+#   "Mato Grosso"); cada nó guarda as TOP_PER_NODE melhores entidades da
+#   sua subárvore, então a consulta custa o comprimento do texto digitado;
+# - índice de trigramas (listas de postagem em arrays numpy) para tolerar
+#   erro de digitação: fração dos trigramas da consulta presentes no nome
+#   (não Jaccard, que afunda nomes longos como as razões sociais), acima
+#   de FUZZY_MIN_SIMILARITY.
+# Os prefixos vêm primeiro; os trigramas completam a lista quando faltam
+# resultados.
+
+import unicodedata
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from disk_cache import save_with_origin
+
+SEARCH_INDEX_PATH = 'assets/indice_busca.parquet'
+
+# Melhores entidades guardadas em cada nó da trie
+TOP_PER_NODE = 10
+
+# Similaridade mínima de trigramas para um resultado aproximado
+FUZZY_MIN_SIMILARITY = 0.5
+
+# Tipos de entidade, na ordem de desempate (mesmo peso)
+ENTITY_TYPES = ['uf', 'razao_social', 'municipio']
+
+
+def normalize(text: str) -> str:
+    """Sem acentos, casefold e espaços simples: "São  Paulo" -> "sao paulo"."""
+    decomposed = unicodedata.normalize('NFKD', str(text))
+    stripped = ''.join(c for c in decomposed if not unicodedata.combining(c))
+    return ' '.join(stripped.casefold().split())
+
+
+def trigrams(text: str) -> set:
+    """Trigramas do texto normalizado com bordas ("  s", " sa", ...)."""
+    padded = f'  {text} '
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+# ---------------------------
+# Tabela de entidades (pré-processamento)
+# ---------------------------
+def build_search_entities(df: pd.DataFrame, dims: dict) -> pd.DataFrame:
+    """
+    Uma linha por UF, razão social e município do dataset: TIPO, ID (CD_UF,
+    ID_RAZAO_SOCIAL ou CD_MUNICIPIO), NOME, NOME_NORMALIZADO, CD_UF (a UF
+    do município; nula para razão social) e PESO (apólices distintas).
+    """
+    parts = []
+    por_uf = df.groupby('CD_UF', observed=True)['NR_APOLICE'].nunique()
+    uf = dims['uf'][dims['uf']['CD_UF'].isin(por_uf.index)]
+    parts.append(pd.DataFrame({
+        'TIPO': 'uf', 'ID': uf['CD_UF'].astype('int64'), 'NOME': uf['NM_UF'] + ' (' + uf['SG_UF'] + ')',
+        'CD_UF': uf['CD_UF'].astype('int64'), 'PESO': uf['CD_UF'].map(por_uf),
+    }))
+
+    por_razao = df.groupby('ID_RAZAO_SOCIAL', observed=True)['NR_APOLICE'].nunique()
+    razao = dims['razao_social']
+    parts.append(pd.DataFrame({
+        'TIPO': 'razao_social', 'ID': razao['ID_RAZAO_SOCIAL'].astype('int64'), 'NOME': razao['NM_RAZAO_SOCIAL'],
+        'CD_UF': pd.NA, 'PESO': razao['ID_RAZAO_SOCIAL'].map(por_razao),
+    }))
+
+    por_municipio = df.groupby('CD_MUNICIPIO', observed=True)['NR_APOLICE'].nunique()
+    municipio = dims['municipio']
+    parts.append(pd.DataFrame({
+        'TIPO': 'municipio', 'ID': municipio['CD_MUNICIPIO'].astype('int64'),
+        'NOME': municipio['NM_MUNICIPIO_PROPRIEDADE'], 'CD_UF': municipio['CD_UF'].astype('int64'),
+        'PESO': municipio['CD_MUNICIPIO'].map(por_municipio),
+    }))
+
+    entities = pd.concat(parts, ignore_index=True)
+    entities = entities.dropna(subset=['NOME'])
+    entities['PESO'] = entities['PESO'].fillna(0).astype('int64')
+    entities['CD_UF'] = entities['CD_UF'].astype('Int8')
+    entities['NOME_NORMALIZADO'] = entities['NOME'].map(normalize)
+    return entities.reset_index(drop=True)
+
+
+def save_search_entities(entities: pd.DataFrame, path: str = SEARCH_INDEX_PATH, origin: str = None) -> None:
+    save_with_origin(entities, path, origin)
+
+
+def load_search_entities(path: str = SEARCH_INDEX_PATH) -> pd.DataFrame:
+    return pd.read_parquet(path)
+
+
+# ---------------------------
+# Índice em memória
+# ---------------------------
+@dataclass(frozen=True)
+class Match:
+    tipo: str
+    id: int
+    nome: str
+    cd_uf: int
+    exato: bool  # prefixo (True) ou aproximado por trigramas (False)
+
+
+class SearchIndex:
+    """
+    Trie de prefixos + trigramas sobre a tabela de entidades. search()
+    devolve até limit Match, prefixos primeiro (por peso), depois os
+    aproximados (por similaridade e peso).
+    """
+
+    def __init__(self, entities: pd.DataFrame):
+        type_rank = entities['TIPO'].map({t: i for i, t in enumerate(ENTITY_TYPES)})
+        entities = entities.assign(_ORDEM=type_rank).sort_values(
+            ['PESO', '_ORDEM', 'NOME_NORMALIZADO'], ascending=[False, True, True]
+        ).reset_index(drop=True)
+        # Posição na tabela = prioridade: menor é melhor
+        self.tipo = entities['TIPO'].tolist()
+        self.id = entities['ID'].astype('int64').tolist()
+        self.nome = entities['NOME'].tolist()
+        self.cd_uf = [None if pd.isna(c) else int(c) for c in entities['CD_UF']]
+        names = entities['NOME_NORMALIZADO'].tolist()
+
+        # Trie: nó = [filhos, melhores]; entidades entram em ordem de
+        # prioridade, então cada lista já sai ordenada
+        self._root = [{}, []]
+        for position, name in enumerate(names):
+            starts = [0] + [i + 1 for i, c in enumerate(name) if c == ' ']
+            for start in starts:
+                self._insert(name[start:], position)
+
+        # Trigramas: trigrama -> posições
+        postings = {}
+        for position, name in enumerate(names):
+            for gram in trigrams(name):
+                postings.setdefault(gram, []).append(position)
+        self._postings = {gram: np.array(p, dtype=np.int32) for gram, p in postings.items()}
+
+    def __len__(self):
+        return len(self.nome)
+
+    def _insert(self, key: str, position: int):
+        node = self._root
+        for char in key:
+            node = node[0].setdefault(char, [{}, []])
+            best = node[1]
+            if len(best) < TOP_PER_NODE and (not best or best[-1] != position):
+                best.append(position)
+
+    def _match(self, position: int, exato: bool) -> Match:
+        return Match(self.tipo[position], self.id[position], self.nome[position], self.cd_uf[position], exato)
+
+    def prefix(self, query: str) -> list:
+        """Posições (até TOP_PER_NODE, por prioridade) com palavra iniciada por query."""
+        node = self._root
+        for char in query:
+            node = node[0].get(char)
+            if node is None:
+                return []
+        return node[1]
+
+    def fuzzy(self, query: str, limit: int) -> list:
+        """Posições por similaridade de trigramas (>= FUZZY_MIN_SIMILARITY)."""
+        query_grams = trigrams(query)
+        grams = [self._postings[g] for g in query_grams if g in self._postings]
+        if not grams:
+            return []
+        overlap = np.bincount(np.concatenate(grams), minlength=len(self))
+        candidates = np.flatnonzero(overlap)
+        similarity = overlap[candidates] / len(query_grams)
+        keep = similarity >= FUZZY_MIN_SIMILARITY
+        candidates, similarity = candidates[keep], similarity[keep]
+        # Similaridade decrescente; empate pela prioridade (posição)
+        order = np.lexsort((candidates, -similarity))[:limit]
+        return candidates[order].tolist()
+
+    def search(self, query: str, limit: int = 8, tipos=None) -> list:
+        query = normalize(query)
+        if not query:
+            return []
+        wanted = set(tipos or ENTITY_TYPES)
+        results, seen = [], set()
+        for exato, positions in [(True, self.prefix(query)), (False, self.fuzzy(query, 4 * limit))]:
+            for position in positions:
+                if position not in seen and self.tipo[position] in wanted:
+                    seen.add(position)
+                    results.append(self._match(position, exato))
+                    if len(results) == limit:
+                        return results
+        return results
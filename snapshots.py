@@ -0,0 +1,295 @@
+### snapshots.py
+# Snapshots versionados do dataset e troca a quente no servidor.
+#
+# Publicar (na raiz do repositório):
+#   python snapshots.py publicar novos_dados.parquet --ranking r.parquet --mensal m.parquet --amostra a.parquet \
+#       --busca b.parquet
+#   python snapshots.py listar
+#
+# Cada snapshot fica em assets/snapshots/<versão>/ (versão = hash do
+# conteúdo do parquet) com dados.parquet, as tabelas de dimensão (dim_*,
+# copiadas da pasta do parquet: as chaves do parquet só fazem sentido com
+# elas) e, opcionalmente, os derivados do pré-processamento (ranking,
+# agregados mensais, amostra estratificada e entidades da busca). O
+# manifest.json aponta a versão atual; ele e as pastas são escritos em
+# arquivo temporário + rename, então um leitor nunca vê um snapshot pela
+# metade.
+#
+# Cada derivado (e cada dim_*) leva nos metadados do parquet a impressão
+# digital do dataset de que saiu (disk_cache.save_with_origin). Só vale
+# para a versão com a mesma impressão: publicar um derivado de outro
+# dataset é erro, e no modo legado um derivado do dados_v2.parquet não é
+# usado com o dados_filtrados.parquet (os IDs de dicionário não batem); o
+# loader refaz a partir dos dados.
+#
+# No servidor, SnapshotWatcher verifica o manifest em segundo plano; ao ver
+# uma versão nova, prepara dados e agregados fora do caminho das requisições
+# e só então troca a versão ativa (uma atribuição). Sem manifest, vale o
+# parquet legado em assets/dados_filtrados.parquet.
+
+import argparse
+import json
+import logging
+import os
+import shutil
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+
+from dimensions import DIMENSION_FILES
+from disk_cache import file_fingerprint, parquet_origin
+from rankings import RANKING_PATH
+from sampling import SAMPLE_PATH
+from search_index import SEARCH_INDEX_PATH
+from timeseries import MONTHLY_PATH
+
+logger = logging.getLogger('snapshots')
+
+SNAPSHOT_ROOT = 'assets/snapshots'
+LEGACY_DATA_PATH = 'assets/dados_filtrados.parquet'
+MANIFEST_NAME = 'manifest.json'
+DATA_FILE = 'dados.parquet'
+
+# Derivados opcionais: nome -> (arquivo no snapshot, caminho legado)
+OPTIONAL_FILES = {
+    'ranking': (os.path.basename(RANKING_PATH), RANKING_PATH),
+    'mensal': (os.path.basename(MONTHLY_PATH), MONTHLY_PATH),
+    'amostra': (os.path.basename(SAMPLE_PATH), SAMPLE_PATH),
+    'busca': (os.path.basename(SEARCH_INDEX_PATH), SEARCH_INDEX_PATH),
+}
+
+
+# ---------------------------
+# Leitura
+# ---------------------------
+def read_manifest(root: str = SNAPSHOT_ROOT):
+    """Conteúdo do manifest, ou None se não houver snapshots publicados."""
+    path = os.path.join(root, MANIFEST_NAME)
+    if not os.path.exists(path):
+        return None
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def current_version(root: str = SNAPSHOT_ROOT) -> str:
+    """Versão atual: a do manifest, ou o hash do parquet legado."""
+    manifest = read_manifest(root)
+    if manifest is not None:
+        return manifest['atual']
+    return file_fingerprint(LEGACY_DATA_PATH)
+
+
+# (derivado, versão) já avisados, para não repetir o aviso a cada rerun
+_ignored = set()
+
+
+def _derived_for(path: str, versao: str):
+    """path se existir e tiver sido gravado a partir do dataset versao; senão None."""
+    if not os.path.exists(path):
+        return None
+    if parquet_origin(path) != versao:
+        if (path, versao) not in _ignored:
+            _ignored.add((path, versao))
+            logger.warning('%s não foi gerado a partir da versão %s; ignorado', path, versao)
+        return None
+    return path
+
+
+def snapshot_files(versao: str, root: str = SNAPSHOT_ROOT) -> dict:
+    """
+    Caminhos dos arquivos da versão: "dados" e, se existirem, "ranking",
+    "mensal", "amostra" e "busca" (None quando o derivado não foi publicado
+    ou foi gerado a partir de outro dataset; os loaders refazem a partir
+    dos dados).
+    """
+    folder = os.path.join(root, versao)
+    if os.path.isdir(folder):
+        files = {'dados': os.path.join(folder, DATA_FILE)}
+        for name, (filename, _) in OPTIONAL_FILES.items():
+            files[name] = _derived_for(os.path.join(folder, filename), versao)
+        return files
+
+    # Versão legada: arquivos soltos em assets/ (versão = hash do parquet
+    # legado; derivados de outro parquet, como o dados_v2, ficam de fora)
+    files = {'dados': LEGACY_DATA_PATH}
+    for name, (_, legacy_path) in OPTIONAL_FILES.items():
+        files[name] = _derived_for(legacy_path, versao)
+    return files
+
+
+# ---------------------------
+# Publicação
+# ---------------------------
+def _write_manifest(root: str, manifest: dict):
+    tmp = os.path.join(root, MANIFEST_NAME + '.tmp')
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2, ensure_ascii=False)
+    os.replace(tmp, os.path.join(root, MANIFEST_NAME))
+
+
+def publish(parquet_path: str, root: str = SNAPSHOT_ROOT, extras: dict = None, keep: int = 3,
+            dims_folder: str = None) -> str:
+    """
+    Copia o parquet, as tabelas de dimensão de dims_folder (padrão: a pasta
+    do parquet; as que existirem) e os derivados em extras (nome -> caminho)
+    para uma pasta nova, aponta o manifest para ela e apaga snapshots além
+    dos keep mais recentes. Devolve a versão publicada. Um derivado gravado
+    a partir de outro dataset (ver disk_cache.ORIGIN_METADATA_KEY), ou
+    diferente do que a versão já publicada tem, levanta ValueError.
+    """
+    versao = file_fingerprint(parquet_path)
+    for name, path in (extras or {}).items():
+        if parquet_origin(path) != versao:
+            raise ValueError(f'{path} não foi gerado a partir de {parquet_path} ({name})')
+    os.makedirs(root, exist_ok=True)
+    folder = os.path.join(root, versao)
+    if not os.path.isdir(folder):
+        tmp = folder + '.tmp'
+        shutil.rmtree(tmp, ignore_errors=True)
+        os.makedirs(tmp)
+        shutil.copyfile(parquet_path, os.path.join(tmp, DATA_FILE))
+        dims_folder = dims_folder or os.path.dirname(parquet_path) or '.'
+        for filename in DIMENSION_FILES.values():
+            if os.path.exists(os.path.join(dims_folder, filename)):
+                shutil.copyfile(os.path.join(dims_folder, filename), os.path.join(tmp, filename))
+        for name, path in (extras or {}).items():
+            shutil.copyfile(path, os.path.join(tmp, OPTIONAL_FILES[name][0]))
+        os.replace(tmp, folder)
+    else:
+        # Versão já publicada: um derivado que falta entra; um diferente do
+        # publicado é erro (o servidor pode já ter usado o antigo)
+        for name, path in (extras or {}).items():
+            target = os.path.join(folder, OPTIONAL_FILES[name][0])
+            if not os.path.exists(target):
+                shutil.copyfile(path, target + '.tmp')
+                os.replace(target + '.tmp', target)
+            elif file_fingerprint(target) != file_fingerprint(path):
+                raise ValueError(f'versão {versao} já publicada com outro {name}; publique um dataset novo')
+
+    manifest = read_manifest(root) or {'snapshots': []}
+    snapshots = [s for s in manifest['snapshots'] if s['versao'] != versao]
+    snapshots.append({
+        'versao': versao,
+        'origem': os.path.abspath(parquet_path),
+        'publicado_em': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+    })
+    manifest = {'atual': versao, 'snapshots': snapshots[-keep:]}
+    _write_manifest(root, manifest)
+
+    kept = {s['versao'] for s in manifest['snapshots']}
+    for name in os.listdir(root):
+        if os.path.isdir(os.path.join(root, name)) and name not in kept and not name.endswith('.tmp'):
+            shutil.rmtree(os.path.join(root, name), ignore_errors=True)
+    return versao
+
+
+# ---------------------------
+# Troca a quente
+# ---------------------------
+class SnapshotWatcher(threading.Thread):
+    """
+    Verifica o manifest a cada interval segundos. Numa versão nova chama
+    prepare(versao) nesta thread e, se der certo, troca self.active e chama
+    retire(versao_antiga). Uma falha no preparo mantém a versão anterior e
+    a mesma versão é tentada de novo na próxima verificação.
+    """
+
+    def __init__(self, prepare, retire=None, root: str = SNAPSHOT_ROOT, interval: float = 5.0):
+        super().__init__(daemon=True, name='snapshot-watcher')
+        self.prepare, self.retire = prepare, retire
+        self.root, self.interval = root, interval
+        self.active = current_version(root)
+        self._signature = self._manifest_signature()
+        self._stop_event = threading.Event()
+
+    def _manifest_signature(self):
+        try:
+            stat = os.stat(os.path.join(self.root, MANIFEST_NAME))
+            return stat.st_mtime_ns, stat.st_size
+        except FileNotFoundError:
+            return None
+
+    def check(self) -> bool:
+        """Uma verificação; True se a versão ativa mudou."""
+        signature = self._manifest_signature()
+        if signature == self._signature:
+            return False
+        versao = current_version(self.root)
+        if versao == self.active:
+            self._signature = signature
+            return False
+
+        start = time.perf_counter()
+        try:
+            self.prepare(versao)
+        except Exception:
+            # Assinatura antiga: a próxima verificação tenta de novo
+            logger.exception('falha ao preparar o snapshot %s; mantendo %s', versao, self.active)
+            return False
+        self._signature = signature
+        previous, self.active = self.active, versao
+        logger.info('snapshot %s ativo (preparado em %.1fs), substitui %s',
+                    versao, time.perf_counter() - start, previous)
+        if self.retire is not None:
+            self.retire(previous)
+        return True
+
+    def run(self):
+        while not self._stop_event.wait(self.interval):
+            self.check()
+
+    def stop(self):
+        self._stop_event.set()
+
+
+_watcher = None
+_watcher_lock = threading.Lock()
+
+
+def start_watcher(prepare, retire=None, interval: float = None) -> SnapshotWatcher:
+    """
+    Watcher único do processo (iniciado na primeira chamada).
+    Intervalo: TERRA_SNAPSHOT_POLL_S (padrão 5 s).
+    """
+    global _watcher
+    with _watcher_lock:
+        if _watcher is None:
+            if interval is None:
+                interval = float(os.environ.get('TERRA_SNAPSHOT_POLL_S', 5))
+            _watcher = SnapshotWatcher(prepare, retire, interval=interval)
+            _watcher.start()
+    return _watcher
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description='Snapshots versionados do dataset do painel.')
+    sub = parser.add_subparsers(dest='comando', required=True)
+    pub = sub.add_parser('publicar', help='publica um parquet como a nova versão atual')
+    pub.add_argument('parquet')
+    pub.add_argument('--ranking', help='ranking_municipios.parquet gerado para este dataset')
+    pub.add_argument('--mensal', help='agregados_mensais.parquet gerado para este dataset')
+    pub.add_argument('--amostra', help='amostra_estratificada.parquet gerada para este dataset')
+    pub.add_argument('--busca', help='indice_busca.parquet gerado para este dataset')
+    pub.add_argument('--dimensoes', help='pasta com as tabelas dim_*.parquet (padrão: a pasta do parquet)')
+    pub.add_argument('--manter', type=int, default=3, help='snapshots mantidos em disco')
+    sub.add_parser('listar', help='mostra o manifest')
+    args = parser.parse_args(argv)
+
+    if args.comando == 'publicar':
+        extras = {name: getattr(args, name) for name in OPTIONAL_FILES if getattr(args, name)}
+        versao = publish(args.parquet, extras=extras, keep=args.manter, dims_folder=args.dimensoes)
+        print(f'Versão {versao} publicada; servidores em execução trocam em alguns segundos.')
+    else:
+        manifest = read_manifest()
+        if manifest is None:
+            print(f'Sem snapshots; usando {LEGACY_DATA_PATH} ({current_version()}).')
+        else:
+            for s in manifest['snapshots']:
+                marca = '*' if s['versao'] == manifest['atual'] else ' '
+                print(f"{marca} {s['versao']}  {s['publicado_em']}  {s['origem']}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,222 @@
+### spatial_check.py
+# Consistência espacial: coordenada da apólice x UF e município declarados.
+#
+# Cada ponto (NR_DECIMAL_LATITUDE / NR_DECIMAL_LONGITUDE) vai para o
+# polígono que o contém numa junção em lote: shapely.points monta todos os
+# pontos de uma vez e STRtree.query(pontos, predicate='intersects') devolve
+# os pares (ponto, polígono) já em C, sem laço Python por ponto. Antes, os
+# polígonos são recortados numa grade de GRID_CELL graus: o teste de ponto
+# em polígono custa o número de vértices, e uma UF inteira tem milhares; os
+# pedaços têm poucos (1 milhão de pontos: ~20 s inteiros, < 1 s recortados).
+#
+# - UFs: geometria de BR_UF_2024 simplificada com SIMPLIFY_TOLERANCE graus
+#   (a mesma do GeoJSON do painel). Um ponto a até essa distância da UF
+#   declarada não conta como divergência: a simplificação move a fronteira.
+# - Municípios (opcional): malha municipal do IBGE (CD_MUN, NM_MUN). Compara
+#   o código declarado (CD_GEOCMU) ou, sem ele, o nome sem acento.
+#
+# Resultado por apólice, gravado como colunas do parquet: UF_COORDENADA,
+# CD_MUNICIPIO_COORDENADA e ST_LOCALIZACAO (LOCATION_STATUSES). CD_GEOCMU
+# nulo é preenchido com o município da coordenada quando a UF confere.
+
+import numpy as np
+import pandas as pd
+
+from dimensions import normalize_municipality_code
+from search_index import normalize
+
+COORDINATE_COLUMNS = ['NR_DECIMAL_LATITUDE', 'NR_DECIMAL_LONGITUDE']
+
+# Tolerância (graus, ~1 km) da simplificação das UFs
+SIMPLIFY_TOLERANCE = 0.01
+
+# Lado (graus) das células da grade que recorta os polígonos
+GRID_CELL = 1.0
+
+LOCATION_STATUSES = ['ok', 'sem_coordenada', 'fora_do_mapa', 'uf_divergente', 'municipio_divergente']
+LOCATION_COLUMNS = ['UF_COORDENADA', 'CD_MUNICIPIO_COORDENADA', 'ST_LOCALIZACAO']
+
+# Relatório das divergências, gravado pelo pré-processamento
+LOCATION_REPORT_PATH = 'assets/inconsistencias_localizacao.parquet'
+REPORT_COLUMNS = [
+    'NR_APOLICE', 'NM_RAZAO_SOCIAL', 'SG_UF_PROPRIEDADE', 'NM_MUNICIPIO_PROPRIEDADE', 'CD_GEOCMU',
+    'NR_DECIMAL_LATITUDE', 'NR_DECIMAL_LONGITUDE',
+] + LOCATION_COLUMNS
+
+
+# ---------------------------
+# Coordenadas e junção em lote
+# ---------------------------
+def parse_coordinates(df: pd.DataFrame) -> tuple:
+    """
+    (longitude, latitude) em float64; nulo onde faltar, não for número
+    (aceita vírgula decimal) ou estiver fora de [-180, 180] x [-90, 90].
+    """
+    parsed = []
+    for column in COORDINATE_COLUMNS:
+        values = df[column]
+        if not pd.api.types.is_numeric_dtype(values):
+            values = pd.to_numeric(values.astype(str).str.replace(',', '.', regex=False), errors='coerce')
+        parsed.append(values.to_numpy(dtype='float64', na_value=np.nan))
+    lat, lon = parsed
+    invalid = (np.abs(lat) > 90) | (np.abs(lon) > 180)
+    lat[invalid] = np.nan
+    lon[invalid] = np.nan
+    return lon, lat
+
+
+def subdivide(geometries, cell: float = GRID_CELL) -> tuple:
+    """
+    (pedaços, dono): os polígonos recortados pelas células da grade e, para
+    cada pedaço, a posição do polígono de origem.
+    """
+    import shapely
+
+    geometries = np.asarray(geometries)
+    minx, miny, maxx, maxy = shapely.total_bounds(geometries)
+    xs, ys = np.meshgrid(np.arange(np.floor(minx), maxx, cell), np.arange(np.floor(miny), maxy, cell))
+    cells = shapely.box(xs.ravel(), ys.ravel(), xs.ravel() + cell, ys.ravel() + cell)
+    owner, cell_position = shapely.STRtree(cells).query(geometries, predicate='intersects')
+    pieces = shapely.intersection(geometries[owner], cells[cell_position])
+    keep = ~shapely.is_empty(pieces)
+    return pieces[keep], owner[keep]
+
+
+def make_points(lon: np.ndarray, lat: np.ndarray) -> np.ndarray:
+    """Array de pontos do shapely, None onde falta coordenada."""
+    import shapely
+
+    points = np.full(len(lon), None, dtype=object)
+    valid = ~(np.isnan(lon) | np.isnan(lat))
+    points[valid] = shapely.points(lon[valid], lat[valid])
+    return points
+
+
+def locate(points: np.ndarray, geometries, cell: float = GRID_CELL) -> np.ndarray:
+    """
+    Posição, em geometries, do polígono que contém cada ponto (-1 sem
+    coordenada ou fora de todos). Ponto exatamente numa fronteira comum fica
+    com um dos polígonos.
+    """
+    import shapely
+
+    result = np.full(len(points), -1, dtype=np.int64)
+    pieces, owner = subdivide(geometries, cell)
+    # Ponto None não casa com nada
+    hit_points, hits = shapely.STRtree(pieces).query(points, predicate='intersects')
+    first = np.unique(hit_points, return_index=True)[1]
+    result[hit_points[first]] = owner[hits[first]]
+    return result
+
+
+# ---------------------------
+# Verificação
+# ---------------------------
+def check_locations(df: pd.DataFrame, uf_geometries: pd.Series, municipalities: pd.DataFrame = None,
+                    tolerance: float = SIMPLIFY_TOLERANCE) -> pd.DataFrame:
+    """
+    Colunas de LOCATION_COLUMNS alinhadas a df.
+
+    uf_geometries: sigla -> polígono (já simplificado). municipalities:
+    CD_MUN, NM_MUN e geometry da malha municipal, ou None (só a UF é
+    verificada). A UF é verificada antes do município: ponto em outra UF é
+    uf_divergente mesmo que o município também não bata.
+    """
+    import shapely
+
+    points = make_points(*parse_coordinates(df))
+    siglas = uf_geometries.index.to_numpy()
+    uf_position = locate(points, uf_geometries.to_numpy())
+    uf_coordenada = np.where(uf_position >= 0, siglas[uf_position], None)
+
+    declared = df['SG_UF_PROPRIEDADE'].to_numpy(dtype=object)
+    has_point = pd.notna(points)
+    status = np.full(len(df), 'ok', dtype=object)
+    status[~has_point] = 'sem_coordenada'
+    status[has_point & (uf_position < 0)] = 'fora_do_mapa'
+
+    # UF diferente da declarada: só diverge se o ponto estiver além da
+    # tolerância do polígono declarado (UF declarada desconhecida diverge)
+    differs = np.flatnonzero((uf_position >= 0) & (uf_coordenada != declared))
+    if len(differs):
+        declared_geometry = uf_geometries.reindex(declared[differs]).to_numpy()
+        known = pd.notna(declared_geometry)
+        close = np.zeros(len(differs), dtype=bool)
+        close[known] = shapely.dwithin(points[differs][known], declared_geometry[known], tolerance)
+        status[differs[~close]] = 'uf_divergente'
+        uf_coordenada[differs[close]] = declared[differs[close]]
+
+    codigo_coordenada = pd.arrays.IntegerArray(np.zeros(len(df), dtype='int32'), np.ones(len(df), dtype=bool))
+    if municipalities is not None:
+        mun_position = locate(points, municipalities.geometry.to_numpy())
+        found = mun_position >= 0
+        codes = municipalities['CD_MUN'].to_numpy()
+        codigo_coordenada = pd.arrays.IntegerArray(np.where(found, codes[mun_position], 0).astype('int32'), ~found)
+
+        # Código declarado quando houver; sem ele, o nome normalizado
+        comparable = found & (status == 'ok')
+        if 'CD_GEOCMU' in df.columns:
+            declared_code = normalize_municipality_code(df['CD_GEOCMU']).to_numpy(dtype='float64', na_value=np.nan)
+            has_code = ~np.isnan(declared_code)
+            mismatch = comparable & has_code & (declared_code != np.where(found, codes[mun_position], -1))
+        else:
+            has_code = np.zeros(len(df), dtype=bool)
+            mismatch = np.zeros(len(df), dtype=bool)
+        by_name = comparable & ~has_code
+        if by_name.any():
+            names = municipalities['NM_MUN'].map(normalize).to_numpy()
+            declared_names = df['NM_MUNICIPIO_PROPRIEDADE'].map(
+                {n: normalize(n) for n in df['NM_MUNICIPIO_PROPRIEDADE'].dropna().unique()}
+            ).to_numpy(dtype=object)
+            mismatch |= by_name & (declared_names != np.where(found, names[mun_position], None))
+        status[mismatch] = 'municipio_divergente'
+
+    return pd.DataFrame({
+        'UF_COORDENADA': uf_coordenada,
+        'CD_MUNICIPIO_COORDENADA': codigo_coordenada,
+        'ST_LOCALIZACAO': pd.Categorical(status, categories=LOCATION_STATUSES),
+    }, index=df.index)
+
+
+def fill_municipality_codes(df: pd.DataFrame) -> pd.Series:
+    """
+    CD_GEOCMU com os nulos preenchidos pelo município da coordenada, só onde
+    a UF confere (ST_LOCALIZACAO "ok"). df já tem as colunas de check_locations.
+    """
+    declared = normalize_municipality_code(df['CD_GEOCMU'])
+    usable = declared.isna() & (df['ST_LOCALIZACAO'] == 'ok')
+    return declared.where(~usable, df['CD_MUNICIPIO_COORDENADA'])
+
+
+def add_location_columns(df: pd.DataFrame, uf_geometries: pd.Series, municipalities: pd.DataFrame = None):
+    """
+    df com as colunas de check_locations e CD_GEOCMU completado; devolve
+    (df, códigos preenchidos). Sem as colunas de coordenada, df volta igual.
+    """
+    if not set(COORDINATE_COLUMNS).issubset(df.columns):
+        return df, 0
+    df = df.drop(columns=[c for c in LOCATION_COLUMNS if c in df.columns])
+    if 'CD_GEOCMU' in df.columns:
+        df['CD_GEOCMU'] = normalize_municipality_code(df['CD_GEOCMU'])
+    df = df.join(check_locations(df, uf_geometries, municipalities))
+    filled = 0
+    if municipalities is not None and 'CD_GEOCMU' in df.columns:
+        before = df['CD_GEOCMU'].notna().sum()
+        df['CD_GEOCMU'] = fill_municipality_codes(df)
+        filled = int(df['CD_GEOCMU'].notna().sum() - before)
+    return df, filled
+
+
+def location_report(df: pd.DataFrame) -> pd.DataFrame:
+    """Apólices com coordenada divergente ou fora do mapa, para revisão."""
+    bad = df['ST_LOCALIZACAO'].isin(['fora_do_mapa', 'uf_divergente', 'municipio_divergente'])
+    return df.loc[bad, [c for c in REPORT_COLUMNS if c in df.columns]].reset_index(drop=True)
+
+
+def load_municipality_geometries(path: str) -> pd.DataFrame:
+    """Malha municipal do IBGE (shapefile/GeoJSON) com CD_MUN inteiro, NM_MUN e geometry."""
+    import geopandas as gpd
+
+    gdf = gpd.read_file(path)[['CD_MUN', 'NM_MUN', 'geometry']]
+    gdf['CD_MUN'] = gdf['CD_MUN'].astype('int64')
+    return gdf
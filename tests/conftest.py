@@ -0,0 +1,12 @@
+### conftest.py
+# Os testes não leem nem gravam o cache em disco do painel
+# (cache/resultados.sqlite): cada teste que precisa dele monta o seu.
+
+import pytest
+
+import cache_manager
+
+
+@pytest.fixture(autouse=True)
+def no_disk_cache(monkeypatch):
+    monkeypatch.setattr(cache_manager, '_disk', False)
@@ -0,0 +1,74 @@
+### test_aggregate_store.py
+# O repositório incremental tem de produzir as mesmas chaves, o mesmo
+# ranking e os mesmos bins mensais de um processamento completo sobre as
+# mesmas linhas.
+
+import pandas as pd
+import pytest
+
+from aggregate_store import AggregateStore
+from benchmarks.synthetic import generate_psr
+from dimensions import add_dimension_keys
+from rankings import build_municipality_ranking
+from timeseries import build_monthly_bins
+
+
+@pytest.fixture(scope='module')
+def rows():
+    return generate_psr(scale=0.02, seed=3)
+
+
+def ingest_by_year(root, df) -> AggregateStore:
+    store = AggregateStore(str(root))
+    for ano, part in df.groupby('ANO_APOLICE'):
+        store.ingest(f'psr_{ano}', part.reset_index(drop=True))
+    return store
+
+
+def full_run(df) -> tuple:
+    keyed, dims = add_dimension_keys(df)
+    return build_municipality_ranking(keyed, dims), dims
+
+
+def assert_same_ranking(incremental, full):
+    key = ['CD_UF', 'CD_MUNICIPIO']
+    left = incremental.sort_values(key, ignore_index=True)
+    right = full.sort_values(key, ignore_index=True)
+    pd.testing.assert_frame_equal(left, right, check_dtype=False)
+
+
+@pytest.mark.parametrize('with_codes', [True, False])
+def test_ranking_and_dims_match_full_run(tmp_path, rows, with_codes):
+    df = rows if with_codes else rows.drop(columns='CD_GEOCMU')
+    agregados = ingest_by_year(tmp_path, df).materialize()
+    ranking, dims = full_run(df)
+
+    assert_same_ranking(agregados['ranking'], ranking)
+    pd.testing.assert_frame_equal(agregados['dims']['municipio'], dims['municipio'], check_dtype=False)
+    assert (agregados['ranking']['CD_MUNICIPIO'] > 0).all() == with_codes
+
+
+def test_retract_matches_full_run_without_partition(tmp_path, rows):
+    store = ingest_by_year(tmp_path, rows)
+    store.retract('psr_2022')
+    ranking, _ = full_run(rows[rows['ANO_APOLICE'] != 2022].reset_index(drop=True))
+    assert_same_ranking(store.materialize()['ranking'], ranking)
+
+
+def test_monthly_bins_match_full_run(tmp_path, rows):
+    agregados = ingest_by_year(tmp_path, rows).materialize()
+    keyed, _ = add_dimension_keys(rows)
+    pd.testing.assert_frame_equal(agregados['mensal'], build_monthly_bins(keyed), check_dtype=False)
+
+
+def test_municipality_labels_do_not_depend_on_row_order(tmp_path, rows):
+    # Mesmo código IBGE com duas grafias, a "errada" antes nas linhas
+    df = rows.copy()
+    codigo = df['CD_GEOCMU'].iloc[0]
+    mesmas = df.index[df['CD_GEOCMU'] == codigo]
+    df.loc[mesmas[0], 'NM_MUNICIPIO_PROPRIEDADE'] = 'ZZ GRAFIA ALTERNATIVA'
+
+    agregados = ingest_by_year(tmp_path, df).materialize()
+    ranking, dims = full_run(df)
+    assert_same_ranking(agregados['ranking'], ranking)
+    pd.testing.assert_frame_equal(agregados['dims']['municipio'], dims['municipio'], check_dtype=False)
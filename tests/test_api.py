@@ -0,0 +1,120 @@
+### test_api.py
+# API HTTP sobre um dataset sintético: respostas JSON / Arrow iguais aos
+# agregados dos loaders, exportação em fluxo, validação antes do
+# If-None-Match (consulta inválida é 400, nunca 304) e a lista de ETags.
+
+import io
+import json
+import threading
+from http.client import HTTPConnection
+
+import pandas as pd
+import pyarrow as pa
+import pytest
+
+import cache_manager
+import loaders
+from api import ARROW_MIME, ApiServer, etag, etag_matches
+from benchmarks.synthetic import write_synthetic_dataset
+from disk_cache import file_fingerprint
+
+
+@pytest.fixture(scope='module')
+def server(tmp_path_factory):
+    dataset = write_synthetic_dataset(str(tmp_path_factory.mktemp('api')), scale=0.01, seed=11)
+    versao = file_fingerprint(dataset)
+    patch = pytest.MonkeyPatch()
+    patch.setattr(cache_manager, '_disk', False)
+    patch.setattr(loaders, 'snapshot_files', lambda v, root=None: {
+        'dados': dataset, 'ranking': None, 'mensal': None, 'amostra': None, 'busca': None,
+    })
+    api = ApiServer(('127.0.0.1', 0), lambda: versao)
+    threading.Thread(target=api.serve_forever, daemon=True).start()
+    yield api, versao
+    api.shutdown()
+    api.server_close()
+    patch.undo()
+
+
+def get(server, path: str, headers: dict = None):
+    api, _ = server
+    connection = HTTPConnection(*api.server_address[:2], timeout=30)
+    try:
+        connection.request('GET', path, headers=headers or {})
+        response = connection.getresponse()
+        return response.status, dict(response.getheaders()), response.read()
+    finally:
+        connection.close()
+
+
+def test_etag_matches_list_and_weak_tags():
+    tag = etag('abc', 'json')
+    assert etag_matches(tag, tag)
+    assert etag_matches(f'"outra", W/{tag}', tag)
+    assert etag_matches(' * ', tag)
+    assert not etag_matches('', tag)
+    # Substring não basta
+    assert not etag_matches(f'"x{tag[1:]}', tag)
+
+
+def test_matching_etag_gives_304(server):
+    _, versao = server
+    status, headers, _ = get(server, '/agregados/estado?uf=SP')
+    assert status == 200 and headers['ETag'] == etag(versao, 'json')
+    status, _, body = get(server, '/agregados/estado?uf=SP', {'If-None-Match': f'"x", W/{headers["ETag"]}'})
+    assert status == 304 and body == b''
+
+
+@pytest.mark.parametrize('path', [
+    '/agregados/estado?razao_social=1',   # estado não tem ID_RAZAO_SOCIAL
+    '/agregados/correlacao?uf=SP',
+    '/agregados/estado?desconhecido=1',
+    '/municipios?uf=XX',
+])
+def test_invalid_query_is_400_even_with_matching_etag(server, path):
+    _, versao = server
+    status, _, body = get(server, path, {'If-None-Match': etag(versao, 'json')})
+    assert status == 400
+    assert 'erro' in json.loads(body)
+
+
+def test_json_matches_loader_aggregates(server):
+    _, versao = server
+    status, headers, body = get(server, '/agregados/razao_social_estado?uf=35')
+    assert status == 200 and headers['Content-Type'].startswith('application/json')
+    expected = loaders.load_aggregates(versao)['razao_social_estado']
+    expected = expected[expected['CD_UF'] == 35].reset_index(drop=True)
+    got = pd.DataFrame(json.loads(body))
+    assert len(got) == len(expected) > 0
+    pd.testing.assert_frame_equal(got[expected.columns], expected, check_dtype=False)
+
+
+def test_arrow_matches_json(server):
+    _, versao = server
+    status, headers, body = get(server, '/agregados/estado', {'Accept': ARROW_MIME})
+    assert status == 200 and headers['Content-Type'] == ARROW_MIME
+    assert headers['ETag'] == etag(versao, 'arrow')
+    got = pa.ipc.open_stream(body).read_all().to_pandas()
+    _, _, body_json = get(server, '/agregados/estado')
+    pd.testing.assert_frame_equal(got, pd.DataFrame(json.loads(body_json)), check_dtype=False)
+
+
+def test_municipios_top_follows_ranking(server):
+    _, versao = server
+    status, _, body = get(server, '/municipios?uf=SP&top=3&ordem=valor_total')
+    assert status == 200
+    got = pd.DataFrame(json.loads(body))
+    expected = loaders.load_rankings(versao).top(35, 3, 'valor_total')
+    assert got['CD_MUNICIPIO'].tolist() == expected['CD_MUNICIPIO'].tolist()
+    assert got['valor_total'].is_monotonic_decreasing
+
+
+def test_export_streams_filtered_rows(server):
+    _, versao = server
+    status, headers, body = get(server, '/exportar?uf=SP&formato=csv&colunas=SG_UF_PROPRIEDADE,NR_APOLICE')
+    assert status == 200 and headers['Transfer-Encoding'] == 'chunked'
+    got = pd.read_csv(io.BytesIO(body))
+    df, _ = loaders.load_data(versao)
+    assert list(got.columns) == ['SG_UF_PROPRIEDADE', 'NR_APOLICE']
+    assert len(got) == int((df['SG_UF_PROPRIEDADE'] == 'SP').sum())
+    assert set(got['SG_UF_PROPRIEDADE']) == {'SP'}
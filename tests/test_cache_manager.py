@@ -0,0 +1,67 @@
+### test_cache_manager.py
+# Chaves do decorador cached: funções diferentes no mesmo namespace e com os
+# mesmos argumentos não podem devolver o resultado uma da outra (memória e
+# disco), e um cálculo que falha não deixa o lock da chave para trás.
+
+import cache_manager
+from cache_manager import CacheManager, cached
+from disk_cache import DiskCache
+
+
+def test_same_namespace_and_args_do_not_collide_in_memory():
+    cache = CacheManager(2**20)
+
+    @cached("compartilhado", cache=cache)
+    def geometria():
+        return "geojson"
+
+    @cached("compartilhado", cache=cache)
+    def vizinhanca():
+        return {11: [12]}
+
+    assert vizinhanca() == {11: [12]}
+    assert geometria() == "geojson"
+    assert vizinhanca() == {11: [12]}
+    assert geometria.cache_key() != vizinhanca.cache_key()
+    assert cache.contains(geometria.cache_key()) and cache.contains(vizinhanca.cache_key())
+
+
+def test_same_namespace_and_args_do_not_collide_on_disk(tmp_path, monkeypatch):
+    store = DiskCache(str(tmp_path / "resultados.sqlite"), 2**20, code_version="teste")
+    monkeypatch.setattr(cache_manager, "_disk", store)
+
+    @cached("compartilhado", cache=CacheManager(2**20), persist=True)
+    def ordem(versao, coluna):
+        return ("ordem", versao, coluna)
+
+    @cached("compartilhado", cache=CacheManager(2**20), persist=True)
+    def texto(versao, coluna):
+        return ("texto", versao, coluna)
+
+    assert ordem("v1", "UF") == ("ordem", "v1", "UF")
+    assert texto("v1", "UF") == ("texto", "v1", "UF")
+
+    # Caches em memória novos: só o disco responde
+    @cached("compartilhado", cache=CacheManager(2**20), persist=True)
+    def ordem(versao, coluna):  # noqa: F811
+        raise AssertionError("deveria vir do disco")
+
+    assert ordem("v1", "UF") == ("ordem", "v1", "UF")
+
+
+def test_failed_compute_releases_key_lock():
+    cache = CacheManager(2**20)
+    calls = []
+
+    def falha():
+        calls.append('falha')
+        raise RuntimeError('sem dados')
+
+    for _ in range(2):
+        try:
+            cache.get_or_compute(('ns', 1), 'ns', falha)
+        except RuntimeError:
+            pass
+    assert cache._key_locks == {}
+    assert cache.get_or_compute(('ns', 1), 'ns', lambda: 'ok') == 'ok'
+    assert calls == ['falha', 'falha'] and cache._key_locks == {}
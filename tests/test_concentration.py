@@ -0,0 +1,58 @@
+### test_concentration.py
+# Participações e HHI contra uma conta feita à mão, e a matriz CSR contra a
+# tabela de participações de onde ela saiu.
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from concentration import build_concentration, build_share_matrix, herfindahl_index, market_shares
+
+
+@pytest.fixture
+def razao_social_estado():
+    # SP: 60/30/10 -> HHI 3600 + 900 + 100 = 4600; RJ: 50/50 -> 5000;
+    # MG: 10 seguradoras iguais -> 10 x 10^2 = 1000
+    sp = [('A', 60.0), ('B', 30.0), ('C', 10.0)]
+    rj = [('A', 5.0), ('D', 5.0)]
+    mg = [(f'S{i}', 1.0) for i in range(10)]
+    rows = [(35, 'SP', n, v) for n, v in sp] + [(33, 'RJ', n, v) for n, v in rj] + [(31, 'MG', n, v) for n, v in mg]
+    rows.append((31, 'MG', 'SEM_VALOR', 0.0))
+    df = pd.DataFrame(rows, columns=['CD_UF', 'SG_UF_PROPRIEDADE', 'NM_RAZAO_SOCIAL', 'valor_total'])
+    return df.assign(ID_RAZAO_SOCIAL=pd.factorize(df['NM_RAZAO_SOCIAL'], sort=True)[0])
+
+
+def test_shares_sum_to_one_per_region(razao_social_estado):
+    shares = market_shares(razao_social_estado, 'CD_UF')
+    assert shares.groupby('CD_UF')['share'].sum().to_numpy() == pytest.approx(1.0)
+    sp = shares[shares['CD_UF'] == 35].set_index('NM_RAZAO_SOCIAL')['share']
+    assert sp.to_dict() == pytest.approx({'A': 0.6, 'B': 0.3, 'C': 0.1})
+
+
+def test_hhi_matches_hand_computation(razao_social_estado):
+    hhi = herfindahl_index(market_shares(razao_social_estado, 'CD_UF'), 'CD_UF').set_index('CD_UF')
+    assert hhi.loc[[35, 33, 31], 'hhi'].to_numpy() == pytest.approx([4600.0, 5000.0, 1000.0])
+    # A seguradora sem valor não conta como presente
+    assert hhi.loc[[35, 33, 31], 'numero_seguradoras'].tolist() == [3, 2, 10]
+    assert hhi.loc[35, 'lider'] == 'A' and hhi.loc[35, 'share_lider'] == pytest.approx(0.6)
+    assert hhi.loc[[35, 33, 31], 'classificacao'].tolist() == [
+        'Altamente concentrado', 'Altamente concentrado', 'Não concentrado']
+
+
+def test_share_matrix_matches_shares(razao_social_estado):
+    shares = market_shares(razao_social_estado, 'CD_UF')
+    matrix = build_share_matrix(shares, 'NM_RAZAO_SOCIAL', 'SG_UF_PROPRIEDADE')
+    # Só as células com participação positiva são guardadas
+    assert matrix.matrix.nnz == int((shares['share'] > 0).sum())
+    grid = matrix.to_frame()
+    expected = shares[shares['share'] > 0].pivot(index='NM_RAZAO_SOCIAL', columns='SG_UF_PROPRIEDADE', values='share')
+    pd.testing.assert_frame_equal(grid, expected.reindex(index=grid.index, columns=grid.columns),
+                                  check_names=False)
+    assert np.isnan(grid.loc['B', 'RJ'])
+
+
+def test_build_concentration_orders_by_hhi(razao_social_estado):
+    cultura = razao_social_estado.rename(columns={'CD_UF': 'ID_CULTURA', 'SG_UF_PROPRIEDADE': 'NM_CULTURA_GLOBAL'})
+    metrics = build_concentration(razao_social_estado, cultura)
+    assert metrics.hhi_uf['SG_UF_PROPRIEDADE'].tolist() == ['RJ', 'SP', 'MG']
+    assert metrics.hhi_cultura['hhi'].tolist() == metrics.hhi_uf['hhi'].tolist()
@@ -0,0 +1,29 @@
+### test_coverage_bits.py
+# Consultas da cobertura empacotada: um membro desconhecido não pode virar
+# o último bit da linha.
+
+import pandas as pd
+import pytest
+
+from coverage_bits import build_packed_coverage
+
+
+@pytest.fixture
+def coverage():
+    df = pd.DataFrame({
+        'ID_RAZAO_SOCIAL': [1, 1, 2, 2],
+        'CD_MUNICIPIO': [10, 30, 20, 30],
+    })
+    return build_packed_coverage(df)
+
+
+def test_covers_all_known_members(coverage):
+    assert coverage.covers_all([30]).tolist() == [True, True]
+    assert coverage.covers_all([10, 30]).tolist() == [True, False]
+
+
+def test_unknown_member_raises(coverage):
+    with pytest.raises(KeyError):
+        coverage.member_mask([99])
+    with pytest.raises(KeyError):
+        coverage.covers_all([10, 99])
@@ -0,0 +1,35 @@
+### test_disk_cache.py
+# A versão do código do cache em disco tem de cobrir todo módulo que um
+# carregador persistido executa: senão um resultado antigo sobrevive a uma
+# mudança de código.
+
+import ast
+import os
+
+from disk_cache import DATA_LAYER_MODULES
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def local_imports(module: str) -> set:
+    """Módulos do repositório importados (direta ou indiretamente) por module."""
+    seen, pending = set(), [module]
+    while pending:
+        name = pending.pop()
+        path = os.path.join(REPO, f'{name}.py')
+        if name in seen or not os.path.exists(path):
+            continue
+        seen.add(name)
+        with open(path, encoding='utf-8') as f:
+            tree = ast.parse(f.read())
+        for node in ast.walk(tree):
+            if isinstance(node, ast.Import):
+                pending += [alias.name.split('.')[0] for alias in node.names]
+            elif isinstance(node, ast.ImportFrom) and node.module and not node.level:
+                pending.append(node.module.split('.')[0])
+    return seen
+
+
+def test_data_layer_covers_persisted_loaders():
+    reachable = {f'{name}.py' for name in local_imports('loaders')}
+    assert reachable <= set(DATA_LAYER_MODULES)
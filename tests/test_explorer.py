@@ -0,0 +1,72 @@
+### test_explorer.py
+# Índices do explorador contra o pandas: ordenação estável com nulos no fim,
+# filtro de texto contra str.contains e filtro de faixa contra between.
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from explorer import build_sort_index, build_text_index, page, range_mask, row_order, text_mask
+
+
+@pytest.fixture
+def linhas():
+    return pd.DataFrame({
+        'NM_MUNICIPIO': ['São Paulo', 'Campinas', None, 'SÃO CARLOS', 'Santos', 'Campinas', 'Osasco'],
+        'VL_PREMIO': [10.0, 3.5, 7.0, np.nan, 3.5, 12.0, 0.0],
+        'NR_AREA': [5, 1, 3, 3, 2, 8, 1],
+    })
+
+
+@pytest.mark.parametrize('column', ['NM_MUNICIPIO', 'VL_PREMIO', 'NR_AREA'])
+def test_sort_index_matches_stable_sort(linhas, column):
+    order, _, valid = build_sort_index(linhas[column])
+    expected = linhas.sort_values(column, kind='stable', na_position='last').index.to_numpy()
+    np.testing.assert_array_equal(order, expected)
+    assert valid == linhas[column].notna().sum()
+
+
+@pytest.mark.parametrize('column', ['NM_MUNICIPIO', 'VL_PREMIO'])
+def test_descending_keeps_nulls_last(linhas, column):
+    order = row_order(len(linhas), build_sort_index(linhas[column]), reverse=True)
+    values = linhas[column].take(order)
+    valid = linhas[column].notna().sum()
+    assert values.iloc[valid:].isna().all()
+    assert values.iloc[:valid].is_monotonic_decreasing
+
+
+@pytest.mark.parametrize('text', ['são', 'SÃO', 'campinas', 'os', 'x'])
+def test_text_mask_matches_str_contains(linhas, text):
+    mask = text_mask(build_text_index(linhas['NM_MUNICIPIO']), text)
+    expected = linhas['NM_MUNICIPIO'].str.casefold().str.contains(text.casefold(), regex=False, na=False)
+    np.testing.assert_array_equal(mask, expected.to_numpy(dtype=bool))
+
+
+@pytest.mark.parametrize('low, high', [(3.5, 10.0), (None, 3.5), (7.0, None), (None, None), (20.0, 30.0)])
+def test_range_mask_matches_between(linhas, low, high):
+    mask = range_mask(build_sort_index(linhas['VL_PREMIO']), len(linhas), low, high)
+    values = linhas['VL_PREMIO']
+    lower = -np.inf if low is None else low
+    upper = np.inf if high is None else high
+    np.testing.assert_array_equal(mask, values.between(lower, upper).to_numpy())
+
+
+def test_query_and_pages_match_filtered_sort(linhas):
+    masks = [
+        range_mask(build_sort_index(linhas['NR_AREA']), len(linhas), 1, 5),
+        text_mask(build_text_index(linhas['NM_MUNICIPIO']), 's'),
+    ]
+    order = row_order(len(linhas), build_sort_index(linhas['VL_PREMIO']), reverse=False, masks=masks)
+
+    keep = linhas['NR_AREA'].between(1, 5) & linhas['NM_MUNICIPIO'].str.casefold().str.contains('s', na=False)
+    expected = linhas[keep].sort_values('VL_PREMIO', kind='stable', na_position='last')
+    np.testing.assert_array_equal(order, expected.index.to_numpy())
+
+    pages = [page(linhas, order, n, 2, columns=['NM_MUNICIPIO']) for n in range(4)]
+    pd.testing.assert_frame_equal(pd.concat(pages, ignore_index=True), expected[['NM_MUNICIPIO']].reset_index(drop=True))
+    assert pages[-1].empty
+
+
+def test_row_order_without_sort_keeps_original_order(linhas):
+    mask = linhas['NR_AREA'].to_numpy() > 2
+    np.testing.assert_array_equal(row_order(len(linhas), masks=[mask]), np.flatnonzero(mask))
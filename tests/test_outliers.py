@@ -0,0 +1,42 @@
+### test_outliers.py
+# Pares da auditoria pelas chaves inteiras: município homônimo de outra UF
+# não é par, e cultura nula fica sem z-score.
+
+import numpy as np
+import pandas as pd
+
+from dimensions import add_dimension_keys
+from outliers import MIN_PEERS, score_outliers
+
+
+def policies(uf: str, geocmu: int, premio: list, cultura='SOJA') -> pd.DataFrame:
+    return pd.DataFrame({
+        'NR_APOLICE': [f'{uf}{i}' for i in range(len(premio))],
+        'NM_RAZAO_SOCIAL': 'SEGURADORA',
+        'SG_UF_PROPRIEDADE': uf,
+        'NM_MUNICIPIO_PROPRIEDADE': 'SANTA LUZIA',
+        'CD_GEOCMU': geocmu,
+        'NM_CULTURA_GLOBAL': cultura,
+        'NR_AREA_TOTAL': 10.0,
+        'VL_PREMIO_LIQUIDO': premio,
+        'PE_TAXA': 5.0,
+        'NR_PRODUTIVIDADE_SEGURADA': 50.0,
+    })
+
+
+def test_peer_groups_use_integer_keys():
+    base = [100.0 + i for i in range(MIN_PEERS)]
+    df = pd.concat([
+        policies('MG', 3157807, base + [1000.0]),
+        policies('BA', 2929206, [1000.0 + i for i in range(MIN_PEERS)]),
+        policies('MG', 3157807, [100.0], cultura=None),
+    ], ignore_index=True)
+    keyed, _ = add_dimension_keys(df)
+    scores = score_outliers(keyed)
+
+    mg = keyed['CD_UF'] == 31
+    # O prêmio de 1000 em MG destoa dos pares de MG, não dos homônimos da BA
+    assert scores.loc[mg & (keyed['VL_PREMIO_LIQUIDO'] == 1000.0), 'FL_ATIPICA'].all()
+    assert not scores.loc[~mg, 'FL_ATIPICA'].any()
+    assert (scores['GRUPO_PARES'][keyed['NM_CULTURA_GLOBAL'].notna()] == 'municipio').all()
+    assert np.isnan(scores.loc[keyed['NM_CULTURA_GLOBAL'].isna(), 'Z_PREMIO_POR_HA']).all()
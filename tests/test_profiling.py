@@ -0,0 +1,28 @@
+### test_profiling.py
+# O profiler do rerun amostra também as threads do pool de render, onde o
+# trabalho pesado roda; thread de pool ociosa não entra no perfil.
+
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from profiling import SamplingProfiler
+
+
+def ocupado(segundos: float):
+    fim = time.perf_counter() + segundos
+    while time.perf_counter() < fim:
+        sum(range(1000))
+
+
+def test_samples_busy_pool_thread_and_skips_idle_ones():
+    with ThreadPoolExecutor(max_workers=2, thread_name_prefix='render') as pool:
+        pool.submit(ocupado, 0).result()
+        profiler = SamplingProfiler(interval=0.002).start()
+        try:
+            pool.submit(ocupado, 0.3).result()
+        finally:
+            profiler.stop()
+        profiler.stop()
+
+    pool_stacks = {stack: n for stack, n in profiler.stacks.items() if stack.startswith('render')}
+    assert pool_stacks and all('ocupado' in stack for stack in pool_stacks)
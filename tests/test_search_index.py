@@ -0,0 +1,95 @@
+### test_search_index.py
+# Busca por nome contra uma filtragem feita em pandas: prefixo de qualquer
+# palavra do nome sem acento, ordenado por peso, tipo e nome.
+
+import pandas as pd
+import pytest
+
+from search_index import ENTITY_TYPES, TOP_PER_NODE, SearchIndex, build_search_entities, normalize
+
+NOMES = [
+    ('uf', 35, 'São Paulo (SP)', 35, 900),
+    ('uf', 51, 'Mato Grosso (MT)', 51, 700),
+    ('uf', 50, 'Mato Grosso do Sul (MS)', 50, 400),
+    ('razao_social', 1, 'BRASILSEG COMPANHIA DE SEGUROS', None, 650),
+    ('razao_social', 2, 'SANCOR SEGUROS DO BRASIL S.A.', None, 300),
+    ('municipio', 3550308, 'São Paulo', 35, 120),
+    ('municipio', 3548708, 'São Carlos', 35, 300),
+    ('municipio', 3548500, 'Santos', 35, 80),
+    ('municipio', 5103403, 'Cuiabá', 51, 250),
+    ('municipio', 5107909, 'Sinop', 51, 400),
+    ('municipio', 4314902, 'Porto Alegre', 43, 90),
+    ('municipio', 2927408, 'Salvador', 29, 0),
+]
+
+
+@pytest.fixture
+def entidades():
+    df = pd.DataFrame(NOMES, columns=['TIPO', 'ID', 'NOME', 'CD_UF', 'PESO'])
+    return df.assign(CD_UF=df['CD_UF'].astype('Int8'), NOME_NORMALIZADO=df['NOME'].map(normalize))
+
+
+def esperado_por_prefixo(entidades, query, limit):
+    """Mesma consulta em pandas: alguma palavra do nome começa com a consulta."""
+    query = normalize(query)
+    palavras = entidades['NOME_NORMALIZADO'].str.split(' ')
+    inicios = palavras.map(lambda p: [' '.join(p[i:]) for i in range(len(p))])
+    casa = inicios.map(lambda sufixos: any(s.startswith(query) for s in sufixos))
+    ordem = entidades[casa].assign(_ORDEM=entidades['TIPO'].map(ENTITY_TYPES.index))
+    ordem = ordem.sort_values(['PESO', '_ORDEM', 'NOME_NORMALIZADO'], ascending=[False, True, True])
+    return list(zip(ordem['TIPO'], ordem['ID']))[:limit]
+
+
+def test_normalize_strips_accents_case_and_spaces():
+    assert normalize('  São   PAULO ') == 'sao paulo'
+    assert normalize('Cuiabá') == normalize('CUIABA') == 'cuiaba'
+
+
+@pytest.mark.parametrize('query', ['sao', 'SÃO', 'são p', 'grosso', 'seguros', 'cuiabá', 's', 'mato grosso do'])
+def test_prefix_results_match_pandas_ranking(entidades, query):
+    index = SearchIndex(entidades)
+    matches = [(m.tipo, m.id) for m in index.search(query, limit=TOP_PER_NODE) if m.exato]
+    assert matches == esperado_por_prefixo(entidades, query, TOP_PER_NODE)
+
+
+def test_accented_query_ranks_by_weight(entidades):
+    nomes = [m.nome for m in SearchIndex(entidades).search('sao', limit=3)]
+    # UF (900) antes de São Carlos (300) antes do município São Paulo (120)
+    assert nomes == ['São Paulo (SP)', 'São Carlos', 'São Paulo']
+
+
+def test_tipos_filter_and_limit(entidades):
+    index = SearchIndex(entidades)
+    municipios = index.search('s', limit=3, tipos=['municipio'])
+    assert [m.nome for m in municipios] == ['Sinop', 'São Carlos', 'São Paulo']
+    assert all(m.tipo == 'municipio' for m in municipios)
+
+
+def test_typo_falls_back_to_trigrams(entidades):
+    matches = SearchIndex(entidades).search('cuiava')
+    assert matches and matches[0].nome == 'Cuiabá' and not matches[0].exato
+    assert SearchIndex(entidades).search('zzzz') == []
+
+
+def test_entities_weight_is_distinct_policies():
+    df = pd.DataFrame({
+        'CD_UF': [35, 35, 35, 51],
+        'ID_RAZAO_SOCIAL': [0, 0, 1, 1],
+        'CD_MUNICIPIO': [3550308, 3550308, 3548708, 5103403],
+        'NR_APOLICE': ['A', 'A', 'B', 'C'],
+    })
+    dims = {
+        'uf': pd.DataFrame({'CD_UF': [35, 51, 33], 'NM_UF': ['São Paulo', 'Mato Grosso', 'Rio de Janeiro'],
+                            'SG_UF': ['SP', 'MT', 'RJ']}),
+        'razao_social': pd.DataFrame({'ID_RAZAO_SOCIAL': [0, 1], 'NM_RAZAO_SOCIAL': ['ALIANÇA', 'BRASILSEG']}),
+        'municipio': pd.DataFrame({'CD_MUNICIPIO': [3550308, 3548708, 5103403], 'CD_UF': [35, 35, 51],
+                                   'NM_MUNICIPIO_PROPRIEDADE': ['São Paulo', 'São Carlos', 'Cuiabá']}),
+    }
+    entities = build_search_entities(df, dims)
+
+    for tipo, key in [('uf', 'CD_UF'), ('razao_social', 'ID_RAZAO_SOCIAL'), ('municipio', 'CD_MUNICIPIO')]:
+        peso = entities[entities['TIPO'] == tipo].set_index('ID')['PESO'].to_dict()
+        assert peso == df.groupby(key)['NR_APOLICE'].nunique().to_dict()
+    # UF sem apólice fica de fora; nomes normalizados para a busca
+    assert 33 not in entities.loc[entities['TIPO'] == 'uf', 'ID'].tolist()
+    assert 'alianca' in entities['NOME_NORMALIZADO'].tolist()
@@ -0,0 +1,126 @@
+### test_snapshots.py
+# Um snapshot publicado tem de carregar com as mesmas chaves do parquet de
+# origem (códigos IBGE dos municípios, não substitutos), e um derivado do
+# pré-processamento só vale para o dataset de que saiu.
+
+import os
+import shutil
+
+import pandas as pd
+import pytest
+
+import snapshots
+from aggregates import load_dataset
+from benchmarks.synthetic import write_synthetic_dataset
+from dimensions import save_dimensions
+from disk_cache import file_fingerprint
+from rankings import build_municipality_ranking, save_ranking
+from snapshots import SnapshotWatcher, publish, snapshot_files
+
+# Impressão digital de um dataset que não é o servido
+OUTRO_DATASET = '0' * 16
+
+
+@pytest.fixture(scope='module')
+def dataset(tmp_path_factory):
+    return write_synthetic_dataset(str(tmp_path_factory.mktemp('origem')), scale=0.01, seed=5)
+
+
+@pytest.mark.parametrize('with_dims', [True, False])
+def test_published_snapshot_keeps_keys(tmp_path, dataset, with_dims):
+    source = dataset
+    if not with_dims:
+        # Parquet sozinho, sem as tabelas dim_* ao lado
+        source = str(tmp_path / 'sozinho' / 'dados.parquet')
+        os.makedirs(os.path.dirname(source))
+        shutil.copyfile(dataset, source)
+
+    root = str(tmp_path / 'snapshots')
+    versao = publish(source, root=root)
+    df, dims = load_dataset(snapshot_files(versao, root)['dados'])
+    original, original_dims = load_dataset(dataset)
+
+    assert (df['CD_MUNICIPIO'] > 0).all()
+    pd.testing.assert_series_equal(df['CD_MUNICIPIO'], original['CD_MUNICIPIO'])
+    for name in ['municipio', 'razao_social', 'cultura']:
+        pd.testing.assert_frame_equal(dims[name], original_dims[name], check_dtype=False)
+
+
+def test_watcher_retries_failed_prepare(tmp_path, dataset):
+    root = str(tmp_path / 'snapshots')
+    primeira = publish(dataset, root=root)
+    preparadas = []
+
+    def prepare(versao):
+        preparadas.append(versao)
+        if len(preparadas) == 1:
+            raise OSError('disco cheio')
+
+    watcher = SnapshotWatcher(prepare, root=root)
+    outro = write_synthetic_dataset(str(tmp_path / 'outro'), scale=0.01, seed=6)
+    segunda = publish(outro, root=root)
+    assert segunda != primeira
+    assert not watcher.check()
+    assert watcher.active == primeira
+    # Manifest inalterado: a mesma versão é preparada de novo
+    assert watcher.check()
+    assert watcher.active == segunda and preparadas == [segunda, segunda]
+
+
+def test_publish_rejects_derived_from_other_dataset(tmp_path, dataset):
+    ranking = build_municipality_ranking(*load_dataset(dataset))
+    proprio, alheio = str(tmp_path / 'proprio.parquet'), str(tmp_path / 'alheio.parquet')
+    save_ranking(ranking, proprio, origin=file_fingerprint(dataset))
+    save_ranking(ranking, alheio, origin=OUTRO_DATASET)
+
+    root = str(tmp_path / 'snapshots')
+    with pytest.raises(ValueError):
+        publish(dataset, root=root, extras={'ranking': alheio})
+    versao = publish(dataset, root=root, extras={'ranking': proprio})
+    assert snapshot_files(versao, root)['ranking'] is not None
+
+
+def test_legacy_ignores_derived_from_other_dataset(tmp_path, dataset, monkeypatch):
+    # Modo legado: o painel serve dados_filtrados.parquet, e o ranking solto
+    # em assets/ pode ter saído do dados_v2.parquet
+    path = str(tmp_path / 'ranking_municipios.parquet')
+    monkeypatch.setattr(snapshots, 'LEGACY_DATA_PATH', dataset)
+    monkeypatch.setitem(snapshots.OPTIONAL_FILES, 'ranking', ('ranking_municipios.parquet', path))
+    versao = file_fingerprint(dataset)
+    ranking = build_municipality_ranking(*load_dataset(dataset))
+
+    save_ranking(ranking, path, origin=OUTRO_DATASET)
+    assert snapshot_files(versao, str(tmp_path / 'sem_snapshots'))['ranking'] is None
+    save_ranking(ranking, path, origin=versao)
+    assert snapshot_files(versao, str(tmp_path / 'sem_snapshots'))['ranking'] == path
+
+
+def test_dimensions_of_other_dataset_are_rebuilt_from_keys(tmp_path, dataset):
+    source = str(tmp_path / 'dados.parquet')
+    shutil.copyfile(dataset, source)
+    original, original_dims = load_dataset(dataset)
+    alheias = {name: table.copy() for name, table in original_dims.items()}
+    alheias['municipio']['NM_MUNICIPIO_PROPRIEDADE'] = 'OUTRO'
+    save_dimensions(alheias, str(tmp_path), origin=OUTRO_DATASET)
+
+    df, dims = load_dataset(source)
+    pd.testing.assert_frame_equal(dims['municipio'], original_dims['municipio'], check_dtype=False)
+
+
+def test_republish_does_not_drop_or_replace_extras(tmp_path, dataset):
+    keyed = load_dataset(dataset)
+    ranking = build_municipality_ranking(*keyed)
+    primeiro, segundo = str(tmp_path / 'r1.parquet'), str(tmp_path / 'r2.parquet')
+    save_ranking(ranking, primeiro, origin=file_fingerprint(dataset))
+    save_ranking(ranking.iloc[::-1], segundo, origin=file_fingerprint(dataset))
+
+    root = str(tmp_path / 'snapshots')
+    versao = publish(dataset, root=root)
+    assert snapshot_files(versao, root)['ranking'] is None
+    # Derivado que faltava entra na versão existente
+    publish(dataset, root=root, extras={'ranking': primeiro})
+    assert file_fingerprint(snapshot_files(versao, root)['ranking']) == file_fingerprint(primeiro)
+    # O mesmo arquivo de novo é aceito; um diferente, não
+    publish(dataset, root=root, extras={'ranking': primeiro})
+    with pytest.raises(ValueError):
+        publish(dataset, root=root, extras={'ranking': segundo})
@@ -0,0 +1,76 @@
+### test_timeseries.py
+# Somas acumuladas do MonthlyIndex contra um groupby direto nas linhas:
+# qualquer intervalo de meses, por UF, por razão social e no total.
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from benchmarks.synthetic import generate_psr
+from dimensions import add_dimension_keys
+from timeseries import MonthlyIndex, build_monthly_bins, month_key, month_label
+
+
+@pytest.fixture(scope='module')
+def keyed():
+    df, _ = add_dimension_keys(generate_psr(scale=0.01, seed=7))
+    return df.assign(MES=month_key(df['DT_APOLICE']))
+
+
+@pytest.fixture(scope='module')
+def bins(keyed):
+    return build_monthly_bins(keyed)
+
+
+def expected(keyed, start, end, column=None, group=None) -> dict:
+    rows = keyed[keyed['MES'].between(start, end)]
+    if column is not None:
+        rows = rows[rows[column] == group]
+    # numero_seguros soma as apólices distintas de cada bin (UF x razão
+    # social x mês), como build_monthly_bins define
+    return {
+        'numero_seguros': rows.groupby(['CD_UF', 'ID_RAZAO_SOCIAL', 'MES'])['NR_APOLICE'].nunique().sum(),
+        'area_total': rows['NR_AREA_TOTAL'].sum(),
+        'valor_total': rows['VL_PREMIO_LIQUIDO'].sum(),
+    }
+
+
+def test_month_key_round_trip():
+    dates = pd.Series(pd.to_datetime(['2021-01-15', '2023-12-31']))
+    assert [month_label(k) for k in month_key(dates)] == ['2021-01', '2023-12']
+
+
+@pytest.mark.parametrize('column', [None, 'CD_UF', 'ID_RAZAO_SOCIAL'])
+def test_range_total_matches_groupby(keyed, bins, column):
+    index = MonthlyIndex(bins, column)
+    groups = [None] if column is None else keyed[column].value_counts().index[:3].tolist()
+    first, last = int(keyed['MES'].min()), int(keyed['MES'].max())
+    rng = np.random.default_rng(0)
+    for group in groups:
+        for start, end in [(first, last), (first + 3, first + 3)] + [
+            tuple(sorted(rng.integers(first - 2, last + 3, size=2))) for _ in range(10)
+        ]:
+            got = index.range_total(int(start), int(end), group)
+            want = expected(keyed, start, end, column, group)
+            assert got['numero_seguros'] == want['numero_seguros']
+            assert got['area_total'] == pytest.approx(want['area_total'])
+            assert got['valor_total'] == pytest.approx(want['valor_total'])
+
+
+def test_series_and_month_range(keyed, bins):
+    cd_uf = int(keyed['CD_UF'].mode()[0])
+    index = MonthlyIndex(bins, 'CD_UF')
+    rows = keyed[keyed['CD_UF'] == cd_uf]
+    first, last = index.month_range(cd_uf)
+    assert (first, last) == (rows['MES'].min(), rows['MES'].max())
+
+    series = index.series(first, last, cd_uf)
+    by_month = rows.groupby('MES')['VL_PREMIO_LIQUIDO'].sum()
+    assert series['MES'].tolist() == [month_label(k) for k in by_month.index]
+    assert series['valor_total'].to_numpy() == pytest.approx(by_month.to_numpy())
+
+
+def test_unknown_group_is_empty(bins):
+    index = MonthlyIndex(bins, 'CD_UF')
+    assert index.month_range(99) is None
+    assert index.range_total(0, 10**6, 99) == {'numero_seguros': 0.0, 'area_total': 0.0, 'valor_total': 0.0}
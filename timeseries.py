@@ -0,0 +1,156 @@
+### timeseries.py
+# Dimensão temporal: agregados mensais pré-calculados por UF e razão social.
+# Os meses ficam ordenados com somas acumuladas (prefix sums), então o total
+# de qualquer intervalo de meses sai de duas buscas binárias e uma subtração.
+
+import numpy as np
+import pandas as pd
+
+from disk_cache import save_with_origin
+
+MONTHLY_PATH = 'assets/agregados_mensais.parquet'
+
+# Colunas de data mantidas pelo pré-processamento
+DATE_COLUMNS = ['DT_PROPOSTA', 'DT_APOLICE', 'DT_INICIO_VIGENCIA']
+
+# Medidas aditivas guardadas em cada bin mensal
+MEASURES = ['numero_seguros', 'area_total', 'valor_total']
+
+
+# ---------------------------
+# Funções: chave de mês
+# ---------------------------
+def month_key(dates: pd.Series) -> pd.Series:
+    """
+    Converte datas em chave inteira de mês (ano * 12 + mês - 1).
+    """
+    return (dates.dt.year * 12 + dates.dt.month - 1).astype('Int32')
+
+
+def month_label(key: int) -> str:
+    """
+    Chave de mês -> 'AAAA-MM'.
+    """
+    year, month = divmod(int(key), 12)
+    return f'{year}-{month + 1:02d}'
+
+
+# ---------------------------
+# Função: conversão das datas na ingestão
+# ---------------------------
+def convert_dates(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Converte as colunas de data (dd/mm/aaaa) para datetime com precisão de
+    segundos e ANO_APOLICE para Int16.
+    """
+    for col in DATE_COLUMNS:
+        if col in df.columns:
+            dates = pd.to_datetime(df[col], errors='coerce', dayfirst=True)
+            df[col] = dates.dt.normalize().astype('datetime64[s]')
+    if 'ANO_APOLICE' in df.columns:
+        df['ANO_APOLICE'] = pd.to_numeric(df['ANO_APOLICE'], errors='coerce').astype('Int16')
+    return df
+
+
+# ---------------------------
+# Função: bins mensais
+# ---------------------------
+def build_monthly_bins(df: pd.DataFrame, date_col: str = 'DT_APOLICE') -> pd.DataFrame:
+    """
+    Agrega por (CD_UF, ID_RAZAO_SOCIAL, MES). Retorna vazio se não houver datas.
+
+    numero_seguros é o número de apólices distintas no bin; como cada apólice
+    tem uma única data, a soma entre meses continua sendo uma contagem distinta.
+    """
+    if date_col not in df.columns:
+        return pd.DataFrame(columns=['CD_UF', 'ID_RAZAO_SOCIAL', 'MES'] + MEASURES)
+
+    bins = (
+        df.assign(MES=month_key(df[date_col]))
+        .dropna(subset=['MES'])
+        .groupby(['CD_UF', 'ID_RAZAO_SOCIAL', 'MES'], observed=True)
+        .agg(
+            numero_seguros=('NR_APOLICE', 'nunique'),
+            area_total=('NR_AREA_TOTAL', 'sum'),
+            valor_total=('VL_PREMIO_LIQUIDO', 'sum')
+        )
+        .reset_index()
+    )
+    return bins
+
+
+# ---------------------------
+# Classe: índice de séries mensais
+# ---------------------------
+class MonthlyIndex:
+    """
+    Séries mensais de uma dimensão (CD_UF, ID_RAZAO_SOCIAL ou total nacional).
+
+    As linhas ficam ordenadas por (grupo, mês); para cada medida guardamos a
+    soma acumulada global com um zero à frente. O intervalo [ini, fim] de um
+    grupo é localizado com searchsorted dentro da fatia do grupo.
+    """
+
+    def __init__(self, bins: pd.DataFrame, group_col: str = None):
+        cols = ([group_col] if group_col else []) + ['MES']
+        table = bins.groupby(cols, observed=True)[MEASURES].sum().reset_index()
+        if group_col is None:
+            table.insert(0, '_TOTAL', 0)
+            group_col = '_TOTAL'
+        table = table.sort_values([group_col, 'MES'], ignore_index=True)
+
+        self.group_col = group_col
+        self.months = table['MES'].to_numpy(dtype=np.int32)
+        groups = table[group_col].to_numpy(dtype=np.int32)
+        keys = np.unique(groups)
+        self._start = dict(zip(keys.tolist(), np.searchsorted(groups, keys, 'left').tolist()))
+        self._stop = dict(zip(keys.tolist(), np.searchsorted(groups, keys, 'right').tolist()))
+        self._values = {m: table[m].to_numpy(dtype=np.float64) for m in MEASURES}
+        self._prefix = {
+            m: np.concatenate([[0.0], np.cumsum(v)]) for m, v in self._values.items()
+        }
+
+    def _slice(self, group):
+        group = 0 if self.group_col == '_TOTAL' else int(group)
+        return self._start.get(group, 0), self._stop.get(group, 0)
+
+    def month_range(self, group=None):
+        """(primeiro, último) mês com dados no grupo, ou None."""
+        start, stop = self._slice(group)
+        if start == stop:
+            return None
+        return int(self.months[start]), int(self.months[stop - 1])
+
+    def range_total(self, start_month: int, end_month: int, group=None) -> dict:
+        """Totais das medidas entre start_month e end_month (inclusive), O(log n)."""
+        start, stop = self._slice(group)
+        lo = start + np.searchsorted(self.months[start:stop], start_month, 'left')
+        hi = start + np.searchsorted(self.months[start:stop], end_month, 'right')
+        return {m: float(p[hi] - p[lo]) for m, p in self._prefix.items()}
+
+    def series(self, start_month: int, end_month: int, group=None) -> pd.DataFrame:
+        """Valores mês a mês do grupo no intervalo (para o gráfico)."""
+        start, stop = self._slice(group)
+        lo = start + np.searchsorted(self.months[start:stop], start_month, 'left')
+        hi = start + np.searchsorted(self.months[start:stop], end_month, 'right')
+        frame = pd.DataFrame({m: v[lo:hi] for m, v in self._values.items()})
+        frame.insert(0, 'MES', [month_label(k) for k in self.months[lo:hi]])
+        return frame
+
+
+# ---------------------------
+# Funções: salvar / carregar
+# ---------------------------
+def save_monthly_bins(bins: pd.DataFrame, path: str = MONTHLY_PATH, origin: str = None) -> None:
+    """
+    Grava os bins mensais em parquet; origin é a impressão digital do
+    dataset de que eles saíram.
+    """
+    save_with_origin(bins, path, origin)
+
+
+def load_monthly_bins(path: str = MONTHLY_PATH) -> pd.DataFrame:
+    """
+    Lê os bins mensais gravados pelo pré-processamento.
+    """
+    return pd.read_parquet(path)
@@ -0,0 +1,87 @@
+### warmup.py
+# Pré-aquecimento do cache antes de o servidor aceitar acessos.
+#
+# Uso (na raiz do repositório, antes do "streamlit run"):
+#   python warmup.py
+#   python warmup.py --top-n 5 10 20
+#
+# Importa só a camada de dados (loaders.py, sem Streamlit) e calcula todos
+# os artefatos cacheáveis: agregados, concentração, ranking, série mensal,
+# índice de busca, os mapas, as barras de cada métrica, a auditoria e a
+# visão "Estado" de cada UF.
+# Tudo vai para o cache em disco (disk_cache), que o servidor lê no
+# primeiro rerun em vez de recalcular.
+
+import argparse
+import sys
+import time
+
+import figures
+import loaders
+from cache_manager import disk_store
+from snapshots import snapshot_files
+
+
+def _timed(label: str, fn, *args):
+    start = time.perf_counter()
+    value = fn(*args)
+    print(f'  {label:<40} {(time.perf_counter() - start) * 1000:9.1f} ms', file=sys.stderr)
+    return value
+
+
+def warm(top_ns) -> int:
+    """
+    Calcula todos os artefatos para a versão atual do dataset; devolve
+    quantos foram gerados.
+    """
+    versao = loaders.current_version()
+    print(f'Dataset {snapshot_files(versao)["dados"]} (versão {versao})', file=sys.stderr)
+
+    df, dims = _timed('dados', loaders.load_data, versao)
+    _timed('agregados', loaders.load_aggregates, versao)
+    _timed('concentração', loaders.load_concentration, versao)
+    _timed('ranking', loaders.load_rankings, versao)
+    _timed('série mensal', loaders.load_monthly_indexes, versao)
+    _timed('auditoria', loaders.load_outliers, versao)
+    _timed('índice de busca', loaders.load_search_index, versao)
+    count = 7
+    for nome in loaders.RAZAO_SOCIAL_FIGURES:
+        _timed(f'figura {nome}', loaders.load_razao_social_figure, versao, nome)
+        count += 1
+
+    # Ramo "Razão Social": uma barra por métrica e os dois mapas
+    for selected_metric, metric_column in figures.INSURER_METRICS.items():
+        _timed(f'barras {metric_column}', loaders.load_insurer_bar, versao, metric_column, selected_metric)
+        count += 1
+    for tipo in ['area', 'seguros']:
+        _timed(f'mapa {tipo}', loaders.load_map_html, versao, tipo)
+        count += 1
+    _timed('mapa atipicas', loaders.load_outlier_map_html, versao)
+    count += 1
+
+    # Ramo "Estado": cada UF presente no dataset, para cada tamanho de ranking
+    for cd_uf in df['CD_UF'].dropna().unique():
+        for top_n in top_ns:
+            _timed(f'estado {int(cd_uf)} top {top_n}', loaders.load_state_view, versao, int(cd_uf), top_n)
+            count += 1
+    return count
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description='Pré-calcula o cache do painel antes do primeiro acesso.')
+    parser.add_argument('--top-n', type=int, nargs='+', default=[10],
+                        help='tamanhos de ranking a pré-calcular no ramo "Estado" (padrão: 10, o valor inicial)')
+    args = parser.parse_args(argv)
+
+    if disk_store() is None:
+        print('Cache em disco desligado (TERRA_DISK_CACHE=0): nada a aquecer.', file=sys.stderr)
+        return 0
+
+    start = time.perf_counter()
+    count = warm(args.top_n)
+    print(f'{count} artefatos prontos em {time.perf_counter() - start:.1f}s', file=sys.stderr)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())